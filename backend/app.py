@@ -1,45 +1,65 @@
 """
 Flask RESTful API for GazeTracking
 Provides endpoints for camera feed and gaze metrics
+
+The camera, or the frame source chosen by GAZE_SOURCE (see sources.py), is
+read by a single capture thread and the frames are analyzed by a single
+inference worker (see pipeline.py). Endpoints only read the latest published
+results, so concurrent clients never compete for the camera.
 """
 
 from flask import Flask, Response, jsonify
 from flask_cors import CORS
-import cv2
-import json
 import base64
 import sys
 import os
 
 # Add parent directory to path to import gaze_tracking
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
-from gaze_tracking import GazeTracking
+from gaze_tracking import GazeTracking, MotionGate
+from pipeline import GazePipeline
+from broadcast import FrameBroadcaster, MetricsBroadcaster, FRAME_HEADERS
+from sources import open_source
 
 app = Flask(__name__)
-CORS(app)  # Enable CORS for React frontend
-
-# Initialize gaze tracking
-gaze = GazeTracking()
-
-# Try multiple methods to open the webcam
-webcam = None
-for attempt in [
-    (0, cv2.CAP_ANY, "index 0 with CAP_ANY"),
-    ('/dev/video0', cv2.CAP_V4L2, "/dev/video0 with CAP_V4L2"),
-    (1, cv2.CAP_ANY, "index 1 with CAP_ANY"),
-]:
-    if len(attempt) == 3:
-        device, backend, desc = attempt
-        webcam = cv2.VideoCapture(device, backend) if backend else cv2.VideoCapture(device)
-        if webcam.isOpened():
-            print(f"Successfully opened camera using {desc}")
-            break
-        else:
-            print(f"Failed to open camera using {desc}")
-
-if not webcam or not webcam.isOpened():
-    print("WARNING: Could not open any camera!")
-    webcam = cv2.VideoCapture(0)  # Fallback
+CORS(app, expose_headers=FRAME_HEADERS)  # Enable CORS for React frontend
+
+# Initialize gaze tracking, with the timing of each stage for /api/stats.
+# GAZE_MOTION_THRESHOLD enables the reuse of the results while the eyes don't move.
+# GAZE_CLOSED_THRESHOLD enables the detection of the closed eyes and of the blinks.
+motion_threshold = float(os.environ.get('GAZE_MOTION_THRESHOLD', 0))
+closed_threshold = float(os.environ.get('GAZE_CLOSED_THRESHOLD', 0))
+gaze = GazeTracking(
+    profiling=os.environ.get('GAZE_PROFILING', '1') != '0',
+    motion_gate=MotionGate(threshold=motion_threshold) if motion_threshold > 0 else None,
+    closed_threshold=closed_threshold or None
+)
+
+# Frame source: the webcam by default, or a recording or synthetic frames to
+# run the server without a camera. GAZE_SOURCE_FPS paces it, GAZE_SOURCE_LOOP replays it.
+source_loop = os.environ.get('GAZE_SOURCE_LOOP')
+source = open_source(
+    os.environ.get('GAZE_SOURCE'),
+    fps=float(os.environ.get('GAZE_SOURCE_FPS', 0)) or None,
+    loop=source_loop != '0' if source_loop is not None else None
+)
+
+# Capture thread and inference worker, the only users of the source and of gaze
+pipeline = GazePipeline(source, gaze)
+pipeline.start()
+
+# Encodes each annotated frame once for all the viewers of the video feed
+broadcaster = FrameBroadcaster(
+    pipeline,
+    quality=int(os.environ.get('GAZE_JPEG_QUALITY', 95)),
+    max_width=int(os.environ.get('GAZE_STREAM_WIDTH', 0)) or None
+)
+
+# Pushes the metrics of every analyzed frame to the subscribed clients
+metrics_broadcaster = MetricsBroadcaster(
+    pipeline,
+    max_rate=float(os.environ.get('GAZE_METRICS_MAX_RATE', 30))
+)
 
 
 @app.route('/api/health', methods=['GET'])
@@ -47,72 +67,101 @@ def health_check():
     """Health check endpoint"""
     return jsonify({
         'status': 'healthy',
-        'service': 'GazeTracking API'
+        'service': 'GazeTracking API',
+        'pipeline': pipeline.stats(),
+        'stream': broadcaster.stats(),
+        'metricsStream': metrics_broadcaster.stats()
     })
 
 
+# Pipeline counters exported by /api/stats: (metric, key of pipeline.stats(), help)
+PIPELINE_COUNTERS = [
+    ('gaze_captured_frames_total', 'capturedFrames', 'Frames read from the camera'),
+    ('gaze_capture_failures_total', 'captureFailures', 'Failed camera reads'),
+    ('gaze_processed_frames_total', 'processedFrames', 'Frames analyzed by the inference worker'),
+    ('gaze_dropped_frames_total', 'droppedFrames', 'Frames dropped because the inference was busy'),
+    ('gaze_inference_failures_total', 'inferenceFailures', 'Frames whose analysis raised an error'),
+]
+
+# Calibration gauges exported by /api/stats for each eye: (metric, key prefix
+# of Calibration.metrics(), help)
+CALIBRATION_GAUGES = [
+    ('gaze_calibration_threshold', 'threshold_', 'Binarization threshold of the eye'),
+    ('gaze_calibration_threshold_drift', 'threshold_drift_', 'Change of the threshold since the calibration'),
+]
+
+# Motion gate counters exported by /api/stats when it is enabled
+MOTION_GATE_COUNTERS = [
+    ('gaze_gate_processed_frames_total', 'processed_frames', 'Frames analyzed because the eyes changed'),
+    ('gaze_gate_skipped_frames_total', 'skipped_frames', 'Frames reusing the results of the previous one'),
+]
+
+
+@app.route('/api/stats', methods=['GET'])
+def get_stats():
+    """Prometheus metrics: duration histograms of the analysis stages and pipeline counters"""
+    stats = pipeline.stats()
+    lines = []
+    for metric, key, description in PIPELINE_COUNTERS:
+        lines.append('# HELP {} {}'.format(metric, description))
+        lines.append('# TYPE {} counter'.format(metric))
+        lines.append('{} {}'.format(metric, stats[key]))
+
+    if gaze.motion_gate is not None:
+        for metric, key, description in MOTION_GATE_COUNTERS:
+            lines.append('# HELP {} {}'.format(metric, description))
+            lines.append('# TYPE {} counter'.format(metric))
+            lines.append('{} {}'.format(metric, gaze.motion_gate.stats()[key]))
+
+    calibration = stats['calibration']
+    if calibration is not None:
+        for metric, key, description in CALIBRATION_GAUGES:
+            lines.append('# HELP {} {}'.format(metric, description))
+            lines.append('# TYPE {} gauge'.format(metric))
+            for eye in ('left', 'right'):
+                if calibration[key + eye] is not None:
+                    lines.append('{}{{eye="{}"}} {}'.format(metric, eye, calibration[key + eye]))
+        lines.append('# HELP gaze_calibration_recalibrations_total Re-evaluations of the thresholds')
+        lines.append('# TYPE gaze_calibration_recalibrations_total counter')
+        lines.append('gaze_calibration_recalibrations_total {}'.format(calibration['recalibrations']))
+
+    body = '\n'.join(lines) + '\n' + gaze.profiler.prometheus()
+    return Response(body, mimetype='text/plain; version=0.0.4')
+
+
+def no_frame_response():
+    """Response of the endpoints when no frame has been analyzed yet"""
+    return jsonify({
+        'error': 'No frame captured from webcam yet'
+    }), 503
+
+
 @app.route('/api/metrics', methods=['GET'])
 def get_metrics():
     """Get current gaze tracking metrics"""
-    _, frame = webcam.read()
-
-    if frame is None:
-        return jsonify({
-            'error': 'Failed to capture frame from webcam'
-        }), 500
-
-    # Process frame with gaze tracking
-    gaze.refresh(frame)
-
-    # Extract metrics
-    left_pupil = gaze.pupil_left_coords()
-    right_pupil = gaze.pupil_right_coords()
-    horizontal = gaze.horizontal_ratio()
-    vertical = gaze.vertical_ratio()
-
-    metrics = {
-        'leftPupil': {
-            'x': left_pupil[0] if left_pupil else None,
-            'y': left_pupil[1] if left_pupil else None
-        },
-        'rightPupil': {
-            'x': right_pupil[0] if right_pupil else None,
-            'y': right_pupil[1] if right_pupil else None
-        },
-        'horizontal': horizontal,
-        'vertical': vertical,
-        'timestamp': None  # Could add timestamp if needed
-    }
-
-    return jsonify(metrics)
-
+    sample = pipeline.latest()
 
-def generate_frames():
-    """Generator function to yield video frames"""
-    while True:
-        success, frame = webcam.read()
+    if sample is None:
+        return no_frame_response()
 
-        if not success:
-            break
+    return jsonify(MetricsBroadcaster.payload(sample))
 
-        # Process frame with gaze tracking
-        gaze.refresh(frame)
-        annotated_frame = gaze.annotated_frame()
 
-        # Encode frame as JPEG
-        ret, buffer = cv2.imencode('.jpg', annotated_frame)
-        frame_bytes = buffer.tobytes()
-
-        # Yield frame in multipart format
-        yield (b'--frame\r\n'
-               b'Content-Type: image/jpeg\r\n\r\n' + frame_bytes + b'\r\n')
+@app.route('/api/metrics/stream', methods=['GET'])
+def metrics_stream():
+    """Server-Sent Events endpoint pushing the metrics of every analyzed frame"""
+    return Response(
+        metrics_broadcaster.stream(),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
 
 
 @app.route('/api/video-feed', methods=['GET'])
 def video_feed():
     """Video streaming endpoint using multipart/x-mixed-replace"""
     return Response(
-        generate_frames(),
+        broadcaster.stream(),
         mimetype='multipart/x-mixed-replace; boundary=frame'
     )
 
@@ -120,44 +169,35 @@ def video_feed():
 @app.route('/api/frame', methods=['GET'])
 def get_frame():
     """Get a single annotated frame with metrics as JSON"""
-    _, frame = webcam.read()
-
-    if frame is None:
-        return jsonify({
-            'error': 'Failed to capture frame from webcam'
-        }), 500
-
-    # Process frame with gaze tracking
-    gaze.refresh(frame)
-    annotated_frame = gaze.annotated_frame()
+    sample = pipeline.latest()
 
-    # Get metrics
-    left_pupil = gaze.pupil_left_coords()
-    right_pupil = gaze.pupil_right_coords()
-    horizontal = gaze.horizontal_ratio()
-    vertical = gaze.vertical_ratio()
+    if sample is None:
+        return no_frame_response()
 
-    # Encode frame as base64
-    ret, buffer = cv2.imencode('.jpg', annotated_frame)
-    frame_base64 = base64.b64encode(buffer).decode('utf-8')
+    # Encode frame as base64, reusing the JPEG of the video feed
+    frame_base64 = base64.b64encode(broadcaster.jpeg(sample)).decode('utf-8')
 
     return jsonify({
         'frame': frame_base64,
-        'metrics': {
-            'leftPupil': {
-                'x': left_pupil[0] if left_pupil else None,
-                'y': left_pupil[1] if left_pupil else None
-            },
-            'rightPupil': {
-                'x': right_pupil[0] if right_pupil else None,
-                'y': right_pupil[1] if right_pupil else None
-            },
-            'horizontal': horizontal,
-            'vertical': vertical
-        }
+        'metrics': sample.metrics,
+        'timestamp': sample.timestamp,
+        'frameId': sample.frame_id
     })
 
 
+@app.route('/api/frame.jpg', methods=['GET'])
+def get_frame_jpeg():
+    """Get a single annotated frame as a raw JPEG, with the metrics in the headers"""
+    sample = pipeline.latest()
+
+    if sample is None:
+        return no_frame_response()
+
+    headers = broadcaster.headers(sample)
+    headers['Cache-Control'] = 'no-store'
+    return Response(broadcaster.jpeg(sample), mimetype='image/jpeg', headers=headers)
+
+
 if __name__ == '__main__':
     # Run on 0.0.0.0 to accept connections from Docker network
     # Debug mode disabled to prevent reloader from interfering with camera
@@ -0,0 +1,177 @@
+"""
+ASGI API for GazeTracking serving many clients at once
+The clients upload their own frames, for example from a browser camera, and
+each one gets a session with its own GazeTracking state and calibration.
+
+Run with:
+    cd backend && uvicorn asgi:app --host 0.0.0.0 --port 8000
+
+Environment variables: GAZE_WORKERS (analysis threads, defaults to the number
+of CPUs), GAZE_MAX_SESSIONS (default 32) and GAZE_IDLE_TIMEOUT (seconds,
+default 60).
+"""
+
+import asyncio
+import contextlib
+import os
+import sys
+
+from starlette.applications import Starlette
+from starlette.middleware import Middleware
+from starlette.middleware.cors import CORSMiddleware
+from starlette.responses import JSONResponse
+from starlette.routing import Route, WebSocketRoute
+from starlette.websockets import WebSocketDisconnect
+
+# Add parent directory to path to import gaze_tracking
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+from gaze_tracking import GazeTracking
+from sessions import SessionManager, AdmissionError, AnalysisError
+
+# WebSocket close code telling the client to try again later
+TRY_AGAIN_LATER = 1013
+
+# The sessions only send numbers, so their trackers release the frames once
+# analyzed: an idle session only holds the reused grayscale buffer.
+# GAZE_CLOSED_THRESHOLD enables the detection of the closed eyes and of the blinks.
+closed_threshold = float(os.environ.get('GAZE_CLOSED_THRESHOLD', 0)) or None
+sessions = SessionManager(
+    lambda: GazeTracking(keep_frames=False, closed_threshold=closed_threshold),
+    max_sessions=int(os.environ.get('GAZE_MAX_SESSIONS', 32)),
+    idle_timeout=float(os.environ.get('GAZE_IDLE_TIMEOUT', 60)),
+    workers=int(os.environ.get('GAZE_WORKERS', 0)) or None
+)
+
+
+def error_response(message, status_code, **headers):
+    """JSON error response"""
+    return JSONResponse({'error': message}, status_code=status_code, headers=headers)
+
+
+def session_not_found():
+    """Response of the endpoints when the session doesn't exist or was evicted"""
+    return error_response('Unknown or expired session', 404)
+
+
+async def health_check(request):
+    """Health check endpoint"""
+    return JSONResponse({
+        'status': 'healthy',
+        'service': 'GazeTracking ASGI API',
+        'sessions': len(sessions),
+        'maxSessions': sessions.max_sessions
+    })
+
+
+async def get_stats(request):
+    """Counters of the server and latencies of every session"""
+    return JSONResponse(sessions.stats())
+
+
+async def create_session(request):
+    """Opens a session, or refuses it with 503 when the server is full"""
+    try:
+        session = sessions.create()
+    except AdmissionError as error:
+        return error_response(str(error), 503, **{'Retry-After': '5'})
+    return JSONResponse({'sessionId': session.id}, status_code=201)
+
+
+async def delete_session(request):
+    """Closes a session"""
+    if not sessions.close(request.path_params['session_id']):
+        return session_not_found()
+    return JSONResponse({'closed': True})
+
+
+async def session_stats(request):
+    """Counters and latencies of a session"""
+    session = sessions.get(request.path_params['session_id'])
+    if session is None:
+        return session_not_found()
+    return JSONResponse(session.stats())
+
+
+async def analyze_frame(request):
+    """Analyzes one JPEG or PNG frame sent as the request body"""
+    session = sessions.get(request.path_params['session_id'])
+    if session is None:
+        return session_not_found()
+
+    try:
+        result = await sessions.submit(session, await request.body())
+    except ValueError as error:
+        return error_response(str(error), 400)
+    except AnalysisError as error:
+        return error_response(str(error), 500)
+
+    if result is None:
+        return error_response('Frame dropped for a newer one of the same session', 409)
+    return JSONResponse(result)
+
+
+async def session_socket(websocket):
+    """WebSocket receiving binary frames and sending back the results as JSON.
+    Frames sent faster than they can be analyzed are dropped, so the results
+    always describe the latest frames."""
+    session = sessions.get(websocket.path_params['session_id'])
+    await websocket.accept()
+    if session is None:
+        await websocket.close(code=4404, reason='Unknown or expired session')
+        return
+
+    pending = set()
+
+    async def reply(data):
+        try:
+            result = await sessions.submit(session, data)
+        except (ValueError, AnalysisError) as error:
+            result = {'error': str(error)}
+        if result is not None:
+            await websocket.send_json(result)
+
+    try:
+        while not session.closed:
+            data = await websocket.receive_bytes()
+            if session.closed:
+                break
+            task = asyncio.ensure_future(reply(data))
+            pending.add(task)
+            task.add_done_callback(pending.discard)
+        await websocket.close(code=TRY_AGAIN_LATER, reason='Session expired')
+    except WebSocketDisconnect:
+        pass
+    finally:
+        for task in pending:
+            task.cancel()
+
+
+@contextlib.asynccontextmanager
+async def lifespan(app):
+    """Evicts the idle sessions in the background while the server runs"""
+    evictions = asyncio.ensure_future(sessions.run_evictions())
+    try:
+        yield
+    finally:
+        evictions.cancel()
+        sessions.shutdown()
+
+
+app = Starlette(
+    routes=[
+        Route('/api/health', health_check),
+        Route('/api/stats', get_stats),
+        Route('/api/sessions', create_session, methods=['POST']),
+        Route('/api/sessions/{session_id}', delete_session, methods=['DELETE']),
+        Route('/api/sessions/{session_id}/stats', session_stats),
+        Route('/api/sessions/{session_id}/frame', analyze_frame, methods=['POST']),
+        WebSocketRoute('/api/sessions/{session_id}/ws', session_socket),
+    ],
+    middleware=[Middleware(CORSMiddleware, allow_origins=['*'], allow_methods=['*'])],
+    lifespan=lifespan
+)
+
+
+if __name__ == '__main__':
+    import uvicorn
+    uvicorn.run(app, host='0.0.0.0', port=8000)
@@ -0,0 +1,220 @@
+"""
+Broadcast of the pipeline results to many clients.
+Each published frame is encoded at most once, as a JPEG for the MJPEG feed and
+as JSON for the metrics stream, and the same bytes are sent to every client.
+Clients always jump to the latest sample, so a slow client skips samples
+instead of queueing them.
+"""
+
+import json
+import threading
+import time
+import cv2
+
+
+# Headers of the raw JPEG frames, readable by the frontend (see CORS expose_headers)
+METRICS_HEADER = 'X-Gaze-Metrics'
+FRAME_HEADERS = [METRICS_HEADER, 'X-Frame-Id', 'X-Frame-Sequence', 'X-Frame-Timestamp']
+
+
+class FrameBroadcaster(object):
+    """
+    This class encodes the samples of a GazePipeline to JPEG once
+    and shares the encoded bytes between all the viewers.
+    """
+
+    def __init__(self, pipeline, quality=95, max_width=None):
+        """
+        Arguments:
+            pipeline (GazePipeline): Pipeline publishing the annotated frames
+            quality (int): JPEG quality, from 0 to 100
+            max_width (int): Frames wider than this are downscaled before encoding
+        """
+        self._pipeline = pipeline
+        self.quality = quality
+        self.max_width = max_width
+
+        self._lock = threading.Lock()
+        self._frame_id = None
+        self._jpeg = None
+        self._part = None
+
+        self.encoded_frames = 0
+        self.sent_frames = 0
+        self.skipped_frames = 0
+        self.subscribers = 0
+
+    def _encode(self, frame):
+        """Returns the frame encoded as JPEG, resized if needed"""
+        height, width = frame.shape[:2]
+        if self.max_width and width > self.max_width:
+            size = (self.max_width, int(round(height * self.max_width / width)))
+            frame = cv2.resize(frame, size, interpolation=cv2.INTER_AREA)
+
+        _, buffer = cv2.imencode('.jpg', frame, [cv2.IMWRITE_JPEG_QUALITY, self.quality])
+        return buffer.tobytes()
+
+    def _encoded(self, sample):
+        """Returns the JPEG bytes and the multipart part of a sample, encoding it only
+        if no other viewer did it before"""
+        with self._lock:
+            if self._frame_id != sample.frame_id:
+                self._jpeg = self._encode(sample.annotated_frame)
+                self._part = (b'--frame\r\n'
+                              b'Content-Type: image/jpeg\r\n\r\n' + self._jpeg + b'\r\n')
+                self._frame_id = sample.frame_id
+                self.encoded_frames += 1
+            return self._jpeg, self._part
+
+    def jpeg(self, sample):
+        """Returns the JPEG bytes of a sample
+
+        Argument:
+            sample (pipeline.Sample): Published sample
+        """
+        return self._encoded(sample)[0]
+
+    @staticmethod
+    def headers(sample):
+        """Returns the HTTP headers carrying the metrics of a sample sent as a raw JPEG
+
+        Argument:
+            sample (pipeline.Sample): Published sample
+        """
+        return {
+            METRICS_HEADER: json.dumps(sample.metrics, separators=(',', ':')),
+            'X-Frame-Id': str(sample.frame_id),
+            'X-Frame-Sequence': str(sample.sequence),
+            'X-Frame-Timestamp': repr(sample.timestamp),
+        }
+
+    def stream(self):
+        """Generator yielding the multipart parts of the latest frames, for one viewer"""
+        with self._lock:
+            self.subscribers += 1
+
+        try:
+            last_frame_id = -1
+            last_sequence = None
+            while self._pipeline.running:
+                sample = self._pipeline.wait_for_sample(last_frame_id)
+                if sample is None:
+                    continue
+
+                part = self._encoded(sample)[1]
+                with self._lock:
+                    self.sent_frames += 1
+                    if last_sequence is not None:
+                        self.skipped_frames += sample.sequence - last_sequence - 1
+                last_frame_id, last_sequence = sample.frame_id, sample.sequence
+                yield part
+        finally:
+            with self._lock:
+                self.subscribers -= 1
+
+    def stats(self):
+        """Returns the counters of the broadcast"""
+        return {
+            'subscribers': self.subscribers,
+            'encodedFrames': self.encoded_frames,
+            'sentFrames': self.sent_frames,
+            'skippedFrames': self.skipped_frames,
+            'jpegQuality': self.quality,
+            'maxWidth': self.max_width,
+        }
+
+
+class MetricsBroadcaster(object):
+    """
+    This class streams the metrics of every sample of a GazePipeline as
+    Server-Sent Events. Each sample is serialized once for all the clients.
+    """
+
+    def __init__(self, pipeline, max_rate=30, keepalive=15):
+        """
+        Arguments:
+            pipeline (GazePipeline): Pipeline publishing the metrics
+            max_rate (float): Maximum number of events per second sent to a client
+            keepalive (float): Seconds without sample after which a comment is sent
+                to keep the connection open
+        """
+        self._pipeline = pipeline
+        self.max_rate = max_rate
+        self.keepalive = keepalive
+
+        self._lock = threading.Lock()
+        self._frame_id = None
+        self._event = None
+
+        self.sent_events = 0
+        self.skipped_samples = 0
+        self.subscribers = 0
+
+    @staticmethod
+    def payload(sample):
+        """Returns the metrics of a sample with its timestamp and sequence number"""
+        data = dict(sample.metrics)
+        data['timestamp'] = sample.timestamp
+        data['frameId'] = sample.frame_id
+        data['sequence'] = sample.sequence
+        return data
+
+    def _serialized(self, sample):
+        """Returns the Server-Sent Event of a sample, serializing it only once"""
+        with self._lock:
+            if self._frame_id != sample.frame_id:
+                data = json.dumps(self.payload(sample), separators=(',', ':'))
+                self._event = 'id: {}\nevent: metrics\ndata: {}\n\n'.format(sample.sequence, data).encode('utf-8')
+                self._frame_id = sample.frame_id
+            return self._event
+
+    def stream(self):
+        """Generator yielding the Server-Sent Events of the latest samples, for one client.
+        The server only pulls the next event once the previous one is written, and the
+        client gets the latest sample at that time, so a slow client never builds a backlog.
+        """
+        with self._lock:
+            self.subscribers += 1
+
+        min_interval = 1.0 / self.max_rate if self.max_rate else 0
+        try:
+            # Tells the browser to reconnect after one second if the connection drops
+            yield b'retry: 1000\n\n'
+
+            last_frame_id = -1
+            last_sequence = None
+            last_emit = time.perf_counter()
+            next_emit = 0
+            while self._pipeline.running:
+                delay = next_emit - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+
+                sample = self._pipeline.wait_for_sample(last_frame_id)
+                if sample is None:
+                    if time.perf_counter() - last_emit >= self.keepalive:
+                        last_emit = time.perf_counter()
+                        yield b': keepalive\n\n'
+                    continue
+
+                event = self._serialized(sample)
+                with self._lock:
+                    self.sent_events += 1
+                    if last_sequence is not None:
+                        self.skipped_samples += sample.sequence - last_sequence - 1
+                last_frame_id, last_sequence = sample.frame_id, sample.sequence
+                last_emit = time.perf_counter()
+                next_emit = time.perf_counter() + min_interval
+                yield event
+        finally:
+            with self._lock:
+                self.subscribers -= 1
+
+    def stats(self):
+        """Returns the counters of the metrics stream"""
+        return {
+            'subscribers': self.subscribers,
+            'sentEvents': self.sent_events,
+            'skippedSamples': self.skipped_samples,
+            'maxRate': self.max_rate,
+        }
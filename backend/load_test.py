@@ -0,0 +1,132 @@
+"""
+Synthetic load client of the ASGI backend (see asgi.py).
+Opens several sessions that each send frames over their WebSocket at a fixed
+rate, then prints the round-trip latencies seen by the clients and the
+statistics of the server.
+
+Usage:
+    python backend/load_test.py --sessions 8 --fps 15 --duration 10 [--image face.jpg]
+"""
+
+from __future__ import division, print_function
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+import urllib.error
+import urllib.request
+import numpy as np
+import cv2
+import websockets
+
+# Add parent directory to path to import the benchmark fixtures
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+
+def synthetic_frame(width=640, height=480):
+    """Returns the face of the benchmark fixtures on a frame, encoded as JPEG.
+    A drawn face isn't found by the detector, so the latencies wouldn't
+    include the landmarks and the pupils."""
+    # Imported here, --image doesn't need the benchmarks directory
+    from benchmarks.fixtures import face_frame
+    return cv2.imencode('.jpg', face_frame(width, height))[1].tobytes()
+
+
+def http(method, url):
+    """Sends a request without body and returns the status code and the JSON response"""
+    request = urllib.request.Request(url, method=method)
+    try:
+        with urllib.request.urlopen(request) as response:
+            return response.status, json.loads(response.read())
+    except urllib.error.HTTPError as error:
+        return error.code, json.loads(error.read())
+
+
+async def client(base_url, frame, fps, duration, results):
+    """Opens a session and sends frames over its WebSocket during duration seconds"""
+    status, body = await asyncio.to_thread(http, 'POST', base_url + '/api/sessions')
+    if status != 201:
+        results['rejected'] += 1
+        return
+    session_id = body['sessionId']
+
+    ws_url = base_url.replace('http', 'ws', 1) + '/api/sessions/{}/ws'.format(session_id)
+    sent = {}
+    async with websockets.connect(ws_url, max_size=None) as websocket:
+        async def receive():
+            async for message in websocket:
+                reply = json.loads(message)
+                if 'frame' in reply:
+                    results['latencies'].append(time.perf_counter() - sent.pop(reply['frame']))
+                    results['received'] += 1
+                    # The eye openness is null when no face was found
+                    if reply['metrics'].get('eyeOpenness') is not None:
+                        results['faces'] += 1
+
+        receiver = asyncio.ensure_future(receive())
+        end = time.perf_counter() + duration
+        index = 0
+        while time.perf_counter() < end:
+            index += 1
+            sent[index] = time.perf_counter()
+            await websocket.send(frame)
+            results['sent'] += 1
+            await asyncio.sleep(1 / fps)
+
+        # Leaves time for the last results to come back
+        await asyncio.sleep(1)
+        receiver.cancel()
+
+    await asyncio.to_thread(http, 'DELETE', base_url + '/api/sessions/' + session_id)
+
+
+async def run(args, frame):
+    results = {'sent': 0, 'received': 0, 'rejected': 0, 'faces': 0, 'latencies': []}
+    start = time.perf_counter()
+    await asyncio.gather(*[client(args.url, frame, args.fps, args.duration, results)
+                           for _ in range(args.sessions)])
+    elapsed = time.perf_counter() - start
+    _, stats = await asyncio.to_thread(http, 'GET', args.url + '/api/stats')
+    return results, elapsed, stats
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--url', default='http://localhost:8000', help="Base URL of the ASGI backend")
+    parser.add_argument('--sessions', type=int, default=8, help="Number of concurrent sessions")
+    parser.add_argument('--fps', type=float, default=15, help="Frames sent per second by each session")
+    parser.add_argument('--duration', type=float, default=10, help="Seconds of load")
+    parser.add_argument('--image', help="Image sent as frame instead of the synthetic one")
+    args = parser.parse_args()
+
+    if args.image:
+        frame = cv2.imread(args.image)
+        if frame is None:
+            parser.error("Unable to read " + args.image)
+        frame = cv2.imencode('.jpg', frame)[1].tobytes()
+    else:
+        frame = synthetic_frame()
+
+    results, elapsed, stats = asyncio.run(run(args, frame))
+
+    latencies = np.array(results['latencies']) * 1000
+    print("Sessions: {} opened, {} rejected".format(args.sessions - results['rejected'], results['rejected']))
+    print("Frames: {} sent, {} analyzed ({:.1f} fps), {} dropped by the server".format(
+        results['sent'], results['received'], results['received'] / elapsed,
+        results['sent'] - results['received']))
+    if results['received']:
+        print("Faces found in {:.0%} of the analyzed frames".format(results['faces'] / results['received']))
+        if not results['faces']:
+            print("WARNING: no face was found, the latencies don't include the landmarks and the pupils")
+    if len(latencies):
+        p50, p95, p99 = np.percentile(latencies, [50, 95, 99])
+        print("Round trip: p50 {:.1f} ms, p95 {:.1f} ms, p99 {:.1f} ms, max {:.1f} ms".format(
+            p50, p95, p99, latencies.max()))
+    print("Server: {} workers, {} sessions created, {} rejected, {} evicted".format(
+        stats['workers'], stats['createdSessions'], stats['rejectedSessions'], stats['evictedSessions']))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,223 @@
+"""
+Capture and inference pipeline of the backend.
+A single thread reads the camera into a bounded queue that only keeps the
+latest frames, and a single worker analyzes them with GazeTracking and
+publishes the results. Endpoints only read the published results, so the
+inference cost doesn't depend on the number of connected clients.
+"""
+
+import threading
+import time
+from collections import deque
+
+
+def gaze_metrics(gaze):
+    """Returns the metrics of the last frame analyzed by a GazeTracking instance
+
+    Arguments:
+        gaze (GazeTracking): Tracker that has just been refreshed
+    """
+    left_pupil = gaze.pupil_left_coords()
+    right_pupil = gaze.pupil_right_coords()
+    openness = gaze.eye_openness()
+
+    return {
+        'leftPupil': {
+            'x': int(left_pupil[0]) if left_pupil else None,
+            'y': int(left_pupil[1]) if left_pupil else None
+        },
+        'rightPupil': {
+            'x': int(right_pupil[0]) if right_pupil else None,
+            'y': int(right_pupil[1]) if right_pupil else None
+        },
+        'horizontal': gaze.horizontal_ratio(),
+        'vertical': gaze.vertical_ratio(),
+        'eyeOpenness': round(openness, 3) if openness is not None else None,
+        'blinking': gaze.is_blinking()
+    }
+
+
+class LatestFrameQueue(object):
+    """
+    Bounded queue that drops its oldest item when a new one is put while it is full,
+    so a slow consumer always gets the most recent frames.
+    """
+
+    def __init__(self, maxsize=1):
+        self._items = deque()
+        self._maxsize = maxsize
+        self._condition = threading.Condition()
+        self.dropped = 0
+
+    def put(self, item):
+        """Adds an item, dropping the oldest one if the queue is full"""
+        with self._condition:
+            if len(self._items) >= self._maxsize:
+                self._items.popleft()
+                self.dropped += 1
+            self._items.append(item)
+            self._condition.notify()
+
+    def get(self, timeout=None):
+        """Removes and returns the oldest item, or None after timeout seconds"""
+        with self._condition:
+            if not self._items:
+                self._condition.wait(timeout)
+            if not self._items:
+                return None
+            return self._items.popleft()
+
+
+class Sample(object):
+    """
+    Results of the analysis of one frame, published by the pipeline.
+    Samples are never modified once published.
+    """
+
+    def __init__(self, frame_id, sequence, timestamp, annotated_frame, metrics):
+        self.frame_id = frame_id
+        self.sequence = sequence
+        self.timestamp = timestamp
+        self.annotated_frame = annotated_frame
+        self.metrics = metrics
+
+
+class GazePipeline(object):
+    """
+    This class runs the capture thread and the inference worker of the backend
+    and holds the latest published sample.
+    """
+
+    def __init__(self, capture, gaze, queue_size=1):
+        """
+        Arguments:
+            capture: Frame source with a read() method, like cv2.VideoCapture
+            gaze (GazeTracking): Tracker used by the inference worker only
+            queue_size (int): Number of captured frames waiting for the inference worker
+        """
+        self._capture = capture
+        self._gaze = gaze
+        self._queue = LatestFrameQueue(queue_size)
+        self._running = threading.Event()
+        self._threads = []
+
+        self._condition = threading.Condition()
+        self._latest = None
+
+        self.captured_frames = 0
+        self.capture_failures = 0
+        self.processed_frames = 0
+        self.inference_failures = 0
+        self.last_inference_error = None
+        self.inference_time = 0.0
+
+        # Calibration.metrics() of the last analyzed frame, read by the inference
+        # worker only, since the thresholds change while a frame is analyzed
+        self.calibration_metrics = None
+
+    def start(self):
+        """Starts the capture thread and the inference worker"""
+        if self._running.is_set():
+            return
+        self._running.set()
+        self._threads = [
+            threading.Thread(target=self._capture_loop, name='capture', daemon=True),
+            threading.Thread(target=self._inference_loop, name='inference', daemon=True),
+        ]
+        for thread in self._threads:
+            thread.start()
+
+    def stop(self):
+        """Stops the threads and wakes up the clients waiting for a sample"""
+        self._running.clear()
+        for thread in self._threads:
+            thread.join()
+        self._threads = []
+        with self._condition:
+            self._condition.notify_all()
+
+    @property
+    def running(self):
+        """Returns true if the threads are running"""
+        return self._running.is_set()
+
+    def _capture_loop(self):
+        """Reads the frames as fast as the camera delivers them"""
+        frame_id = 0
+        while self._running.is_set():
+            success, frame = self._capture.read()
+            if not success or frame is None:
+                # A replayed recording without loop is over, the last sample stays published
+                if getattr(self._capture, 'finished', False):
+                    break
+                self.capture_failures += 1
+                time.sleep(0.05)
+                continue
+
+            frame_id += 1
+            self.captured_frames += 1
+            self._queue.put((frame_id, time.time(), frame))
+
+    def _inference_loop(self):
+        """Analyzes the latest captured frame and publishes the results"""
+        while self._running.is_set():
+            item = self._queue.get(timeout=0.1)
+            if item is None:
+                continue
+
+            frame_id, timestamp, frame = item
+            start = time.perf_counter()
+            try:
+                self._gaze.refresh(frame)
+                sample = Sample(frame_id, self.processed_frames, timestamp,
+                                self._gaze.annotated_frame(), gaze_metrics(self._gaze))
+                self.calibration_metrics = self._gaze.calibration.metrics()
+            except Exception as error:
+                # A frame that can't be analyzed must not stop the only inference worker
+                self.inference_failures += 1
+                self.last_inference_error = repr(error)
+                continue
+            self.inference_time += time.perf_counter() - start
+            self.processed_frames += 1
+            self._publish(sample)
+
+    def _publish(self, sample):
+        """Makes a sample the latest one and wakes up the clients waiting for it"""
+        with self._condition:
+            self._latest = sample
+            self._condition.notify_all()
+
+    def latest(self):
+        """Returns the latest published sample, or None if no frame was analyzed yet"""
+        return self._latest
+
+    def wait_for_sample(self, last_frame_id, timeout=1.0):
+        """Waits for a sample more recent than last_frame_id and returns it,
+        or returns None after timeout seconds
+
+        Arguments:
+            last_frame_id (int): Identifier of the last sample seen by the caller, or -1
+            timeout (float): Maximum waiting time in seconds
+        """
+        with self._condition:
+            if self._latest is None or self._latest.frame_id <= last_frame_id:
+                self._condition.wait(timeout)
+            sample = self._latest
+        if sample is None or sample.frame_id <= last_frame_id:
+            return None
+        return sample
+
+    def stats(self):
+        """Returns the counters of the pipeline"""
+        processed = self.processed_frames
+        return {
+            'capturedFrames': self.captured_frames,
+            'captureFailures': self.capture_failures,
+            'processedFrames': processed,
+            'inferenceFailures': self.inference_failures,
+            'lastInferenceError': self.last_inference_error,
+            'droppedFrames': self._queue.dropped,
+            'meanInferenceMs': self.inference_time / processed * 1000 if processed else None,
+            'sourceFinished': getattr(self._capture, 'finished', False),
+            'calibration': self.calibration_metrics,
+        }
@@ -0,0 +1,287 @@
+"""
+Sessions of the ASGI backend (see asgi.py).
+Each session analyzes the frames uploaded by one client with its own
+GazeTracking instance, so the face tracking state and the calibration of a
+client never leak into another one. The analysis runs on a bounded thread
+pool shared by all the sessions, and the event loop only waits for it.
+"""
+
+import asyncio
+import itertools
+import os
+import threading
+import time
+import uuid
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+import cv2
+
+from pipeline import gaze_metrics
+
+
+class AdmissionError(Exception):
+    """Raised when a session is refused because the server is full"""
+
+
+class AnalysisError(Exception):
+    """Raised when the analysis of a valid frame fails"""
+
+
+class LatencyStats(object):
+    """Latencies of the last frames analyzed by a session"""
+
+    def __init__(self, window=500):
+        """
+        Argument:
+            window (int): Number of frames kept to compute the percentiles
+        """
+        self._queue_times = deque(maxlen=window)
+        self._total_times = deque(maxlen=window)
+
+    def add(self, queue_time, total_time):
+        """Records the latencies of one frame
+
+        Arguments:
+            queue_time (float): Seconds waited before the analysis started
+            total_time (float): Seconds between the reception of the frame and its results
+        """
+        self._queue_times.append(queue_time)
+        self._total_times.append(total_time)
+
+    def summary(self):
+        """Returns the latency percentiles in milliseconds"""
+        if not self._total_times:
+            return {'meanMs': None, 'p50Ms': None, 'p95Ms': None, 'maxMs': None, 'meanQueueMs': None}
+
+        total = np.array(self._total_times) * 1000
+        p50, p95 = np.percentile(total, [50, 95])
+        return {
+            'meanMs': float(total.mean()),
+            'p50Ms': float(p50),
+            'p95Ms': float(p95),
+            'maxMs': float(total.max()),
+            'meanQueueMs': float(np.mean(self._queue_times) * 1000),
+        }
+
+
+class Session(object):
+    """
+    State of one client: its GazeTracking instance, its activity and its latencies.
+    Only one frame of a session is analyzed at a time, and a frame still waiting
+    when a newer one arrives is dropped.
+    """
+
+    def __init__(self, session_id, gaze):
+        """
+        Arguments:
+            session_id (str): Identifier given to the client
+            gaze (GazeTracking): Tracker only used by this session
+        """
+        self.id = session_id
+        self.gaze = gaze
+        self.created = time.monotonic()
+        self.last_seen = self.created
+        self.closed = False
+
+        self.latency = LatencyStats()
+        self.received_frames = 0
+        self.processed_frames = 0
+        self.dropped_frames = 0
+        self.failed_frames = 0
+
+        self._lock = asyncio.Lock()
+        self._waiting = None
+
+    def close(self):
+        """Marks the session as closed and stops the threads of its tracker. A
+        frame being analyzed stops them once it is done, see SessionManager.submit()."""
+        self.closed = True
+        if not self._lock.locked():
+            self.gaze.close()
+
+    def stats(self):
+        """Returns the counters and latencies of the session"""
+        stats = {
+            'sessionId': self.id,
+            'ageSeconds': time.monotonic() - self.created,
+            'idleSeconds': time.monotonic() - self.last_seen,
+            'receivedFrames': self.received_frames,
+            'processedFrames': self.processed_frames,
+            'droppedFrames': self.dropped_frames,
+            'failedFrames': self.failed_frames,
+            'calibrated': self.gaze.calibration.is_complete(),
+        }
+        stats.update(self.latency.summary())
+        return stats
+
+
+def _analyze(gaze, data, received):
+    """Decodes a JPEG/PNG frame and analyzes it, in a thread of the executor.
+    Returns the metrics and the time at which the analysis started."""
+    started = time.perf_counter()
+    frame = cv2.imdecode(np.frombuffer(data, np.uint8), cv2.IMREAD_COLOR)
+    if frame is None:
+        raise ValueError("Unable to decode the frame")
+
+    gaze.refresh(frame)
+    return gaze_metrics(gaze), started - received
+
+
+class SessionManager(object):
+    """
+    This class creates, serves and evicts the sessions, and runs their
+    analyses on a bounded executor.
+    """
+
+    def __init__(self, gaze_factory, max_sessions=32, idle_timeout=60, workers=None):
+        """
+        Arguments:
+            gaze_factory (callable): Returns a new GazeTracking for each session
+            max_sessions (int): Sessions beyond this number are refused
+            idle_timeout (float): Seconds without frame after which a session is evicted
+            workers (int): Number of threads analyzing the frames, defaults to the number of CPUs
+        """
+        self._gaze_factory = gaze_factory
+        self.max_sessions = max_sessions
+        self.idle_timeout = idle_timeout
+        self.workers = workers or os.cpu_count() or 1
+        self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='gaze')
+
+        self._sessions = {}
+        self._lock = threading.Lock()
+        self._sequence = itertools.count(1)
+
+        self.created_sessions = 0
+        self.rejected_sessions = 0
+        self.evicted_sessions = 0
+
+    def __len__(self):
+        return len(self._sessions)
+
+    def create(self):
+        """Creates a session and returns it
+
+        Raises:
+            AdmissionError: If max_sessions sessions are already open
+        """
+        with self._lock:
+            if len(self._sessions) >= self.max_sessions:
+                self.rejected_sessions += 1
+                raise AdmissionError("Server full: {} sessions open".format(len(self._sessions)))
+
+            session_id = '{}-{}'.format(next(self._sequence), uuid.uuid4().hex[:12])
+            session = Session(session_id, self._gaze_factory())
+            self._sessions[session_id] = session
+            self.created_sessions += 1
+        return session
+
+    def get(self, session_id):
+        """Returns an open session, or None if it doesn't exist or was evicted"""
+        return self._sessions.get(session_id)
+
+    def close(self, session_id):
+        """Closes a session. Returns false if it didn't exist."""
+        with self._lock:
+            session = self._sessions.pop(session_id, None)
+        if session is None:
+            return False
+        session.close()
+        return True
+
+    def evict_idle(self, now=None):
+        """Closes the sessions without frame for more than idle_timeout seconds
+        and returns their identifiers"""
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            expired = [s for s in self._sessions.values() if now - s.last_seen > self.idle_timeout]
+            for session in expired:
+                del self._sessions[session.id]
+                session.close()
+            self.evicted_sessions += len(expired)
+        return [session.id for session in expired]
+
+    async def run_evictions(self, interval=5):
+        """Evicts the idle sessions every interval seconds, until cancelled"""
+        while True:
+            await asyncio.sleep(interval)
+            self.evict_idle()
+
+    async def submit(self, session, data):
+        """Analyzes a frame of a session without blocking the event loop.
+
+        Arguments:
+            session (Session): Session that received the frame
+            data (bytes): Encoded frame, JPEG or PNG
+
+        Returns:
+            A dict with the metrics, the index of the frame in the session and its
+            latency, or None if the frame was dropped for a newer one
+
+        Raises:
+            ValueError: If the frame can't be decoded
+            AnalysisError: If the analysis of the frame raised another error
+        """
+        received = time.perf_counter()
+        session.last_seen = time.monotonic()
+        session.received_frames += 1
+        index = session.received_frames
+
+        # A frame of this session still waiting for the analysis is outdated
+        if session._waiting is not None and not session._waiting.done():
+            session._waiting.set_result(False)
+            session.dropped_frames += 1
+        ticket = asyncio.get_running_loop().create_future()
+        session._waiting = ticket
+
+        async with session._lock:
+            if ticket.done():
+                return None
+            ticket.set_result(True)
+
+            loop = asyncio.get_running_loop()
+            try:
+                metrics, queue_time = await loop.run_in_executor(
+                    self._executor, _analyze, session.gaze, data, received)
+            except ValueError:
+                session.failed_frames += 1
+                raise
+            except Exception as error:
+                session.failed_frames += 1
+                raise AnalysisError("Analysis failed: {!r}".format(error)) from error
+            finally:
+                if session.closed:
+                    session.gaze.close()
+
+        total_time = time.perf_counter() - received
+        session.latency.add(queue_time, total_time)
+        session.processed_frames += 1
+        return {
+            'frame': index,
+            'metrics': metrics,
+            'latencyMs': total_time * 1000,
+        }
+
+    def stats(self):
+        """Returns the counters of the server and of every session"""
+        sessions = list(self._sessions.values())
+        return {
+            'sessions': len(sessions),
+            'maxSessions': self.max_sessions,
+            'workers': self.workers,
+            'idleTimeout': self.idle_timeout,
+            'createdSessions': self.created_sessions,
+            'rejectedSessions': self.rejected_sessions,
+            'evictedSessions': self.evicted_sessions,
+            'processedFrames': sum(s.processed_frames for s in sessions),
+            'droppedFrames': sum(s.dropped_frames for s in sessions),
+            'perSession': [s.stats() for s in sessions],
+        }
+
+    def shutdown(self):
+        """Closes all the sessions and stops the executor"""
+        with self._lock:
+            for session in self._sessions.values():
+                session.close()
+            self._sessions.clear()
+        self._executor.shutdown(wait=False)
@@ -0,0 +1,275 @@
+"""
+Frame sources of the backend.
+Every source has the read() and release() methods of cv2.VideoCapture, so the
+capture thread of the pipeline reads a webcam, a recorded video, a directory
+of images or frames generated in memory the same way. A source can be paced
+to a target frame rate and replayed in a loop, which makes the load tests and
+the latency measurements of the server reproducible without a camera.
+
+The source of app.py is chosen with GAZE_SOURCE (see open_source()).
+"""
+
+from __future__ import division
+import abc
+import os
+import time
+import cv2
+
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.bmp')
+
+# Devices tried in order by WebcamSource: (device, API, description)
+WEBCAM_ATTEMPTS = [
+    (0, cv2.CAP_ANY, "index 0 with CAP_ANY"),
+    ('/dev/video0', cv2.CAP_V4L2, "/dev/video0 with CAP_V4L2"),
+    (1, cv2.CAP_ANY, "index 1 with CAP_ANY"),
+]
+
+
+class FrameSource(abc.ABC):
+    """
+    Base class of the sources. Subclasses return their next frame from
+    _next_frame(), or None at the end, and go back to their first frame
+    in _rewind(). Once a source without loop is finished, read() fails
+    and finished is True.
+    """
+
+    def __init__(self, fps=None, loop=False):
+        """
+        Arguments:
+            fps (float): Target frame rate, read() waits to deliver at most fps
+                frames per second. None or 0 delivers the frames as fast as possible.
+            loop (bool): Starts again from the first frame at the end
+        """
+        self.interval = 1 / fps if fps else 0
+        self.loop = loop
+        self.finished = False
+        self.frames_read = 0
+        self._next_time = None
+
+    def _pace(self):
+        """Waits until the time of the next frame. A reader late by more than
+        one frame doesn't get a burst of frames to catch up."""
+        if not self.interval:
+            return
+        now = time.monotonic()
+        if self._next_time is None or now - self._next_time > self.interval:
+            self._next_time = now
+        elif self._next_time > now:
+            time.sleep(self._next_time - now)
+        self._next_time += self.interval
+
+    @abc.abstractmethod
+    def _next_frame(self):
+        """Returns the next frame, or None at the end of the source"""
+
+    @abc.abstractmethod
+    def _rewind(self):
+        """Goes back to the first frame"""
+
+    def read(self):
+        """Returns (success, frame) like cv2.VideoCapture.read()"""
+        if self.finished:
+            return False, None
+
+        self._pace()
+        frame = self._next_frame()
+        if frame is None and self.loop and self.frames_read:
+            self._rewind()
+            frame = self._next_frame()
+        if frame is None:
+            self.finished = True
+            return False, None
+
+        self.frames_read += 1
+        return True, frame
+
+    def release(self):
+        """Releases the resources of the source"""
+        pass
+
+
+class WebcamSource(FrameSource):
+    """
+    Reads the first camera that opens among the devices of WEBCAM_ATTEMPTS.
+    A camera never finishes, read() fails while no frame is available.
+    """
+
+    def __init__(self, device=None, fps=None):
+        """
+        Arguments:
+            device: Index or path of the camera, the WEBCAM_ATTEMPTS are tried if None
+            fps (float): Target frame rate, the rate of the camera if None
+        """
+        super(WebcamSource, self).__init__(fps)
+        attempts = WEBCAM_ATTEMPTS if device is None else [(device, cv2.CAP_ANY, "device {}".format(device))]
+
+        self._capture = None
+        for device, api, description in attempts:
+            self._capture = cv2.VideoCapture(device, api)
+            if self._capture.isOpened():
+                print("Successfully opened camera using {}".format(description))
+                break
+            print("Failed to open camera using {}".format(description))
+        else:
+            print("WARNING: Could not open any camera!")
+            self._capture = cv2.VideoCapture(0)  # Fallback
+
+    def _next_frame(self):
+        success, frame = self._capture.read()
+        return frame if success else None
+
+    def _rewind(self):
+        # A camera has no first frame to go back to
+        pass
+
+    def read(self):
+        self._pace()
+        frame = self._next_frame()
+        if frame is None:
+            return False, None
+        self.frames_read += 1
+        return True, frame
+
+    def release(self):
+        self._capture.release()
+
+
+class VideoFileSource(FrameSource):
+    """Replays a recorded video file"""
+
+    def __init__(self, path, fps=None, loop=False):
+        """
+        Arguments:
+            path (str): Path of the video file
+            fps (float): Target frame rate, as fast as possible if None
+            loop (bool): Starts again from the first frame at the end
+        """
+        super(VideoFileSource, self).__init__(fps, loop)
+        self.path = path
+        self._capture = cv2.VideoCapture(path)
+        if not self._capture.isOpened():
+            raise IOError("Unable to open video file: " + path)
+
+    def _next_frame(self):
+        success, frame = self._capture.read()
+        return frame if success else None
+
+    def _rewind(self):
+        self._capture.set(cv2.CAP_PROP_POS_FRAMES, 0)
+
+    def release(self):
+        self._capture.release()
+
+
+class ImageDirectorySource(FrameSource):
+    """Replays the images of a directory in the order of their names, like
+    the frames of a recorded session. Each image is decoded when it is read."""
+
+    def __init__(self, path, fps=None, loop=False):
+        """
+        Arguments:
+            path (str): Path of the directory
+            fps (float): Target frame rate, as fast as possible if None
+            loop (bool): Starts again from the first image at the end
+        """
+        super(ImageDirectorySource, self).__init__(fps, loop)
+        self.paths = sorted(os.path.join(path, name) for name in os.listdir(path)
+                            if name.lower().endswith(IMAGE_EXTENSIONS))
+        if not self.paths:
+            raise IOError("No image found in directory: " + path)
+        self._index = 0
+
+    def _next_frame(self):
+        while self._index < len(self.paths):
+            frame = cv2.imread(self.paths[self._index])
+            self._index += 1
+            if frame is not None:
+                return frame
+        return None
+
+    def _rewind(self):
+        self._index = 0
+
+
+class SyntheticSource(FrameSource):
+    """
+    Delivers frames held in memory, so reading costs nothing and the
+    measurements only depend on the server. The frames are either given, or
+    generated from a face image drifting on a small circle, like a user
+    sitting in front of a webcam, by default the face of the benchmark fixtures.
+    """
+
+    def __init__(self, frames=None, image=None, width=640, height=480, nb_frames=30, fps=None, loop=True):
+        """
+        Arguments:
+            frames (list): Frames to deliver, generated if None
+            image (str): Path of the face image of the generated frames, the
+                face of the benchmark fixtures (benchmarks/data/face.jpg) if None
+            width (int): Width of the generated frames
+            height (int): Height of the generated frames
+            nb_frames (int): Number of generated frames
+            fps (float): Target frame rate, as fast as possible if None
+            loop (bool): Starts again from the first frame at the end
+        """
+        super(SyntheticSource, self).__init__(fps, loop)
+        if frames is None:
+            frames = self.generate(image, width, height, nb_frames)
+        self.frames = list(frames)
+        self._index = 0
+
+    @staticmethod
+    def generate(image, width, height, nb_frames):
+        """Returns the frames of a face drifting on a circle of 1% of the height"""
+        # Imported here, so only the synthetic source needs the benchmarks
+        # directory. The repository root is on the path, like for gaze_tracking.
+        from benchmarks.fixtures import face_clip
+
+        face = None
+        if image is not None:
+            face = cv2.imread(image)
+            if face is None:
+                raise IOError("Unable to read image: " + image)
+        return face_clip(width, height, nb_frames, face)
+
+    def _next_frame(self):
+        if self._index >= len(self.frames):
+            return None
+        frame = self.frames[self._index]
+        self._index += 1
+        return frame
+
+    def _rewind(self):
+        self._index = 0
+
+
+def open_source(spec=None, fps=None, loop=None):
+    """Returns the frame source described by spec:
+
+    - 'webcam' or 'webcam:<index or path>': a camera
+    - 'video:<path>': a video file
+    - 'images:<directory>': the images of a directory
+    - 'synthetic' or 'synthetic:<face image>': frames generated in memory
+
+    Arguments:
+        spec (str): Description of the source, 'webcam' if None or empty
+        fps (float): Target frame rate, None for the rate of the source
+        loop (bool): Replays the source in a loop, None for the default of the
+            source (only the synthetic frames loop by default)
+    """
+    kind, _, argument = (spec or 'webcam').partition(':')
+    options = {'fps': fps}
+    if loop is not None and kind != 'webcam':
+        options['loop'] = loop
+
+    if kind == 'webcam':
+        device = None
+        if argument:
+            device = int(argument) if argument.isdigit() else argument
+        return WebcamSource(device, **options)
+    if kind == 'video':
+        return VideoFileSource(argument, **options)
+    if kind == 'images':
+        return ImageDirectorySource(argument, **options)
+    if kind == 'synthetic':
+        return SyntheticSource(image=argument or None, **options)
+    raise ValueError("Unknown frame source: {}".format(spec))
@@ -0,0 +1,85 @@
+"""
+End-to-end throughput and latency of the backend pipeline, without a camera.
+Feeds the capture thread and the inference worker of backend/pipeline.py with
+a frame source paced at a target frame rate, and measures like a client of
+the video feed: the rate of the published samples and the delay between the
+capture of a frame and the moment its results reach the client.
+
+The source is the face clip of the fixtures by default, or any GAZE_SOURCE
+description of backend/sources.py, such as a recorded session.
+
+Usage:
+    python benchmarks/backend_pipeline.py [--fps 30] [--duration 10] [--source video:session.mp4]
+"""
+
+from __future__ import division, print_function
+import argparse
+import os
+import sys
+import time
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'backend'))
+from gaze_tracking import GazeTracking, models
+from pipeline import GazePipeline
+from sources import SyntheticSource, open_source
+from fixtures import face_clip, RESOLUTIONS
+
+
+def run(source, duration):
+    """Runs the pipeline on the source during duration seconds, or until the
+    source is finished, and returns the latencies in seconds and the stats"""
+    pipeline = GazePipeline(source, GazeTracking())
+    latencies = []
+    pipeline.start()
+    start = time.time()
+    last_frame_id = -1
+    try:
+        while time.time() - start < duration:
+            sample = pipeline.wait_for_sample(last_frame_id, timeout=0.5)
+            if sample is None:
+                if source.finished:
+                    break
+                continue
+            latencies.append(time.time() - sample.timestamp)
+            last_frame_id = sample.frame_id
+    finally:
+        elapsed = time.time() - start
+        pipeline.stop()
+        source.release()
+    return np.array(latencies), pipeline.stats(), elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--fps', type=float, default=30, help="Frame rate of the source, 0 for as fast as possible")
+    parser.add_argument('--duration', type=float, default=10)
+    parser.add_argument('--resolution', choices=sorted(RESOLUTIONS), default='480p')
+    parser.add_argument('--source', help="Frame source, like video:session.mp4 (see backend/sources.py)")
+    parser.add_argument('--loop', action='store_true', help="Replays the source in a loop")
+    args = parser.parse_args()
+
+    models.preload()
+    if args.source:
+        source = open_source(args.source, fps=args.fps or None, loop=args.loop or None)
+    else:
+        source = SyntheticSource(face_clip(*RESOLUTIONS[args.resolution], nb_frames=30), fps=args.fps or None)
+
+    latencies, stats, elapsed = run(source, args.duration)
+    if not len(latencies):
+        print("No sample published")
+        return
+
+    latencies *= 1000
+    print("source: {} frames at {:.1f} fps".format(stats['capturedFrames'], stats['capturedFrames'] / elapsed))
+    print("published: {} samples at {:.1f} fps, {} frames dropped ({:.0%})".format(
+        stats['processedFrames'], stats['processedFrames'] / elapsed, stats['droppedFrames'],
+        stats['droppedFrames'] / max(stats['capturedFrames'], 1)))
+    print("inference: {:.1f} ms per frame".format(stats['meanInferenceMs']))
+    print("capture to client latency: p50 {:.1f} ms, p95 {:.1f} ms, max {:.1f} ms".format(
+        np.percentile(latencies, 50), np.percentile(latencies, 95), latencies.max()))
+
+
+if __name__ == '__main__':
+    main()
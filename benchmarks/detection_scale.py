@@ -0,0 +1,94 @@
+"""
+Benchmark of the face detection scale of GazeTracking.
+Shows the latency of refresh() and the pupil deviation against the full
+resolution detection for each detection scale.
+
+Usage:
+    python benchmarks/detection_scale.py <video or image> [--width 1920] [--frames 100]
+"""
+
+from __future__ import division, print_function
+import argparse
+import os
+import sys
+import time
+import cv2
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+from gaze_tracking import GazeTracking
+
+
+def load_frames(path, nb_frames, width):
+    """Returns a list of BGR frames read from a video or an image file"""
+    image = cv2.imread(path)
+    if image is not None:
+        frames = [image] * nb_frames
+    else:
+        capture = cv2.VideoCapture(path)
+        frames = []
+        while len(frames) < nb_frames:
+            success, frame = capture.read()
+            if not success:
+                break
+            frames.append(frame)
+        capture.release()
+
+    if not frames:
+        sys.exit("Could not read any frame from " + path)
+
+    if width:
+        height = int(round(frames[0].shape[0] * width / frames[0].shape[1]))
+        frames = [cv2.resize(frame, (width, height), interpolation=cv2.INTER_LINEAR) for frame in frames]
+    return frames
+
+
+def run(frames, scale):
+    """Runs GazeTracking over the frames and returns the latencies (ms)
+    and the pupil coordinates of each frame"""
+    gaze = GazeTracking(detection_scale=scale)
+    latencies = []
+    pupils = []
+
+    for frame in frames:
+        start = time.perf_counter()
+        gaze.refresh(frame)
+        latencies.append((time.perf_counter() - start) * 1000)
+
+        if gaze.pupils_located:
+            pupils.append(gaze.pupil_left_coords() + gaze.pupil_right_coords())
+        else:
+            pupils.append(None)
+
+    return np.array(latencies), pupils
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('source', help="Video or image file containing a face")
+    parser.add_argument('--frames', type=int, default=100, help="Number of frames to analyze")
+    parser.add_argument('--width', type=int, default=0, help="Resize the frames to this width")
+    parser.add_argument('--scales', type=float, nargs='+', default=[1.0, 0.75, 0.5, 0.35, 0.25])
+    args = parser.parse_args()
+
+    frames = load_frames(args.source, args.frames, args.width)
+    height, width = frames[0].shape[:2]
+    print("{} frames of {}x{}".format(len(frames), width, height))
+    print("{:>6} {:>10} {:>10} {:>10} {:>14}".format("scale", "mean ms", "p95 ms", "located", "pupil err px"))
+
+    reference = None
+    for scale in sorted(args.scales, reverse=True):
+        latencies, pupils = run(frames, scale)
+        if reference is None:
+            reference = pupils
+
+        errors = [np.abs(np.subtract(p, r)).max() for p, r in zip(pupils, reference) if p and r]
+        located = sum(1 for p in pupils if p) / len(pupils)
+        error = "{:.2f}".format(np.mean(errors)) if errors else "n/a"
+
+        print("{:>6.2f} {:>10.2f} {:>10.2f} {:>9.0%} {:>14}".format(
+            scale, latencies.mean(), np.percentile(latencies, 95), located, error))
+
+
+if __name__ == '__main__':
+    main()
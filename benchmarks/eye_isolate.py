@@ -0,0 +1,93 @@
+"""
+Microbenchmark of Eye._isolate.
+Compares the latency and the peak memory allocated by the current
+implementation against the previous one, which masked the whole frame
+before cropping the eye.
+
+Usage:
+    python benchmarks/eye_isolate.py [--iterations 2000]
+"""
+
+from __future__ import division, print_function
+import argparse
+import os
+import sys
+import time
+import tracemalloc
+import numpy as np
+import cv2
+import dlib
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+from gaze_tracking.eye import Eye
+
+
+RESOLUTIONS = [(640, 480), (1280, 720), (1920, 1080)]
+
+
+def full_frame_isolate(frame, region):
+    """Previous implementation of Eye._isolate, kept as a reference"""
+    height, width = frame.shape[:2]
+    black_frame = np.zeros((height, width), np.uint8)
+    mask = np.full((height, width), 255, np.uint8)
+    cv2.fillPoly(mask, [region], (0, 0, 0))
+    eye = cv2.bitwise_not(black_frame, frame.copy(), mask=mask)
+
+    margin = 5
+    min_x = np.min(region[:, 0]) - margin
+    max_x = np.max(region[:, 0]) + margin
+    min_y = np.min(region[:, 1]) - margin
+    max_y = np.max(region[:, 1]) + margin
+    return eye[min_y:max_y, min_x:max_x]
+
+
+def eye_landmarks(width, height):
+    """Returns 68 landmarks with a 40x20 left eye in the middle of the frame"""
+    eye = [(-20, 0), (-8, -9), (8, -9), (20, 0), (8, 9), (-8, 9)]
+    points = dlib.points()
+    for i in range(68):
+        dx, dy = eye[i - 36] if 36 <= i < 42 else (0, 0)
+        points.append(dlib.point(width // 2 + dx, height // 2 + dy))
+    return dlib.full_object_detection(dlib.rectangle(0, 0, width, height), points)
+
+
+def measure(function, iterations):
+    """Returns the mean latency (us) and the peak allocated memory (KiB) of function()"""
+    function()
+    start = time.perf_counter()
+    for _ in range(iterations):
+        function()
+    latency = (time.perf_counter() - start) / iterations * 1e6
+
+    tracemalloc.start()
+    function()
+    peak = tracemalloc.get_traced_memory()[1] / 1024
+    tracemalloc.stop()
+    return latency, peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--iterations', type=int, default=2000)
+    args = parser.parse_args()
+
+    print("{:>10} {:>14} {:>14} {:>14} {:>14}".format(
+        "frame", "before us", "after us", "before KiB", "after KiB"))
+
+    for width, height in RESOLUTIONS:
+        frame = np.random.RandomState(0).randint(0, 256, (height, width)).astype(np.uint8)
+        landmarks = eye_landmarks(width, height)
+        region = np.array([(landmarks.part(p).x, landmarks.part(p).y) for p in Eye.LEFT_EYE_POINTS], np.int32)
+        eye = Eye.__new__(Eye)
+
+        eye._isolate(frame, landmarks, Eye.LEFT_EYE_POINTS)
+        assert np.array_equal(full_frame_isolate(frame, region), eye.frame)
+
+        before = measure(lambda: full_frame_isolate(frame, region), args.iterations)
+        after = measure(lambda: eye._isolate(frame, landmarks, Eye.LEFT_EYE_POINTS), args.iterations)
+        print("{:>10} {:>14.1f} {:>14.1f} {:>14.1f} {:>14.1f}".format(
+            "{}x{}".format(width, height), before[0], after[0], before[1], after[1]))
+
+
+if __name__ == '__main__':
+    main()
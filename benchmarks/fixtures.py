@@ -0,0 +1,64 @@
+"""
+Offline fixtures of the benchmark suite.
+The face comes from benchmarks/data/face.jpg (NASA portrait of astronaut
+Eileen Collins, public domain). The clips are generated from it by placing
+the face on a canvas of the requested resolution and moving it slightly from
+one frame to the next, so every run analyzes exactly the same pixels.
+"""
+
+from __future__ import division
+import os
+import numpy as np
+import cv2
+
+FACE_PATH = os.path.join(os.path.dirname(__file__), 'data', 'face.jpg')
+
+RESOLUTIONS = {
+    '480p': (640, 480),
+    '720p': (1280, 720),
+    '1080p': (1920, 1080),
+}
+
+
+def load_face():
+    """Returns the BGR face image"""
+    face = cv2.imread(FACE_PATH)
+    if face is None:
+        raise IOError("Unable to read the face fixture: " + FACE_PATH)
+    return face
+
+
+def face_frame(width, height, dx=0.0, dy=0.0, face=None):
+    """Returns a frame of the given size with the face in the middle
+
+    Arguments:
+        width (int): Width of the frame
+        height (int): Height of the frame
+        dx (float): Horizontal shift of the face in pixels
+        dy (float): Vertical shift of the face in pixels
+        face (numpy.ndarray): Face image, loaded from the fixture if None
+    """
+    face = load_face() if face is None else face
+    # The face image fills 80% of the frame height
+    scale = 0.8 * height / face.shape[0]
+    tx = (width - face.shape[1] * scale) / 2 + dx
+    ty = (height - face.shape[0] * scale) / 2 + dy
+    matrix = np.float32([[scale, 0, tx], [0, scale, ty]])
+    return cv2.warpAffine(face, matrix, (width, height), flags=cv2.INTER_LINEAR,
+                          borderMode=cv2.BORDER_CONSTANT, borderValue=(90, 90, 90))
+
+
+def face_clip(width, height, nb_frames=10, face=None):
+    """Returns a short clip where the face drifts on a small circle, like a
+    user sitting in front of a webcam
+
+    Arguments:
+        width (int): Width of the frames
+        height (int): Height of the frames
+        nb_frames (int): Number of frames
+        face (numpy.ndarray): Face image, loaded from the fixture if None
+    """
+    face = load_face() if face is None else face
+    radius = height / 100
+    angles = np.linspace(0, 2 * np.pi, nb_frames, endpoint=False)
+    return [face_frame(width, height, radius * np.cos(a), radius * np.sin(a), face) for a in angles]
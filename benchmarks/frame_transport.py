@@ -0,0 +1,99 @@
+"""
+Benchmark of the payload of a single frame sent by the backend.
+Compares /api/frame, which sends the JPEG in base64 inside JSON, against
+/api/frame.jpg, which sends the raw JPEG with the metrics in the headers.
+Measures the size of the body and the time spent to build it on the server
+and to get the image bytes back on the client.
+
+Usage:
+    python benchmarks/frame_transport.py image.jpg [--quality 95] [--runs 200]
+"""
+
+from __future__ import division, print_function
+import argparse
+import base64
+import json
+import os
+import sys
+import time
+import cv2
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'backend'))
+from broadcast import FrameBroadcaster
+from pipeline import Sample
+
+
+METRICS = {
+    'leftPupil': {'x': 412, 'y': 285},
+    'rightPupil': {'x': 530, 'y': 281},
+    'horizontal': 0.5123,
+    'vertical': 0.4876,
+}
+
+
+def json_base64(sample, jpeg):
+    """Server side of /api/frame"""
+    return json.dumps({
+        'frame': base64.b64encode(jpeg).decode('utf-8'),
+        'metrics': sample.metrics,
+        'timestamp': sample.timestamp,
+        'frameId': sample.frame_id,
+    }).encode('utf-8')
+
+
+def parse_json_base64(body):
+    """Client side of /api/frame"""
+    data = json.loads(body)
+    return base64.b64decode(data['frame']), data['metrics']
+
+
+def raw(sample, jpeg):
+    """Server side of /api/frame.jpg"""
+    return jpeg, FrameBroadcaster.headers(sample)
+
+
+def parse_raw(response):
+    """Client side of /api/frame.jpg"""
+    body, headers = response
+    return body, json.loads(headers['X-Gaze-Metrics'])
+
+
+def timed(function, argument, runs):
+    """Returns the result of the function and its mean duration in microseconds"""
+    start = time.perf_counter()
+    for _ in range(runs):
+        result = function(*argument)
+    return result, (time.perf_counter() - start) / runs * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('image', help="Image used as annotated frame")
+    parser.add_argument('--quality', type=int, default=95)
+    parser.add_argument('--runs', type=int, default=200)
+    args = parser.parse_args()
+
+    frame = cv2.imread(args.image)
+    if frame is None:
+        parser.error("Unable to read " + args.image)
+    _, buffer = cv2.imencode('.jpg', frame, [cv2.IMWRITE_JPEG_QUALITY, args.quality])
+    jpeg = buffer.tobytes()
+    sample = Sample(1, 0, time.time(), frame, METRICS)
+
+    body, encode_json = timed(json_base64, (sample, jpeg), args.runs)
+    _, decode_json = timed(parse_json_base64, (body,), args.runs)
+    response, encode_raw = timed(raw, (sample, jpeg), args.runs)
+    _, decode_raw = timed(parse_raw, (response,), args.runs)
+    header_bytes = sum(len(k) + len(v) + 4 for k, v in response[1].items())
+
+    print("Frame {}x{}, JPEG quality {}, {} bytes".format(frame.shape[1], frame.shape[0], args.quality, len(jpeg)))
+    print("{:<14} {:>10} {:>12} {:>12}".format('transport', 'bytes', 'server (us)', 'client (us)'))
+    print("{:<14} {:>10} {:>12.1f} {:>12.1f}".format('json+base64', len(body), encode_json, decode_json))
+    print("{:<14} {:>10} {:>12.1f} {:>12.1f}".format('raw jpeg', len(jpeg) + header_bytes, encode_raw, decode_raw))
+    print("Saved {:.1%} of the bytes and {:.0f} us per frame".format(
+        1 - (len(jpeg) + header_bytes) / len(body),
+        encode_json + decode_json - encode_raw - decode_raw))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,69 @@
+"""
+Benchmark of the startup time and memory of several GazeTracking instances.
+Compares loading one shape predictor per instance, like GazeTracking did
+before the model registry, against the shared registry of gaze_tracking.models.
+Each mode runs in a fresh process.
+
+Usage:
+    python benchmarks/model_registry.py [--instances 4]
+"""
+
+from __future__ import division, print_function
+import argparse
+import os
+import subprocess
+import sys
+import time
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+
+def rss_mib():
+    """Returns the resident memory of the current process in MiB"""
+    with open('/proc/self/status') as f:
+        for line in f:
+            if line.startswith('VmRSS:'):
+                return int(line.split()[1]) / 1024
+    return float('nan')
+
+
+def run(mode, instances):
+    """Creates the instances and analyzes one frame with each of them"""
+    import dlib
+    from gaze_tracking import GazeTracking, models
+
+    frame = np.zeros((480, 640, 3), np.uint8)
+    baseline = rss_mib()
+    start = time.perf_counter()
+
+    trackers = []
+    for _ in range(instances):
+        gaze = GazeTracking()
+        if mode == 'per-instance':
+            gaze._predictor = dlib.shape_predictor(models.MODEL_PATH)
+            gaze._face_tracker._predictor = gaze._predictor
+        gaze.refresh(frame)
+        trackers.append(gaze)
+
+    elapsed = time.perf_counter() - start
+    print("{:>14} {:>10} {:>12.2f} {:>12.1f}".format(mode, instances, elapsed, rss_mib() - baseline))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--instances', type=int, default=4)
+    parser.add_argument('--mode', choices=['per-instance', 'shared'])
+    args = parser.parse_args()
+
+    if args.mode:
+        run(args.mode, args.instances)
+        return
+
+    print("{:>14} {:>10} {:>12} {:>12}".format("mode", "instances", "startup s", "RSS MiB"))
+    for mode in ('per-instance', 'shared'):
+        subprocess.check_call([sys.executable, __file__, '--mode', mode, '--instances', str(args.instances)])
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,80 @@
+"""
+Benchmark of the MotionGate frame skipping.
+Analyzes a clip made from the face fixture, where the face alternates still
+periods and movements, with webcam-like noise on every frame. Compares the
+analysis of every frame with the gated analysis at several thresholds:
+share of analyzed frames, time per frame, and the error of the reused pupil
+coordinates against the coordinates found by analyzing every frame.
+
+Usage:
+    python benchmarks/motion_gate.py [--frames 300] [--noise 2]
+"""
+
+from __future__ import division, print_function
+import argparse
+import os
+import sys
+import time
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+from gaze_tracking import GazeTracking, MotionGate
+from fixtures import load_face, face_frame
+
+
+def clip(nb_frames, noise, rng, width=640, height=480):
+    """Returns frames where the face stays still for 1 to 2 seconds, then moves
+    for half a second, at 30 fps"""
+    face = load_face()
+    frames = []
+    x = y = 0.0
+    while len(frames) < nb_frames:
+        for _ in range(rng.integers(30, 60)):
+            frames.append(face_frame(width, height, x, y, face))
+        target = rng.uniform(-20, 20, 2)
+        for dx, dy in np.linspace((x, y), target, 15)[1:]:
+            frames.append(face_frame(width, height, dx, dy, face))
+        x, y = target
+
+    noisy = []
+    for frame in frames[:nb_frames]:
+        frame = frame + rng.normal(0, noise, frame.shape)
+        noisy.append(np.clip(frame, 0, 255).astype(np.uint8))
+    return noisy
+
+
+def analyze(frames, motion_gate=None):
+    """Returns the left pupil coordinates of every frame and the time per frame"""
+    gaze = GazeTracking(motion_gate=motion_gate)
+    coords = []
+    start = time.perf_counter()
+    for frame in frames:
+        gaze.refresh(frame)
+        coords.append(gaze.pupil_left_coords() or (np.nan, np.nan))
+    return np.array(coords, np.float64), (time.perf_counter() - start) / len(frames)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--frames', type=int, default=300)
+    parser.add_argument('--noise', type=float, default=2, help="Standard deviation of the pixel noise")
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    frames = clip(args.frames, args.noise, np.random.default_rng(args.seed))
+    reference, elapsed = analyze(frames)
+    print("{:<24} analyzed 100.0%  {:>6.2f} ms/frame".format('every frame', elapsed * 1000))
+
+    for threshold, max_skips in ((2, 4), (2, 10), (8, 10)):
+        gate = MotionGate(threshold=threshold, max_skips=max_skips)
+        coords, elapsed = analyze(frames, gate)
+        stats = gate.stats()
+        errors = np.abs(coords - reference).max(axis=1)
+        errors = errors[~np.isnan(errors)]
+        print("{:<24} analyzed {:>5.1%}  {:>6.2f} ms/frame  pupil error: mean {:.2f} px, max {:.0f} px".format(
+            'threshold {}, skips {}'.format(threshold, max_skips),
+            stats['processed_frames'] / len(frames), elapsed * 1000, errors.mean(), errors.max()))
+
+
+if __name__ == '__main__':
+    main()
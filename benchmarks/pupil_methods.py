@@ -0,0 +1,117 @@
+"""
+Benchmark and accuracy comparison of the pupil localization methods.
+Runs Pupil.detect_iris with the 'contours' and the 'components' methods on
+the same eye frames, taken from the face clips of the fixtures at several
+resolutions and lighting gains, binarized with the calibrated threshold and
+with a sweep of thresholds. Reports the localization time of each method and
+the differences of their centroids and radii.
+
+Usage:
+    python benchmarks/pupil_methods.py [--runs 200]
+"""
+
+from __future__ import division, print_function
+import argparse
+import os
+import sys
+import time
+import numpy as np
+import cv2
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+from gaze_tracking import GazeTracking
+from gaze_tracking.calibration import Calibration
+from gaze_tracking.pupil import Pupil
+from fixtures import RESOLUTIONS, face_clip
+
+GAINS = [0.7, 1.0, 1.3]
+SWEEP = range(5, 100, 5)
+
+
+def eye_frames():
+    """Returns the (eye frame, calibrated threshold) of both eyes of every fixture frame"""
+    frames = []
+    for width, height in RESOLUTIONS.values():
+        for frame in face_clip(width, height):
+            for gain in GAINS:
+                gaze = GazeTracking()
+                gaze.refresh(cv2.convertScaleAbs(frame, alpha=gain))
+                for eye in (gaze.eye_left, gaze.eye_right):
+                    if eye is not None:
+                        frames.append((eye.frame, Calibration.find_best_threshold(eye.frame)))
+    return frames
+
+
+def localize(method, iris_frame):
+    """Runs the localization step only, on an already binarized frame"""
+    pupil = Pupil.__new__(Pupil)
+    pupil.iris_frame = iris_frame
+    pupil.x = pupil.y = pupil.radius = None
+    if method == 'components':
+        pupil._locate_component()
+    else:
+        pupil._locate_contour()
+    return pupil
+
+
+def compare(cases):
+    """Returns the agreement and the differences between the methods on the cases"""
+    both, only_one, neither = [], 0, 0
+    for iris_frame in cases:
+        a, b = localize('contours', iris_frame), localize('components', iris_frame)
+        if a.x is None and b.x is None:
+            neither += 1
+        elif a.x is None or b.x is None:
+            only_one += 1
+        else:
+            both.append((abs(a.x - b.x), abs(a.y - b.y), b.radius - a.radius))
+
+    both = np.array(both).reshape(-1, 3)
+    return {
+        'cases': len(cases),
+        'both': len(both),
+        'only_one': only_one,
+        'neither': neither,
+        'same_centroid': float(np.mean((both[:, 0] == 0) & (both[:, 1] == 0))) if len(both) else 0,
+        'within_1px': float(np.mean(np.maximum(both[:, 0], both[:, 1]) <= 1)) if len(both) else 0,
+        'max_offset': int(both[:, :2].max()) if len(both) else 0,
+        'mean_radius_diff': float(both[:, 2].mean()) if len(both) else 0,
+    }
+
+
+def timing(cases, runs):
+    """Returns the mean localization time in microseconds of each method"""
+    times = {}
+    for method in Pupil.METHODS:
+        start = time.perf_counter()
+        for _ in range(runs):
+            for iris_frame in cases:
+                localize(method, iris_frame)
+        times[method] = (time.perf_counter() - start) / (runs * len(cases)) * 1e6
+    return times
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--runs', type=int, default=200, help="Number of timing runs over the calibrated cases")
+    args = parser.parse_args()
+
+    frames = eye_frames()
+    calibrated = [Pupil.image_processing(frame, threshold) for frame, threshold in frames]
+    sweep = [Pupil.image_processing(frame, threshold) for frame, _ in frames for threshold in SWEEP]
+
+    print("{} eye frames from the fixtures".format(len(frames)))
+    for name, cases in (('calibrated thresholds', calibrated), ('threshold sweep 5-95', sweep)):
+        result = compare(cases)
+        print("{}: {} cases, located by both {}, by one method only {}, by none {}".format(
+            name, result['cases'], result['both'], result['only_one'], result['neither']))
+        print("    same centroid {:.1%}, within 1 px {:.1%}, max offset {} px, mean radius difference {:+.2f} px".format(
+            result['same_centroid'], result['within_1px'], result['max_offset'], result['mean_radius_diff']))
+
+    times = timing(calibrated, args.runs)
+    print("localization time: contours {:.1f} us, components {:.1f} us ({:.2f}x)".format(
+        times['contours'], times['components'], times['contours'] / times['components']))
+
+
+if __name__ == '__main__':
+    main()
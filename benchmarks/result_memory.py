@@ -0,0 +1,88 @@
+"""
+Memory kept by the results of GazeTracking and garbage collector activity.
+For keep_frames True and False, reports the size of the Eye and Pupil objects
+of a frame, the memory retained by trackers that analyzed one frame, like idle
+sessions of the backend, and the number of garbage collections while
+analyzing the face clip of the fixtures.
+
+Usage:
+    python benchmarks/result_memory.py [--trackers 20] [--frames 300]
+"""
+
+from __future__ import division, print_function
+import argparse
+import gc
+import os
+import sys
+import tracemalloc
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+from gaze_tracking import GazeTracking, models
+from fixtures import face_clip
+
+
+def eye_bytes(eye):
+    """Returns the size of an Eye and of its Pupil, with their arrays"""
+    size = 0
+    for obj in (eye, eye.pupil):
+        size += sys.getsizeof(obj) + sys.getsizeof(getattr(obj, '__dict__', None) or 0)
+        for name in ('frame', 'landmark_points', 'iris_frame'):
+            value = getattr(obj, name, None)
+            if isinstance(value, np.ndarray):
+                size += value.nbytes
+    return size
+
+
+def retained(frame, trackers, keep_frames):
+    """Returns the memory in bytes retained by each tracker after one frame.
+    Each tracker gets its own copy of the frame, like the sessions of the
+    backend decoding their own frames, so a tracker holding its input frame
+    is counted."""
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    kept = []
+    for _ in range(trackers):
+        gaze = GazeTracking(keep_frames=keep_frames)
+        gaze.refresh(frame.copy())
+        kept.append(gaze)
+    gc.collect()
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return (after - before) / trackers
+
+
+def collections(frames, keep_frames):
+    """Returns the number of collections of each generation while analyzing the frames"""
+    gaze = GazeTracking(keep_frames=keep_frames)
+    gaze.refresh(frames[0])
+    gc.collect()
+    start = [generation['collections'] for generation in gc.get_stats()]
+    for frame in frames:
+        gaze.refresh(frame)
+    return [generation['collections'] - s for generation, s in zip(gc.get_stats(), start)]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--trackers', type=int, default=20)
+    parser.add_argument('--frames', type=int, default=300)
+    args = parser.parse_args()
+
+    models.preload()
+    clip = face_clip(640, 480)
+    frames = [clip[i % len(clip)] for i in range(args.frames)]
+
+    for keep_frames in (True, False):
+        gaze = GazeTracking(keep_frames=keep_frames)
+        gaze.refresh(frames[0])
+        print("keep_frames={}".format(keep_frames))
+        print("    eye and pupil objects: {} bytes per eye".format(eye_bytes(gaze.eye_left)))
+        print("    retained per tracker:  {:.1f} KiB".format(retained(frames[0], args.trackers, keep_frames) / 1024))
+        print("    gc collections (gen 0/1/2) over {} frames: {}".format(
+            len(frames), '/'.join(str(n) for n in collections(frames, keep_frames))))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,73 @@
+"""
+Evaluation of the ScreenMapping models on synthetic gaze ratios.
+The ratios of each screen point are generated with a non-linear distortion,
+like the one of the pupil rotating in the eye, plus measurement noise. Each
+model is fitted on a calibration grid, then its error is measured on random
+screen points, and the cost of the mapping of one sample and of an array of
+samples is timed.
+
+Usage:
+    python benchmarks/screen_mapping.py [--noise 0.005] [--grid 3] [--samples 10]
+"""
+
+from __future__ import division, print_function
+import argparse
+import os
+import sys
+import time
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+from gaze_tracking.screen import ScreenMapping, grid_targets
+
+WIDTH, HEIGHT = 1920, 1080
+
+
+def ratios_of(points):
+    """Returns the true gaze ratios of (..., 2) screen points: the pupil moves
+    along a sphere, so the ratios are compressed near the edges of the screen"""
+    x = points[..., 0] / WIDTH - 0.5
+    y = points[..., 1] / HEIGHT - 0.5
+    horizontal = 0.5 - 0.25 * np.sin(1.2 * x) + 0.02 * x * y
+    vertical = 0.5 + 0.15 * np.sin(1.1 * y) + 0.01 * x * x
+    return np.stack([horizontal, vertical], axis=-1)
+
+
+def per_sample(function, count):
+    """Returns the time in microseconds of one call of function, over count calls"""
+    start = time.perf_counter()
+    for _ in range(count):
+        function()
+    return (time.perf_counter() - start) / count * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--noise', type=float, default=0.005, help="Standard deviation of the measured ratios")
+    parser.add_argument('--grid', type=int, default=3, help="Rows and columns of calibration targets")
+    parser.add_argument('--samples', type=int, default=10, help="Samples collected per target")
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    targets = grid_targets(WIDTH, HEIGHT, args.grid, args.grid)
+    test_points = rng.uniform([0.1 * WIDTH, 0.1 * HEIGHT], [0.9 * WIDTH, 0.9 * HEIGHT], (10000, 2))
+    test_ratios = ratios_of(test_points) + rng.normal(0, args.noise, test_points.shape)
+
+    for model in ScreenMapping.MODELS:
+        mapping = ScreenMapping(model)
+        for target in targets:
+            for ratios in ratios_of(np.array(target)) + rng.normal(0, args.noise, (args.samples, 2)):
+                mapping.add(target, *ratios)
+        mapping.fit()
+
+        errors = np.linalg.norm(mapping.map_array(test_ratios) - test_points, axis=1)
+        single = per_sample(lambda: mapping.map(0.45, 0.55), 20000)
+        vectorized = per_sample(lambda: mapping.map_array(test_ratios), 100) / len(test_ratios)
+        print("{:<11} fit RMS {:6.1f} px  test error: mean {:6.1f} px, p95 {:6.1f} px  "
+              "map() {:.2f} us  map_array() {:.3f} us per sample".format(
+                  model, mapping.error, errors.mean(), np.percentile(errors, 95), single, vectorized))
+
+
+if __name__ == '__main__':
+    main()
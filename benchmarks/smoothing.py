@@ -0,0 +1,105 @@
+"""
+Evaluation of the GazeFilter smoothing on a synthetic gaze signal.
+The signal alternates fixations, saccades and smooth pursuits at 30 fps,
+with pixel jitter, random detection failures and blinks. Compares the raw
+measurements, the filtered ones and the filter fed with only one frame out
+of N, predicted in between, against the true signal.
+
+Usage:
+    python benchmarks/smoothing.py [--seconds 60] [--jitter 1.5]
+"""
+
+from __future__ import division, print_function
+import argparse
+import os
+import sys
+import time
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+from gaze_tracking.smoothing import GazeFilter
+
+FPS = 30
+
+
+def trajectory(seconds, rng):
+    """Returns the true horizontal pupil position, in pixels, at each frame"""
+    positions = []
+    x = 300.0
+    while len(positions) < seconds * FPS:
+        kind = rng.choice(['fixation', 'saccade', 'pursuit'], p=[0.5, 0.25, 0.25])
+        if kind == 'fixation':
+            positions.extend([x] * rng.integers(5, 30))
+        elif kind == 'saccade':
+            target = rng.uniform(280, 320)
+            positions.extend(np.linspace(x, target, 3)[1:])
+            x = target
+        else:
+            target = rng.uniform(280, 320)
+            positions.extend(np.linspace(x, target, rng.integers(15, 45))[1:])
+            x = target
+    return np.array(positions[:seconds * FPS])
+
+
+def measurements(truth, jitter, rng, failure_rate=0.05, blinks_per_minute=15):
+    """Returns the noisy measurements, NaN when the pupils were not located"""
+    measured = truth + rng.normal(0, jitter, len(truth))
+    measured[rng.random(len(truth)) < failure_rate] = np.nan
+    for start in rng.integers(0, len(truth), int(len(truth) / FPS / 60 * blinks_per_minute)):
+        measured[start:start + int(0.15 * FPS)] = np.nan
+    return measured
+
+
+def run_filter(measured, every=1, **options):
+    """Feeds the filter with one measurement out of every, predicts the other frames
+    and returns the outputs, NaN when the filter returns None"""
+    gaze_filter = GazeFilter(**options)
+    outputs = np.full(len(measured), np.nan)
+    for i, value in enumerate(measured):
+        timestamp = i / FPS
+        if i % every:
+            coords, _ = gaze_filter.predict(timestamp)
+        elif np.isnan(value):
+            coords, _ = gaze_filter.update(timestamp)
+        else:
+            coords, _ = gaze_filter.update(timestamp, (value, 0, 0, 0), (0, 0))
+        if coords is not None:
+            outputs[i] = coords[0]
+    return outputs
+
+
+def report(name, truth, outputs, analyzed):
+    """Prints the share of frames without output and the RMS error against the
+    truth, during the fixations and during the movements"""
+    valid = ~np.isnan(outputs)
+    still = np.r_[False, np.diff(truth) == 0]
+    errors = []
+    for frames in (valid & still, valid & ~still):
+        errors.append(np.sqrt(np.mean((outputs[frames] - truth[frames]) ** 2)))
+    print("{:<22} analyzed {:>5.0%}  without output {:>5.1%}  RMS error: fixations {:.2f} px, movements {:.2f} px".format(
+        name, analyzed, 1 - valid.mean(), errors[0], errors[1]))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--seconds', type=int, default=60)
+    parser.add_argument('--jitter', type=float, default=1.5, help="Standard deviation of the measurements, in pixels")
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    truth = trajectory(args.seconds, rng)
+    measured = measurements(truth, args.jitter, rng)
+
+    report('raw', truth, measured, 1)
+    start = time.perf_counter()
+    outputs = run_filter(measured)
+    elapsed = time.perf_counter() - start
+    report('filtered', truth, outputs, 1)
+    for every in (2, 3, 4):
+        report('filtered, 1 frame in {}'.format(every), truth, run_filter(measured, every), 1 / every)
+    print("filter cost: {:.1f} us per frame".format(elapsed / len(measured) * 1e6))
+
+
+if __name__ == '__main__':
+    main()
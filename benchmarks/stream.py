@@ -0,0 +1,72 @@
+"""
+Benchmark of GazeTracking.process_stream() against a refresh() loop.
+Analyzes the face clip of the fixtures both ways, checks that every frame
+gets the same pupils, and reports the sustained frames per second. The
+stages only overlap on a machine with several cores.
+
+Usage:
+    python benchmarks/stream.py [--frames 60] [--resolution 720p] [--tracking]
+"""
+
+from __future__ import division, print_function
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+from gaze_tracking import GazeTracking, models
+from fixtures import RESOLUTIONS, face_clip
+
+
+def results(gaze):
+    """Returns the pupils of the current frame"""
+    return gaze.pupil_left_coords(), gaze.pupil_right_coords(), gaze.horizontal_ratio(), gaze.vertical_ratio()
+
+
+def run_refresh(frames, **options):
+    """Returns the results of every frame and the frames per second of a refresh() loop"""
+    gaze = GazeTracking(**options)
+    outputs = []
+    start = time.perf_counter()
+    for frame in frames:
+        gaze.refresh(frame)
+        outputs.append(results(gaze))
+    return outputs, len(frames) / (time.perf_counter() - start)
+
+
+def run_stream(frames, queue_size, threaded, **options):
+    """Returns the results of every frame and the frames per second of process_stream()"""
+    gaze = GazeTracking(**options)
+    outputs = []
+    start = time.perf_counter()
+    for _ in gaze.process_stream(iter(frames), queue_size, threaded):
+        outputs.append(results(gaze))
+    return outputs, len(frames) / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--frames', type=int, default=60)
+    parser.add_argument('--resolution', choices=sorted(RESOLUTIONS), default='720p')
+    parser.add_argument('--tracking', action='store_true', help="Enable the face tracking mode")
+    args = parser.parse_args()
+
+    width, height = RESOLUTIONS[args.resolution]
+    clip = face_clip(width, height)
+    frames = [clip[i % len(clip)] for i in range(args.frames)]
+    models.preload()
+
+    print("{} frames at {}, tracking {}, {} CPUs".format(
+        len(frames), args.resolution, args.tracking, os.cpu_count()))
+    reference, fps = run_refresh(frames, tracking=args.tracking)
+    print("{:<32} {:>6.1f} fps".format('refresh() loop', fps))
+    for name, queue_size, threaded in (('not threaded', 1, False), ('queue 1', 1, True),
+                                       ('queue 2', 2, True), ('queue 4', 4, True)):
+        outputs, fps = run_stream(frames, queue_size, threaded, tracking=args.tracking)
+        print("{:<32} {:>6.1f} fps  same results: {}".format(
+            'process_stream(), ' + name, fps, outputs == reference))
+
+
+if __name__ == '__main__':
+    main()
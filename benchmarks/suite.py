@@ -0,0 +1,223 @@
+"""
+Offline benchmark suite of GazeTracking.
+Times refresh() with and without face tracking, Calibration.find_best_threshold,
+Pupil.detect_iris with each localization method and the JPEG encoding of the backend at several resolutions,
+on the fixtures of benchmarks/fixtures.py. Each case records the latency
+percentiles, the throughput and the peak memory allocated through Python and
+numpy (tracemalloc doesn't see the memory allocated inside OpenCV and dlib).
+
+The results are written to JSON and can be compared against a baseline:
+the command fails when a case got slower or allocates more than the tolerance.
+
+Usage:
+    python benchmarks/suite.py [-o results.json] [--baseline benchmarks/baseline.json]
+                               [--tolerance 0.3] [--quick] [--filter refresh]
+"""
+
+from __future__ import division, print_function
+import argparse
+import json
+import os
+import platform
+import sys
+import time
+import tracemalloc
+import numpy as np
+import cv2
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'backend'))
+from gaze_tracking import GazeTracking
+from gaze_tracking.calibration import Calibration
+from gaze_tracking.pupil import Pupil
+from broadcast import FrameBroadcaster
+from fixtures import RESOLUTIONS, face_clip
+
+BASELINE_PATH = os.path.join(os.path.dirname(__file__), 'baseline.json')
+
+# Memory increases below this size are never regressions
+MEMORY_SLACK_KIB = 64
+
+# Latency increases below this duration are never regressions, the cases of a
+# few tens of microseconds vary by more than the tolerance from run to run
+LATENCY_SLACK_MS = 0.1
+
+
+def measure(function, iterations, memory_iterations=3):
+    """Times function() and returns its latency percentiles, throughput and peak memory
+
+    Arguments:
+        function (callable): Function called without argument
+        iterations (int): Number of timed calls
+        memory_iterations (int): Number of calls traced to get the peak memory
+    """
+    function()
+
+    latencies = np.empty(iterations)
+    start = time.perf_counter()
+    for i in range(iterations):
+        call_start = time.perf_counter()
+        function()
+        latencies[i] = time.perf_counter() - call_start
+    elapsed = time.perf_counter() - start
+
+    # tracemalloc slows the calls down, so the memory is measured separately
+    tracemalloc.start()
+    for _ in range(memory_iterations):
+        function()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    p50, p95, p99 = np.percentile(latencies, [50, 95, 99]) * 1000
+    return {
+        'iterations': iterations,
+        'mean_ms': float(latencies.mean() * 1000),
+        'p50_ms': float(p50),
+        'p95_ms': float(p95),
+        'p99_ms': float(p99),
+        'throughput': iterations / elapsed,
+        'peak_kib': peak / 1024,
+    }
+
+
+def cycle(items):
+    """Returns a function returning the items one after the other, forever"""
+    state = {'index': -1}
+
+    def next_item():
+        state['index'] = (state['index'] + 1) % len(items)
+        return items[state['index']]
+    return next_item
+
+
+def cases(quick):
+    """Yields the (name, function, iterations) of every case. The fixtures of a
+    resolution are generated when its first case runs."""
+    scale = 0.25 if quick else 1
+
+    for label, (width, height) in RESOLUTIONS.items():
+        clip = face_clip(width, height)
+
+        # Eye crops of the clip, as the calibration and the pupil see them
+        reference = GazeTracking()
+        reference.refresh(clip[0])
+        if not reference.pupils_located:
+            raise RuntimeError("The face of the fixture wasn't found at " + label)
+        eye_frame = reference.eye_left.frame
+        threshold = Calibration.find_best_threshold(eye_frame)
+        annotated_frame = reference.annotated_frame()
+
+        for tracking in (False, True):
+            name = 'refresh_tracking' if tracking else 'refresh'
+            yield ('{}/{}'.format(name, label),
+                   lambda gaze=GazeTracking(tracking=tracking), next_frame=cycle(clip): gaze.refresh(next_frame()),
+                   max(int(30 * scale), 15))
+
+        yield ('find_best_threshold/' + label,
+               lambda: Calibration.find_best_threshold(eye_frame), int(2000 * scale))
+        for method in Pupil.METHODS:
+            name = 'detect_iris' if method == 'contours' else 'detect_iris_' + method
+            yield (name + '/' + label, lambda pupil=Pupil(eye_frame, threshold, method=method): pupil.detect_iris(eye_frame),
+                   int(2000 * scale))
+
+        broadcaster = FrameBroadcaster(None)
+        yield 'backend_encode/' + label, lambda: broadcaster._encode(annotated_frame), int(200 * scale)
+
+
+def run(quick=False, pattern=None, runs=1):
+    """Runs the cases whose name contains pattern and returns the results.
+    With several runs, each case keeps the run with the lowest p50: a slower
+    run is the machine being busy, the code can't get faster by chance.
+    """
+    results = {}
+    for _ in range(runs):
+        for name, function, iterations in cases(quick):
+            if pattern and pattern not in name:
+                continue
+            result = measure(function, iterations)
+            if name not in results or result['p50_ms'] < results[name]['p50_ms']:
+                results[name] = result
+
+    for name in results:
+        print("{:<28} p50 {:>9.3f} ms  p95 {:>9.3f} ms  {:>9.1f}/s  {:>8.1f} KiB".format(
+            name, results[name]['p50_ms'], results[name]['p95_ms'],
+            results[name]['throughput'], results[name]['peak_kib']), file=sys.stderr)
+
+    return {
+        'meta': {
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'python': platform.python_version(),
+            'numpy': np.__version__,
+            'opencv': cv2.__version__,
+            'machine': platform.machine(),
+            'cpus': os.cpu_count(),
+            'quick': quick,
+            'runs': runs,
+        },
+        'results': results,
+    }
+
+
+def compare(results, baseline, tolerance=0.3):
+    """Compares the results of a run against a baseline run
+
+    Arguments:
+        results (dict): Output of run()
+        baseline (dict): Output of a previous run()
+        tolerance (float): Allowed relative increase of the p50 latency and of the peak memory,
+            on top of LATENCY_SLACK_MS and MEMORY_SLACK_KIB
+
+    Returns:
+        The list of (case, message) regressions. Cases missing from one of
+        the runs are ignored.
+    """
+    regressions = []
+    for name, current in sorted(results['results'].items()):
+        reference = baseline['results'].get(name)
+        if reference is None:
+            continue
+
+        latency_limit = max(reference['p50_ms'] * (1 + tolerance), reference['p50_ms'] + LATENCY_SLACK_MS)
+        if current['p50_ms'] > latency_limit:
+            regressions.append((name, "p50 {:.3f} ms, baseline {:.3f} ms".format(
+                current['p50_ms'], reference['p50_ms'])))
+
+        memory_limit = max(reference['peak_kib'] * (1 + tolerance), reference['peak_kib'] + MEMORY_SLACK_KIB)
+        if current['peak_kib'] > memory_limit:
+            regressions.append((name, "peak memory {:.1f} KiB, baseline {:.1f} KiB".format(
+                current['peak_kib'], reference['peak_kib'])))
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Offline benchmark suite of GazeTracking")
+    parser.add_argument('-o', '--output', help="JSON file to write the results to")
+    parser.add_argument('--baseline', help="JSON results to compare against, e.g. " + BASELINE_PATH)
+    parser.add_argument('--tolerance', type=float, default=0.3,
+                        help="Allowed relative increase of latency and memory (default 0.3)")
+    parser.add_argument('--quick', action='store_true', help="Run 4 times fewer iterations")
+    parser.add_argument('--filter', help="Only run the cases whose name contains this text")
+    parser.add_argument('--runs', type=int, default=3,
+                        help="Runs of the suite, each case keeps its fastest run (default 3)")
+    args = parser.parse_args(argv)
+
+    results = run(args.quick, args.filter, args.runs)
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2, sort_keys=True)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.tolerance)
+        for name, message in regressions:
+            print("REGRESSION {}: {}".format(name, message), file=sys.stderr)
+        if regressions:
+            return 1
+        print("No regression against " + args.baseline, file=sys.stderr)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
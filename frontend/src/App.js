@@ -1,4 +1,4 @@
-import React, { useState, useEffect } from 'react';
+import React, { useState, useEffect, useRef } from 'react';
 import axios from 'axios';
 import './App.css';
 
@@ -11,6 +11,8 @@ function App() {
   });
   const [isConnected, setIsConnected] = useState(false);
   const [error, setError] = useState(null);
+  const [snapshot, setSnapshot] = useState(null);
+  const snapshotUrl = useRef(null);
 
   // API base URL
   const API_URL = 'http://localhost:5000';
@@ -33,23 +35,51 @@ function App() {
     checkHealth();
   }, []);
 
-  // Poll for metrics every 100ms
+  // Subscribe to the metrics pushed by the backend for every analyzed frame
   useEffect(() => {
     if (!isConnected) return;
 
-    const interval = setInterval(async () => {
-      try {
-        const response = await axios.get(`${API_URL}/api/metrics`);
-        setMetrics(response.data);
-        setError(null);
-      } catch (err) {
-        setError('Failed to fetch metrics');
-      }
-    }, 100);
+    const source = new EventSource(`${API_URL}/api/metrics/stream`);
+
+    source.addEventListener('metrics', (event) => {
+      setMetrics(JSON.parse(event.data));
+      setError(null);
+    });
 
-    return () => clearInterval(interval);
+    // EventSource reconnects by itself after an error
+    source.onerror = () => {
+      setError('Metrics stream interrupted, reconnecting...');
+    };
+
+    return () => source.close();
   }, [isConnected]);
 
+  // Release the object URL of the last snapshot on unmount
+  useEffect(() => () => {
+    if (snapshotUrl.current) URL.revokeObjectURL(snapshotUrl.current);
+  }, []);
+
+  // Fetch the raw JPEG of the latest frame, the metrics come in a header
+  const takeSnapshot = async () => {
+    try {
+      const response = await fetch(`${API_URL}/api/frame.jpg`);
+      if (!response.ok) throw new Error(response.statusText);
+
+      // The Blob is handed to the <img> as is, without any base64 decoding
+      const blob = await response.blob();
+      if (snapshotUrl.current) URL.revokeObjectURL(snapshotUrl.current);
+      snapshotUrl.current = URL.createObjectURL(blob);
+
+      setSnapshot({
+        url: snapshotUrl.current,
+        frameId: response.headers.get('X-Frame-Id'),
+        metrics: JSON.parse(response.headers.get('X-Gaze-Metrics'))
+      });
+    } catch (err) {
+      setError('Unable to take a snapshot.');
+    }
+  };
+
   const formatValue = (value) => {
     if (value === null || value === undefined) {
       return 'N/A';
@@ -73,11 +103,25 @@ function App() {
         <div className="video-section">
           <h2>Camera Feed</h2>
           {isConnected ? (
-            <img
-              src={`${API_URL}/api/video-feed`}
-              alt="Live camera feed"
-              className="video-feed"
-            />
+            <>
+              <img
+                src={`${API_URL}/api/video-feed`}
+                alt="Live camera feed"
+                className="video-feed"
+              />
+              <button className="snapshot-button" onClick={takeSnapshot}>
+                Take snapshot
+              </button>
+              {snapshot ? (
+                <div className="snapshot">
+                  <img src={snapshot.url} alt="Snapshot" className="video-feed" />
+                  <div className="snapshot-caption">
+                    Frame {snapshot.frameId}: horizontal {formatValue(snapshot.metrics.horizontal)},
+                    vertical {formatValue(snapshot.metrics.vertical)}
+                  </div>
+                </div>
+              ) : null}
+            </>
           ) : (
             <div className="video-placeholder">
               <p>Camera feed unavailable</p>
@@ -129,6 +173,21 @@ function App() {
                 (0.0 = top, 0.5 = center, 1.0 = bottom)
               </div>
             </div>
+            <div className="metric-item">
+              <span className="metric-label">Eyes:</span>
+              <span className="metric-value">
+                {metrics.blinking === null || metrics.blinking === undefined
+                  ? 'N/A'
+                  : metrics.blinking ? 'Closed' : 'Open'}
+              </span>
+              <div className="metric-description">
+                (openness {formatValue(metrics.eyeOpenness)}
+                {metrics.eyeOpenness !== null && metrics.eyeOpenness !== undefined &&
+                  (metrics.blinking === null || metrics.blinking === undefined)
+                  ? ', closed eyes detected when GAZE_CLOSED_THRESHOLD is set'
+                  : ''})
+              </div>
+            </div>
           </div>
 
           <div className="visual-indicator">
@@ -1 +1,6 @@
 from .gaze_tracking import GazeTracking
+from .calibration import Calibration
+from .profiles import CalibrationStore
+from .smoothing import GazeFilter
+from .motion_gate import MotionGate
+from .screen import ScreenMapping
@@ -0,0 +1,3 @@
+from .video import main
+
+main()
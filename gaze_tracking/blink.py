@@ -0,0 +1,86 @@
+from __future__ import division
+import math
+from collections import deque, namedtuple
+import numpy as np
+
+# A blink detected by BlinkDetector: time of the first closed frame and duration in seconds
+Blink = namedtuple('Blink', ['start', 'duration'])
+
+
+def eye_aspect_ratio(points):
+    """Returns the eye aspect ratio (Soukupova and Cech, 2016) of the six landmarks
+    of an eye: the mean of the two heights of the eye divided by its width. It is
+    about 0.3 for an open eye and close to 0 for a closed one, whatever the size
+    of the face. Several eyes can be computed at once.
+
+    Argument:
+        points (numpy.ndarray): Points of shape (..., 6, 2), in the order of the
+            68 landmarks: outer corner, two top points, inner corner, two bottom points
+    """
+    points = np.asarray(points)
+    if points.ndim == 2:
+        # Each Eye computes its own ratio on every frame, and for 6 points the
+        # temporary arrays of the batch path cost more than the math itself
+        (x0, y0), (x1, y1), (x2, y2), (x3, y3), (x4, y4), (x5, y5) = points.tolist()
+        heights = math.hypot(x1 - x5, y1 - y5) + math.hypot(x2 - x4, y2 - y4)
+        return heights / (2 * max(math.hypot(x0 - x3, y0 - y3), 1))
+
+    vectors = points[..., [1, 2, 0], :] - points[..., [5, 4, 3], :]
+    lengths = np.hypot(vectors[..., 0], vectors[..., 1])
+    return (lengths[..., 0] + lengths[..., 1]) / (2 * np.maximum(lengths[..., 2], 1))
+
+
+class BlinkDetector(object):
+    """
+    This class turns the closed state of the eyes over successive frames
+    into blink events. A blink starts on the first frame where both eyes are
+    closed and ends on the next frame where they are open. Longer closures
+    than max_duration are not blinks, the eyes were just closed.
+    """
+
+    def __init__(self, max_duration=0.5, max_events=100):
+        """
+        Arguments:
+            max_duration (float): Longest closure in seconds counted as a blink
+            max_events (int): Number of blinks kept until events() is called,
+                the oldest ones are dropped first
+        """
+        self.max_duration = max_duration
+        self.count = 0
+        self._events = deque(maxlen=max_events)
+        self._closed_since = None
+
+    def reset(self):
+        """Forgets the current closure, for example when the face changed"""
+        self._closed_since = None
+
+    @property
+    def closed_since(self):
+        """Time of the first frame of the current closure, or None if the eyes are open"""
+        return self._closed_since
+
+    def update(self, timestamp, closed):
+        """Updates the state with a new frame
+
+        Arguments:
+            timestamp (float): Time of the frame in seconds
+            closed (bool): True if both eyes are closed, False if they are open,
+                None if there is no face in the frame
+        """
+        if closed is None:
+            self._closed_since = None
+        elif closed:
+            if self._closed_since is None:
+                self._closed_since = timestamp
+        elif self._closed_since is not None:
+            duration = timestamp - self._closed_since
+            if duration <= self.max_duration:
+                self.count += 1
+                self._events.append(Blink(self._closed_since, duration))
+            self._closed_since = None
+
+    def events(self):
+        """Returns the blinks that ended since the last call, oldest first"""
+        events = list(self._events)
+        self._events.clear()
+        return events
@@ -1,4 +1,6 @@
 from __future__ import division
+from collections import deque
+import numpy as np
 import cv2
 from .pupil import Pupil
 
@@ -7,12 +9,79 @@ class Calibration(object):
     """
     This class calibrates the pupil detection algorithm by finding the
     best binarization threshold value for the person and the webcam.
+
+    In adaptive mode, the thresholds are kept in a rolling window and
+    re-evaluated periodically, or sooner when the iris size drifts,
+    so the calibration follows lighting changes during long sessions.
     """
 
-    def __init__(self):
+    def __init__(self, adaptive=False, window=50, interval=30, iris_drift=0.1):
+        """
+        Arguments:
+            adaptive (bool): Keeps re-evaluating the threshold after the calibration is completed
+            window (int): In adaptive mode, number of thresholds the average is computed on
+            interval (int): In adaptive mode, number of frames between two evaluations of an eye
+            iris_drift (float): In adaptive mode, change of the iris size since the last
+                evaluation that triggers a new evaluation before the end of the interval
+        """
         self.nb_frames = 20
-        self.thresholds_left = []
-        self.thresholds_right = []
+        self.adaptive = adaptive
+        self.window = window
+        self.interval = interval
+        self.iris_drift = iris_drift
+
+        if adaptive:
+            if window < self.nb_frames:
+                raise ValueError("window must hold at least {} thresholds".format(self.nb_frames))
+            # Ring buffers: the oldest threshold is dropped when a new one is added
+            self.thresholds_left = deque(maxlen=window)
+            self.thresholds_right = deque(maxlen=window)
+        else:
+            self.thresholds_left = []
+            self.thresholds_right = []
+
+        self.recalibrations = 0
+        self._frames_since_evaluation = [0, 0]
+        self._drift_evaluations = [0, 0]
+        self._reference_iris_size = [None, None]
+        self._last_iris_size = [None, None]
+        self._initial_threshold = [None, None]
+
+    def options(self):
+        """Returns the keyword arguments of the constructor of this calibration"""
+        return {
+            'adaptive': self.adaptive,
+            'window': self.window,
+            'interval': self.interval,
+            'iris_drift': self.iris_drift,
+        }
+
+    def to_dict(self):
+        """Returns the calibration state and options as a JSON serializable dict"""
+        return {
+            'nb_frames': self.nb_frames,
+            'thresholds_left': [int(t) for t in self.thresholds_left],
+            'thresholds_right': [int(t) for t in self.thresholds_right],
+            'options': self.options(),
+        }
+
+    @classmethod
+    def from_dict(cls, data, **options):
+        """Creates a calibration from a dict returned by to_dict(), with the
+        options it was saved with
+
+        Arguments:
+            data (dict): Serialized calibration state
+            options: Keyword arguments given to the constructor, like adaptive=True,
+                they replace the saved ones
+        """
+        merged = dict(data.get('options', {}))
+        merged.update(options)
+        calibration = cls(**merged)
+        calibration.nb_frames = int(data['nb_frames'])
+        calibration.thresholds_left.extend(int(t) for t in data['thresholds_left'])
+        calibration.thresholds_right.extend(int(t) for t in data['thresholds_right'])
+        return calibration
 
     def is_complete(self):
         """Returns true if the calibration is completed"""
@@ -52,14 +121,22 @@ class Calibration(object):
             eye_frame (numpy.ndarray): Frame of the eye to be analyzed
         """
         average_iris_size = 0.48
-        trials = {}
+        thresholds = np.arange(5, 100, 5)
 
-        for threshold in range(5, 100, 5):
-            iris_frame = Pupil.image_processing(eye_frame, threshold)
-            trials[threshold] = Calibration.iris_size(iris_frame)
+        # Only the binarization depends on the threshold, so the frame is filtered once.
+        # A pixel becomes black when its value is <= threshold: the number of black
+        # pixels for every threshold is read from the cumulative histogram.
+        filtered_frame = Pupil.filter_frame(eye_frame)
+        if filtered_frame.shape[0] > 10 and filtered_frame.shape[1] > 10:
+            # Ignores the margins, unless they are the whole frame (almost closed eye)
+            filtered_frame = filtered_frame[5:-5, 5:-5]
+        histogram = np.bincount(filtered_frame.ravel(), minlength=256)
+        nb_blacks = np.cumsum(histogram)[thresholds]
+        iris_sizes = nb_blacks / filtered_frame.size
 
-        best_threshold, iris_size = min(trials.items(), key=(lambda p: abs(p[1] - average_iris_size)))
-        return best_threshold
+        # argmin keeps the lowest threshold in case of a tie
+        best = np.argmin(np.abs(iris_sizes - average_iris_size))
+        return int(thresholds[best])
 
     def evaluate(self, eye_frame, side):
         """Improves calibration by taking into consideration the
@@ -75,3 +152,58 @@ class Calibration(object):
             self.thresholds_left.append(threshold)
         elif side == 1:
             self.thresholds_right.append(threshold)
+
+    def needs_evaluation(self, iris_frame, side):
+        """Returns True if the threshold of an eye has to be re-evaluated on
+        this frame, which is counted as a recalibration. Only measures the
+        iris size, the evaluation itself is left to the caller, like Eye does.
+
+        Arguments:
+            iris_frame (numpy.ndarray): Eye frame binarized with the current threshold
+            side: Indicates whether it's the left eye (0) or the right eye (1)
+        """
+        if not self.adaptive or not self.is_complete() or iris_frame.shape[0] <= 10 or iris_frame.shape[1] <= 10:
+            return False
+
+        if self._initial_threshold[side] is None:
+            self._initial_threshold[side] = self.threshold(side)
+
+        iris_size = self.iris_size(iris_frame)
+        self._last_iris_size[side] = iris_size
+        self._frames_since_evaluation[side] += 1
+
+        if self._reference_iris_size[side] is None:
+            self._reference_iris_size[side] = iris_size
+
+        # While the iris size is off, every frame is evaluated so the window quickly
+        # fills up with new thresholds. If it is still off once the whole window has
+        # been renewed, the change is accepted and becomes the new reference.
+        if abs(iris_size - self._reference_iris_size[side]) > self.iris_drift:
+            self._drift_evaluations[side] += 1
+            if self._drift_evaluations[side] >= self.thresholds_left.maxlen:
+                self._drift_evaluations[side] = 0
+                self._reference_iris_size[side] = None
+        elif self._frames_since_evaluation[side] >= self.interval:
+            self._drift_evaluations[side] = 0
+            self._reference_iris_size[side] = iris_size
+        else:
+            return False
+
+        self.recalibrations += 1
+        self._frames_since_evaluation[side] = 0
+        return True
+
+    def metrics(self):
+        """Returns the current thresholds, their drift since the calibration was
+        completed, the last measured iris sizes and the number of re-evaluations"""
+        metrics = {'recalibrations': self.recalibrations}
+
+        for side, name in ((0, 'left'), (1, 'right')):
+            complete = self.is_complete()
+            threshold = self.threshold(side) if complete else None
+            initial = self._initial_threshold[side]
+            metrics['threshold_' + name] = threshold
+            metrics['threshold_drift_' + name] = threshold - initial if complete and initial is not None else 0
+            metrics['iris_size_' + name] = self._last_iris_size[side]
+
+        return metrics
@@ -1,6 +1,8 @@
 import numpy as np
 import cv2
 from .pupil import Pupil
+from .blink import eye_aspect_ratio
+from .profiling import DISABLED_PROFILER
 
 
 class Eye(object):
@@ -12,14 +14,40 @@ class Eye(object):
     LEFT_EYE_POINTS = [36, 37, 38, 39, 40, 41]
     RIGHT_EYE_POINTS = [42, 43, 44, 45, 46, 47]
 
-    def __init__(self, original_frame, landmarks, side, calibration):
+    # A new Eye is created for every frame, the slots avoid an attribute dict per instance
+    __slots__ = ('frame', 'origin', 'center', 'pupil', 'landmark_points', 'openness', 'closed')
+
+    def __init__(self, original_frame, landmarks, side, calibration, profiler=None, pupil_method='contours',
+                 keep_frames=True, closed_threshold=None):
+        """
+        Arguments:
+            original_frame (numpy.ndarray): Frame passed by the user
+            landmarks (dlib.full_object_detection): Facial landmarks for the face region
+            side: Indicates whether it's the left eye (0) or the right eye (1)
+            calibration (calibration.Calibration): Manages the binarization threshold value
+            profiler (profiling.Profiler): Records the duration of each stage
+            pupil_method (str): Localization method of the Pupil, 'contours' or 'components'
+            keep_frames (bool): Keeps the isolated eye frame and the binarized iris frame
+                once the pupil is located. Without them, only numbers are kept.
+            closed_threshold (float): Eye aspect ratio below which the eye is closed.
+                The pupil of a closed eye isn't searched. None disables the detection
+                of the closed eyes, closed is then None.
+        """
         self.frame = None
         self.origin = None
         self.center = None
         self.pupil = None
         self.landmark_points = None
+        self.openness = None
+        self.closed = None
+
+        self._analyze(original_frame, landmarks, side, calibration, profiler or DISABLED_PROFILER, pupil_method,
+                      closed_threshold)
 
-        self._analyze(original_frame, landmarks, side, calibration)
+        if not keep_frames:
+            self.frame = None
+            if self.pupil is not None:
+                self.pupil.iris_frame = None
 
     @staticmethod
     def _middle_point(p1, p2):
@@ -35,6 +63,8 @@ class Eye(object):
 
     def _isolate(self, frame, landmarks, points):
         """Isolate an eye, to have a frame without other part of the face.
+        When the eye is entirely outside of the frame, there is nothing to
+        isolate: frame and center are None.
 
         Arguments:
             frame (numpy.ndarray): Frame containing the face
@@ -45,35 +75,42 @@ class Eye(object):
         region = region.astype(np.int32)
         self.landmark_points = region
 
-        # Applying a mask to get only the eye
-        height, width = frame.shape[:2]
-        black_frame = np.zeros((height, width), np.uint8)
-        mask = np.full((height, width), 255, np.uint8)
-        cv2.fillPoly(mask, [region], (0, 0, 0))
-        eye = cv2.bitwise_not(black_frame, frame.copy(), mask=mask)
-
-        # Cropping on the eye
+        # Cropping on the eye, clamped to the frame edges
         margin = 5
-        min_x = np.min(region[:, 0]) - margin
-        max_x = np.max(region[:, 0]) + margin
-        min_y = np.min(region[:, 1]) - margin
-        max_y = np.max(region[:, 1]) + margin
+        height, width = frame.shape[:2]
+        min_x = max(np.min(region[:, 0]) - margin, 0)
+        max_x = min(np.max(region[:, 0]) + margin, width)
+        min_y = max(np.min(region[:, 1]) - margin, 0)
+        max_y = min(np.max(region[:, 1]) + margin, height)
 
-        self.frame = eye[min_y:max_y, min_x:max_x]
         self.origin = (min_x, min_y)
+        if min_x >= max_x or min_y >= max_y:
+            self.frame = None
+            self.center = None
+            return
+
+        # Applying a mask to get only the eye, only inside the cropped region
+        eye = frame[min_y:max_y, min_x:max_x]
+        mask = np.full(eye.shape[:2], 255, np.uint8)
+        cv2.fillPoly(mask, [region], (0, 0, 0), offset=(-int(min_x), -int(min_y)))
+
+        self.frame = cv2.bitwise_or(eye, mask)
 
         height, width = self.frame.shape[:2]
         self.center = (width / 2, height / 2)
 
-    def _analyze(self, original_frame, landmarks, side, calibration):
+    def _analyze(self, original_frame, landmarks, side, calibration, profiler, pupil_method, closed_threshold):
         """Detects and isolates the eye in a new frame, sends data to the calibration
-        and initializes Pupil object.
+        and initializes Pupil object, unless the eye is closed.
 
         Arguments:
             original_frame (numpy.ndarray): Frame passed by the user
             landmarks (dlib.full_object_detection): Facial landmarks for the face region
             side: Indicates whether it's the left eye (0) or the right eye (1)
             calibration (calibration.Calibration): Manages the binarization threshold value
+            profiler (profiling.Profiler): Records the duration of each stage
+            pupil_method (str): Localization method of the Pupil, 'contours' or 'components'
+            closed_threshold (float): Eye aspect ratio below which the eye is closed, None to disable
         """
         if side == 0:
             points = self.LEFT_EYE_POINTS
@@ -82,10 +119,26 @@ class Eye(object):
         else:
             return
 
-        self._isolate(original_frame, landmarks, points)
+        with profiler.stage('eye_isolate'):
+            self._isolate(original_frame, landmarks, points)
+            self.openness = eye_aspect_ratio(self.landmark_points)
+
+        # An eye outside of the frame has no pupil to locate
+        if self.frame is None:
+            return
+
+        # A closed eye can't show a pupil, and its frame would mislead the calibration
+        if closed_threshold is not None:
+            self.closed = self.openness < closed_threshold
+            if self.closed:
+                return
 
         if not calibration.is_complete():
-            calibration.evaluate(self.frame, side)
+            with profiler.stage('calibration'):
+                calibration.evaluate(self.frame, side)
 
         threshold = calibration.threshold(side)
-        self.pupil = Pupil(self.frame, threshold)
+        self.pupil = Pupil(self.frame, threshold, profiler, pupil_method)
+        if calibration.needs_evaluation(self.pupil.iris_frame, side):
+            with profiler.stage('calibration'):
+                calibration.evaluate(self.frame, side)
@@ -0,0 +1,98 @@
+from __future__ import division
+import cv2
+
+
+class Face(object):
+    """
+    This class holds the eyes of a face and computes the
+    position of the pupils and the direction of the gaze
+    """
+
+    def __init__(self):
+        self.eye_left = None
+        self.eye_right = None
+
+    @property
+    def pupils_located(self):
+        """Check that the pupils have been located"""
+        try:
+            int(self.eye_left.pupil.x)
+            int(self.eye_left.pupil.y)
+            int(self.eye_right.pupil.x)
+            int(self.eye_right.pupil.y)
+            return True
+        except Exception:
+            return False
+
+    def eye_openness(self):
+        """Returns the mean eye aspect ratio of both eyes, about 0.3 when
+        they are open and close to 0 when they are closed, or None if the
+        eyes were not found"""
+        if self.eye_left is not None and self.eye_right is not None:
+            return (self.eye_left.openness + self.eye_right.openness) / 2
+
+    def is_blinking(self):
+        """Returns True if both eyes are closed, or None if the eyes were not found
+        or if the detection of the closed eyes is disabled"""
+        if self.eye_left is not None and self.eye_right is not None and self.eye_left.closed is not None:
+            return self.eye_left.closed and self.eye_right.closed
+
+    def pupil_left_coords(self):
+        """Returns the coordinates of the left pupil"""
+        if self.pupils_located:
+            x = self.eye_left.origin[0] + self.eye_left.pupil.x
+            y = self.eye_left.origin[1] + self.eye_left.pupil.y
+            return (x, y)
+
+    def pupil_right_coords(self):
+        """Returns the coordinates of the right pupil"""
+        if self.pupils_located:
+            x = self.eye_right.origin[0] + self.eye_right.pupil.x
+            y = self.eye_right.origin[1] + self.eye_right.pupil.y
+            return (x, y)
+
+    def _horizontal_ratio(self):
+        """Horizontal ratio of the gaze, the pupils must have been located"""
+        pupil_left = self.eye_left.pupil.x / (self.eye_left.center[0] * 2 - 10)
+        pupil_right = self.eye_right.pupil.x / (self.eye_right.center[0] * 2 - 10)
+        return (pupil_left + pupil_right) / 2
+
+    def _vertical_ratio(self):
+        """Vertical ratio of the gaze, the pupils must have been located"""
+        pupil_left = self.eye_left.pupil.y / (self.eye_left.center[1] * 2 - 10)
+        pupil_right = self.eye_right.pupil.y / (self.eye_right.center[1] * 2 - 10)
+        return (pupil_left + pupil_right) / 2
+
+    def horizontal_ratio(self):
+        """Returns a number between 0.0 and 1.0 that indicates the
+        horizontal direction of the gaze. The extreme right is 0.0,
+        the center is 0.5 and the extreme left is 1.0
+        """
+        if self.pupils_located:
+            return self._horizontal_ratio()
+
+    def vertical_ratio(self):
+        """Returns a number between 0.0 and 1.0 that indicates the
+        vertical direction of the gaze. The extreme top is 0.0,
+        the center is 0.5 and the extreme bottom is 1.0
+        """
+        if self.pupils_located:
+            return self._vertical_ratio()
+
+    def draw_pupils(self, frame):
+        """Draws circles around the pupils on the frame, if they are located
+
+        Argument:
+            frame (numpy.ndarray): Frame to draw on
+        """
+        if self.pupils_located:
+            color = (0, 255, 0)
+            x_left, y_left = self.pupil_left_coords()
+            x_right, y_right = self.pupil_right_coords()
+
+            # Draw circles around pupils using calculated radius
+            radius_left = self.eye_left.pupil.radius if self.eye_left.pupil.radius else 5
+            radius_right = self.eye_right.pupil.radius if self.eye_right.pupil.radius else 5
+
+            cv2.circle(frame, (x_left, y_left), radius_left, color, 2)
+            cv2.circle(frame, (x_right, y_right), radius_right, color, 2)
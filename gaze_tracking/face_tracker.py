@@ -0,0 +1,243 @@
+from __future__ import division
+import numpy as np
+import cv2
+import dlib
+
+
+def detect_faces(detector, frame, scale=1.0):
+    """Runs the face detector on a downscaled copy of the frame and returns
+    the face rectangles in full resolution coordinates
+
+    Arguments:
+        detector: dlib frontal face detector
+        frame (numpy.ndarray): Grayscale frame
+        scale (float): Scale of the frame given to the detector
+    """
+    if scale == 1:
+        return detector(frame)
+
+    small_frame = cv2.resize(frame, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+    faces = dlib.rectangles()
+    for face in detector(small_frame):
+        faces.append(dlib.rectangle(
+            int(round(face.left() / scale)),
+            int(round(face.top() / scale)),
+            int(round(face.right() / scale)),
+            int(round(face.bottom() / scale)),
+        ))
+    return faces
+
+
+class FaceTracker(object):
+    """
+    This class locates the face in a frame and fits the 68 facial landmarks.
+    In tracking mode, the landmarks of the previous frame are used to predict
+    the face region, so the expensive full-frame face detector only runs every
+    few frames or when the landmark fit is lost.
+    """
+
+    def __init__(self, detector, predictor, tracking=False, redetect_interval=10, max_drift=0.25,
+                 detection_scale=1.0):
+        """
+        Arguments:
+            detector: dlib frontal face detector
+            predictor (dlib.shape_predictor): 68 points landmarks predictor
+            tracking (bool): Reuses the previous landmarks instead of detecting the face on every frame
+            redetect_interval (int): Maximum number of frames between two full-frame detections
+            max_drift (float): Maximum movement of the landmarks between two frames, relative
+                to the size of the face, before the fit is considered lost
+            detection_scale (float): Scale of the frame given to the face detector. The landmarks
+                are always fitted on the full resolution frame.
+        """
+        if not 0 < detection_scale <= 1:
+            raise ValueError("detection_scale must be in the range (0, 1]")
+
+        self._detector = detector
+        self._predictor = predictor
+        self.tracking = tracking
+        self.redetect_interval = redetect_interval
+        self.max_drift = max_drift
+        self.detection_scale = detection_scale
+
+        self.detector_hits = 0
+        self.detector_misses = 0
+        self.tracked_frames = 0
+        self.tracking_failures = 0
+
+        self._points = None
+        self._rect_offsets = None
+        self._frames_since_detection = 0
+
+    @staticmethod
+    def _landmark_box(points):
+        """Returns the bounding box (x0, y0, x1, y1) of landmark points
+
+        Argument:
+            points (numpy.ndarray): Landmark points of shape (n, 2)
+        """
+        x0, y0 = points.min(axis=0)
+        x1, y1 = points.max(axis=0)
+        return x0, y0, x1, y1
+
+    @staticmethod
+    def _shape_to_points(landmarks):
+        """Returns the landmark points as a (n, 2) array
+
+        Argument:
+            landmarks (dlib.full_object_detection): Facial landmarks for the face region
+        """
+        return np.array([(p.x, p.y) for p in landmarks.parts()], np.int32)
+
+    def reset(self):
+        """Forgets the tracked face, the next frame runs the full detector"""
+        self._points = None
+        self._rect_offsets = None
+        self._frames_since_detection = 0
+
+    def stats(self):
+        """Returns the detection and tracking counters"""
+        return {
+            'detector_hits': self.detector_hits,
+            'detector_misses': self.detector_misses,
+            'tracked_frames': self.tracked_frames,
+            'tracking_failures': self.tracking_failures,
+        }
+
+    def _predicted_rect(self, frame):
+        """Returns the face rectangle predicted from the previous landmarks,
+        or None if it falls outside of the frame
+
+        Argument:
+            frame (numpy.ndarray): Grayscale frame
+        """
+        x0, y0, x1, y1 = self._landmark_box(self._points)
+        width, height = x1 - x0, y1 - y0
+        left = int(round(x0 + self._rect_offsets[0] * width))
+        top = int(round(y0 + self._rect_offsets[1] * height))
+        right = int(round(x1 + self._rect_offsets[2] * width))
+        bottom = int(round(y1 + self._rect_offsets[3] * height))
+
+        frame_height, frame_width = frame.shape[:2]
+        if right <= 0 or bottom <= 0 or left >= frame_width or top >= frame_height:
+            return None
+        return dlib.rectangle(left, top, right, bottom)
+
+    def _drift(self, points):
+        """Returns how much the landmarks moved since the previous frame,
+        relative to the size of the face
+
+        Argument:
+            points (numpy.ndarray): Landmark points of the current frame
+        """
+        px0, py0, px1, py1 = self._landmark_box(self._points)
+        x0, y0, x1, y1 = self._landmark_box(points)
+        prev_width, prev_height = max(px1 - px0, 1), max(py1 - py0, 1)
+        width, height = x1 - x0, y1 - y0
+
+        if width < 2 or height < 2:
+            return float('inf')
+
+        return max(
+            abs((x0 + x1) - (px0 + px1)) / 2 / prev_width,
+            abs((y0 + y1) - (py0 + py1)) / 2 / prev_height,
+            abs(width / prev_width - 1),
+            abs(height / prev_height - 1),
+        )
+
+    def _track(self, frame):
+        """Fits the landmarks in the face region predicted from the previous
+        frame. Returns None if the fit is lost.
+
+        Argument:
+            frame (numpy.ndarray): Grayscale frame
+        """
+        rect = self._predicted_rect(frame)
+        if rect is None:
+            return None
+
+        landmarks = self._predictor(frame, rect)
+        points = self._shape_to_points(landmarks)
+        if self._drift(points) > self.max_drift:
+            return None
+
+        self._points = points
+        return landmarks
+
+    def find_face(self, frame):
+        """Runs the full-frame face detector and returns the rectangle
+        of the first face found, or None if there is no face.
+
+        Argument:
+            frame (numpy.ndarray): Grayscale frame
+        """
+        faces = detect_faces(self._detector, frame, self.detection_scale)
+
+        if len(faces) == 0:
+            self.detector_misses += 1
+            self.reset()
+            return None
+
+        self.detector_hits += 1
+        return faces[0]
+
+    def fit(self, frame, rect):
+        """Fits the landmarks in a face rectangle found by find_face()
+        and remembers them for the tracking
+
+        Arguments:
+            frame (numpy.ndarray): Grayscale frame
+            rect (dlib.rectangle): Face rectangle
+        """
+        landmarks = self._predictor(frame, rect)
+        self._remember(landmarks, rect)
+        return landmarks
+
+    def _detect(self, frame):
+        """Runs the full-frame face detector and fits the landmarks
+        of the first face found. Returns None if there is no face.
+
+        Argument:
+            frame (numpy.ndarray): Grayscale frame
+        """
+        rect = self.find_face(frame)
+        if rect is None:
+            return None
+        return self.fit(frame, rect)
+
+    def _remember(self, landmarks, rect):
+        """Stores the landmarks and the position of the face rectangle relative
+        to them, so the rectangle can be predicted on the next frames
+
+        Arguments:
+            landmarks (dlib.full_object_detection): Facial landmarks for the face region
+            rect (dlib.rectangle): Face rectangle the landmarks were fitted in
+        """
+        points = self._shape_to_points(landmarks)
+        x0, y0, x1, y1 = self._landmark_box(points)
+        width, height = max(x1 - x0, 1), max(y1 - y0, 1)
+
+        self._points = points
+        self._rect_offsets = (
+            (rect.left() - x0) / width,
+            (rect.top() - y0) / height,
+            (rect.right() - x1) / width,
+            (rect.bottom() - y1) / height,
+        )
+        self._frames_since_detection = 0
+
+    def locate(self, frame):
+        """Returns the facial landmarks of the face in the frame,
+        or None if no face is found
+
+        Argument:
+            frame (numpy.ndarray): Grayscale frame
+        """
+        if self.tracking and self._points is not None and self._frames_since_detection < self.redetect_interval:
+            landmarks = self._track(frame)
+            if landmarks is not None:
+                self._frames_since_detection += 1
+                self.tracked_frames += 1
+                return landmarks
+            self.tracking_failures += 1
+
+        return self._detect(frame)
@@ -1,115 +1,458 @@
 from __future__ import division
 import os
+import time
+import numpy as np
 import cv2
-import dlib
+from . import models
 from .eye import Eye
+from .pupil import Pupil
 from .calibration import Calibration
+from .face import Face
+from .face_tracker import FaceTracker
+from .multi_face import MultiFaceTracker
+from .profiling import Profiler
+from .stream import pipelined, sequential
+from .blink import BlinkDetector
 
 
-class GazeTracking(object):
+class GazeTracking(Face):
     """
     This class tracks the user's gaze.
     It provides useful information like the position of the eyes
     and pupils and allows to know if the eyes are open or closed
     """
 
-    def __init__(self):
+    # Record of the results of one frame, see record and analyze_batch()
+    BATCH_DTYPE = np.dtype([
+        ('valid', np.bool_),
+        ('pupil_left', np.int32, (2,)),
+        ('pupil_right', np.int32, (2,)),
+        ('radius_left', np.int32),
+        ('radius_right', np.int32),
+        ('horizontal', np.float64),
+        ('vertical', np.float64),
+        ('openness', np.float64),
+    ])
+
+    def __init__(self, tracking=False, redetect_interval=10, detection_scale=1.0, calibration=None,
+                 multi_face=False, face_workers=None, profiling=False, pupil_method='contours',
+                 smoothing=None, motion_gate=None, keep_frames=True, closed_threshold=None):
+        """
+        Arguments:
+            tracking (bool): Predicts the face region from the landmarks of the previous
+                frame instead of running the face detector on every frame
+            redetect_interval (int): In tracking mode, maximum number of frames between
+                two full-frame face detections
+            detection_scale (float): Scale of the frame given to the face detector, between 0 and 1.
+                Landmarks and pupils are still computed on the full resolution frame.
+            calibration (calibration.Calibration): Calibration to start from, for example
+                a profile loaded from a CalibrationStore. A new one is created if None.
+            multi_face (bool): Tracks every face of the frame, each with its own calibration.
+                The faces are listed in the faces attribute. The faces are detected on every
+                frame, so it can't be combined with tracking or with a calibration.
+            face_workers (int): In multi-face mode, number of threads analyzing the faces.
+                Defaults to the number of CPUs, up to 4. They are stopped by close().
+            profiling (bool): Records the duration of each stage of the analysis,
+                see stage_stats. Can also be toggled later with profiler.enabled.
+            pupil_method (str): How the pupil is located in the binarized eye: 'contours'
+                (second largest contour) or 'components' (largest enclosed dark region,
+                without building the contours)
+            smoothing (smoothing.GazeFilter): Smooths the pupils coordinates and the gaze
+                ratios over time, and predicts them for a short time when the pupils are
+                not located or when predict() is called instead of refresh()
+            motion_gate (motion_gate.MotionGate): Reuses the results of the previous frame
+                instead of analyzing the new one while the eye regions don't change
+            keep_frames (bool): Keeps the isolated eye frames and the binarized iris frames
+                in the Eye and Pupil objects, and the analyzed frame for annotated_frame().
+                Without them, the results only hold numbers.
+            closed_threshold (float): Eye aspect ratio below which an eye is closed, see
+                eye_openness(), for example 0.2. The pupil of a closed eye isn't searched,
+                and both eyes closed are a blink. None disables the detection of the closed
+                eyes and of the blinks, every eye is then analyzed.
+        """
+        if pupil_method not in Pupil.METHODS:
+            raise ValueError("Unknown pupil localization method: {}".format(pupil_method))
+        if multi_face and tracking:
+            raise ValueError("The multi-face mode detects the faces on every frame, it doesn't support tracking")
+        if multi_face and calibration is not None:
+            raise ValueError("In multi-face mode each face has its own calibration, "
+                             "a calibration can't be given")
+
+        super(GazeTracking, self).__init__()
         self.frame = None
-        self.eye_left = None
-        self.eye_right = None
-        self.calibration = Calibration()
+        self.faces = []
+        self.calibration = calibration if calibration is not None else Calibration()
+        self._gray_frame = None
+        self.pupil_method = pupil_method
+        self.smoothing = smoothing
+        self._smoothed = (None, None)
+        self._main_track_id = None
+        self.motion_gate = motion_gate
+        self.keep_frames = keep_frames
+        self.closed_threshold = closed_threshold
+
+        # blinks turns the closed eyes of successive frames into blink events
+        self.blinks = BlinkDetector()
+
+        # record holds the results of the last analyzed frame, updated in place
+        self.record = np.zeros((), dtype=self.BATCH_DTYPE)
+        self._write_record()
+
+        # profiler times the stages of the analysis, it only costs a few calls when disabled
+        self.profiler = Profiler(enabled=profiling)
 
         # _face_detector is used to detect faces
-        self._face_detector = dlib.get_frontal_face_detector()
+        self._face_detector = self.profiler.wrap('face_detector', models.face_detector)
+
+        # _predictor is used to get facial landmarks of a given face. The model
+        # is shared by all the instances and loaded on the first analyzed frame.
+        self._predictor = self.profiler.wrap('shape_predictor', models.shape_predictor)
 
-        # _predictor is used to get facial landmarks of a given face
-        cwd = os.path.abspath(os.path.dirname(__file__))
-        model_path = os.path.abspath(os.path.join(cwd, "trained_models/shape_predictor_68_face_landmarks.dat"))
-        self._predictor = dlib.shape_predictor(model_path)
+        # _face_tracker locates the face and decides when the detector has to run
+        self._face_tracker = FaceTracker(self._face_detector, self._predictor, tracking, redetect_interval,
+                                         detection_scale=detection_scale)
+
+        # _multi_face_tracker follows all the faces in multi-face mode
+        self._multi_face_tracker = None
+        if multi_face:
+            if face_workers is None:
+                face_workers = min(os.cpu_count() or 1, 4)
+            self._multi_face_tracker = MultiFaceTracker(self._face_detector, self._predictor,
+                                                        detection_scale=detection_scale, workers=face_workers,
+                                                        profiler=self.profiler, pupil_method=pupil_method,
+                                                        keep_frames=keep_frames,
+                                                        closed_threshold=closed_threshold)
+
+    @property
+    def tracking_stats(self):
+        """Returns the face detector hits/misses and the tracking counters"""
+        return self._face_tracker.stats()
 
     @property
-    def pupils_located(self):
-        """Check that the pupils have been located"""
-        try:
-            int(self.eye_left.pupil.x)
-            int(self.eye_left.pupil.y)
-            int(self.eye_right.pupil.x)
-            int(self.eye_right.pupil.y)
-            return True
-        except Exception:
-            return False
+    def stage_stats(self):
+        """Returns the number of calls and the mean/p50/p95/p99 durations in
+        milliseconds of each stage recorded while profiling was enabled"""
+        return self.profiler.summary()
+
+    def _eyes(self, frame, landmarks):
+        """Returns the left and right Eye objects of the landmarks, or (None, None)
+
+        Arguments:
+            frame (numpy.ndarray): Grayscale frame
+            landmarks (dlib.full_object_detection): Facial landmarks, or None if there is no face
+        """
+        if landmarks is None:
+            return None, None
+
+        return (Eye(frame, landmarks, 0, self.calibration, self.profiler, self.pupil_method, self.keep_frames,
+                    self.closed_threshold),
+                Eye(frame, landmarks, 1, self.calibration, self.profiler, self.pupil_method, self.keep_frames,
+                    self.closed_threshold))
+
+    def _locate_eyes(self, frame):
+        """Returns the (faces, eye_left, eye_right) found in a grayscale frame.
+        The attributes are left unchanged, so it can run on a thread of process_stream().
+
+        Argument:
+            frame (numpy.ndarray): Grayscale frame
+        """
+        if self._multi_face_tracker is not None:
+            # The eyes of the face tracked for the longest time are also the main ones
+            faces = self._multi_face_tracker.update(frame)
+            main_face = faces[0] if faces else Face()
+            return faces, main_face.eye_left, main_face.eye_right
+
+        eye_left, eye_right = self._eyes(frame, self._face_tracker.locate(frame))
+        return [], eye_left, eye_right
+
+    @staticmethod
+    def _all_eyes(faces, eye_left, eye_right):
+        """Returns the Eye objects of every face, or of the main face in single face mode"""
+        if faces:
+            eyes = [eye for face in faces for eye in (face.eye_left, face.eye_right)]
+        else:
+            eyes = [eye_left, eye_right]
+        return [eye for eye in eyes if eye is not None]
 
     def _analyze(self):
         """Detects the face and initialize Eye objects"""
-        frame = cv2.cvtColor(self.frame, cv2.COLOR_BGR2GRAY)
-        faces = self._face_detector(frame)
+        # The grayscale buffer is reused from one frame to the next
+        with self.profiler.stage('grayscale'):
+            self._gray_frame = cv2.cvtColor(self.frame, cv2.COLOR_BGR2GRAY, dst=self._gray_frame)
 
-        try:
-            landmarks = self._predictor(frame, faces[0])
-            self.eye_left = Eye(frame, landmarks, 0, self.calibration)
-            self.eye_right = Eye(frame, landmarks, 1, self.calibration)
+        self.faces, self.eye_left, self.eye_right = self._locate_eyes(self._gray_frame)
 
-        except IndexError:
-            self.eye_left = None
-            self.eye_right = None
-
-    def refresh(self, frame):
+    def refresh(self, frame, timestamp=None):
         """Refreshes the frame and analyzes it.
 
         Arguments:
             frame (numpy.ndarray): The frame to analyze
+            timestamp (float): Time of the frame in seconds, used by the blink detection
+                and the smoothing. Defaults to the current time.
         """
         self.frame = frame
+        with self.profiler.stage('refresh'):
+            if self.motion_gate is None:
+                self._analyze()
+            else:
+                self._gated_analyze()
+        self._write_record()
+        self._update_history(time.monotonic() if timestamp is None else timestamp)
+
+        # Without the debug frames, the tracker doesn't hold the input frame
+        # between two frames, only the reused grayscale buffer
+        if not self.keep_frames:
+            self.frame = None
+
+    def reset(self):
+        """Forgets what the previous frames tell about the next ones: the tracked
+        faces, the reference frame of the motion gate, the closure in progress and
+        the smoothed gaze. The calibration is kept. Call it before analyzing frames
+        that don't follow the previous ones, like another part of a video."""
+        self._face_tracker.reset()
+        if self._multi_face_tracker is not None:
+            self._multi_face_tracker.reset()
+        if self.motion_gate is not None:
+            self.motion_gate.reset()
+        if self.smoothing is not None:
+            self.smoothing.reset()
+        self.blinks.reset()
+        self._smoothed = (None, None)
+        self._main_track_id = None
+
+    def close(self):
+        """Stops the threads of the multi-face mode. The instance can still be
+        used, the threads are started again on the next frame with several faces."""
+        if self._multi_face_tracker is not None:
+            self._multi_face_tracker.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def _gated_analyze(self):
+        """Analyzes the frame unless the motion gate allows to keep the previous results"""
+        with self.profiler.stage('motion_gate'):
+            skip = self.motion_gate.should_skip(self.frame)
+        if skip:
+            return
+
         self._analyze()
+        self.motion_gate.remember(self.frame, self._all_eyes(self.faces, self.eye_left, self.eye_right))
 
-    def pupil_left_coords(self):
-        """Returns the coordinates of the left pupil"""
+    def process_stream(self, frames, queue_size=2, threaded=None):
+        """Analyzes a stream of frames and yields each frame once the attributes
+        describe it, like after refresh(). The frames are analyzed in order with
+        the same results as refresh(), but the stages overlap on worker threads:
+        the next frames are read, converted to grayscale and their face detected
+        while the landmarks and the pupils of the previous ones are computed.
+
+        In multi-face mode and with a motion gate, each frame depends on the
+        results of the previous one, so only the reading of the frames overlaps
+        with the analysis.
+
+        Arguments:
+            frames: Iterable of frames, read on a worker thread
+            queue_size (int): Maximum number of frames waiting between two stages
+            threaded (bool): Runs the stages on worker threads. Defaults to True on
+                machines with several CPUs: on a single one, the stages can't overlap
+                and passing the frames between threads only adds latency.
+        """
+        if threaded is None:
+            threaded = (os.cpu_count() or 1) > 1
+
+        if self._multi_face_tracker is not None or self.motion_gate is not None:
+            stages = [self._sequential_stage()]
+        else:
+            stages = [self._detection_stage, self._landmarks_stage, self._eyes_stage]
+
+        analyzed = pipelined(frames, stages, queue_size) if threaded else sequential(frames, stages)
+        for frame, faces, eye_left, eye_right in analyzed:
+            self.frame, self.faces, self.eye_left, self.eye_right = frame, faces, eye_left, eye_right
+            self._write_record()
+            self._update_history(time.monotonic())
+            yield frame
+            if not self.keep_frames:
+                self.frame = None
+
+    def _detection_stage(self, frame):
+        """First stage of process_stream(): grayscale conversion and face detection"""
+        with self.profiler.stage('grayscale'):
+            gray_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+
+        # In tracking mode, the face region is predicted from the landmarks of the
+        # previous frame, so the landmarks stage locates the face itself
+        rect = None if self._face_tracker.tracking else self._face_tracker.find_face(gray_frame)
+        return frame, gray_frame, rect
+
+    def _landmarks_stage(self, item):
+        """Second stage of process_stream(): facial landmarks"""
+        frame, gray_frame, rect = item
+        if self._face_tracker.tracking:
+            landmarks = self._face_tracker.locate(gray_frame)
+        else:
+            landmarks = self._face_tracker.fit(gray_frame, rect) if rect is not None else None
+        return frame, gray_frame, landmarks
+
+    def _eyes_stage(self, item):
+        """Last stage of process_stream(): eyes isolation, calibration and pupils"""
+        frame, gray_frame, landmarks = item
+        eye_left, eye_right = self._eyes(gray_frame, landmarks)
+        return frame, [], eye_left, eye_right
+
+    def _sequential_stage(self):
+        """Returns the single stage of process_stream() in multi-face mode or
+        with a motion gate, which analyzes each frame like refresh()"""
+        last = [(self.faces, self.eye_left, self.eye_right)]
+
+        def analyze(frame):
+            if self.motion_gate is not None:
+                with self.profiler.stage('motion_gate'):
+                    skip = self.motion_gate.should_skip(frame)
+                if skip:
+                    return (frame,) + last[0]
+
+            with self.profiler.stage('grayscale'):
+                gray_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+            last[0] = self._locate_eyes(gray_frame)
+            if self.motion_gate is not None:
+                self.motion_gate.remember(frame, self._all_eyes(*last[0]))
+            return (frame,) + last[0]
+        return analyze
+
+    def _update_history(self, timestamp):
+        """Gives the analyzed frame to the blink detector and to the smoothing filter"""
+        # In multi-face mode, the history of the previous main face doesn't apply to a new one
+        if self.faces and self.faces[0].track_id != self._main_track_id:
+            self._main_track_id = self.faces[0].track_id
+            self.blinks.reset()
+            if self.smoothing is not None:
+                self.smoothing.reset()
+
+        self.blinks.update(timestamp, self.is_blinking())
+        if self.smoothing is not None:
+            self._update_smoothing(timestamp)
+
+    def _update_smoothing(self, timestamp):
+        """Gives the measurements of the analyzed frame to the smoothing filter"""
         if self.pupils_located:
-            x = self.eye_left.origin[0] + self.eye_left.pupil.x
-            y = self.eye_left.origin[1] + self.eye_left.pupil.y
-            return (x, y)
+            left, right = self.pupil_left_coords_raw(), self.pupil_right_coords_raw()
+            self._smoothed = self.smoothing.update(timestamp, left + right,
+                                                   (self._horizontal_ratio(), self._vertical_ratio()))
+        else:
+            self._smoothed = self.smoothing.update(timestamp)
+
+    def predict(self, timestamp=None):
+        """Updates the outputs for a frame that isn't analyzed, from the smoothed
+        movement of the previous frames. Allows to run refresh() on every few frames only.
+
+        Argument:
+            timestamp (float): Time of the frame in seconds, defaults to the current time
+        """
+        if self.smoothing is None:
+            raise ValueError("predict() requires a smoothing filter")
+        self._smoothed = self.smoothing.predict(time.monotonic() if timestamp is None else timestamp)
+
+    def pupil_left_coords_raw(self):
+        """Returns the coordinates of the left pupil located in the last frame, not smoothed"""
+        return super(GazeTracking, self).pupil_left_coords()
+
+    def pupil_right_coords_raw(self):
+        """Returns the coordinates of the right pupil located in the last frame, not smoothed"""
+        return super(GazeTracking, self).pupil_right_coords()
+
+    def pupil_left_coords(self):
+        """Returns the coordinates of the left pupil, smoothed if a filter is set"""
+        if self.smoothing is None:
+            return self.pupil_left_coords_raw()
+        coords = self._smoothed[0]
+        if coords is not None:
+            return (int(round(coords[0])), int(round(coords[1])))
 
     def pupil_right_coords(self):
-        """Returns the coordinates of the right pupil"""
-        if self.pupils_located:
-            x = self.eye_right.origin[0] + self.eye_right.pupil.x
-            y = self.eye_right.origin[1] + self.eye_right.pupil.y
-            return (x, y)
+        """Returns the coordinates of the right pupil, smoothed if a filter is set"""
+        if self.smoothing is None:
+            return self.pupil_right_coords_raw()
+        coords = self._smoothed[0]
+        if coords is not None:
+            return (int(round(coords[2])), int(round(coords[3])))
 
     def horizontal_ratio(self):
         """Returns a number between 0.0 and 1.0 that indicates the
-        horizontal direction of the gaze. The extreme right is 0.0,
-        the center is 0.5 and the extreme left is 1.0
+        horizontal direction of the gaze, smoothed if a filter is set.
+        The extreme right is 0.0, the center is 0.5 and the extreme left is 1.0
         """
-        if self.pupils_located:
-            pupil_left = self.eye_left.pupil.x / (self.eye_left.center[0] * 2 - 10)
-            pupil_right = self.eye_right.pupil.x / (self.eye_right.center[0] * 2 - 10)
-            return (pupil_left + pupil_right) / 2
+        if self.smoothing is None:
+            return super(GazeTracking, self).horizontal_ratio()
+        ratios = self._smoothed[1]
+        if ratios is not None:
+            return float(ratios[0])
 
     def vertical_ratio(self):
         """Returns a number between 0.0 and 1.0 that indicates the
-        vertical direction of the gaze. The extreme top is 0.0,
-        the center is 0.5 and the extreme bottom is 1.0
+        vertical direction of the gaze, smoothed if a filter is set.
+        The extreme top is 0.0, the center is 0.5 and the extreme bottom is 1.0
         """
-        if self.pupils_located:
-            pupil_left = self.eye_left.pupil.y / (self.eye_left.center[1] * 2 - 10)
-            pupil_right = self.eye_right.pupil.y / (self.eye_right.center[1] * 2 - 10)
-            return (pupil_left + pupil_right) / 2
+        if self.smoothing is None:
+            return super(GazeTracking, self).vertical_ratio()
+        ratios = self._smoothed[1]
+        if ratios is not None:
+            return float(ratios[1])
+
+    def _write_record(self):
+        """Writes the results of the current frame in record, without allocating.
+        When the pupils are not located, 'valid' is False, coordinates and radii
+        are 0 and ratios are NaN. 'openness' is NaN when the eyes were not found."""
+        record = self.record
+        openness = self.eye_openness()
+        record['openness'] = np.nan if openness is None else openness
+        if not self.pupils_located:
+            record['valid'] = False
+            record['pupil_left'] = record['pupil_right'] = 0
+            record['radius_left'] = record['radius_right'] = 0
+            record['horizontal'] = record['vertical'] = np.nan
+            return
+
+        left, right = self.eye_left, self.eye_right
+        record['valid'] = True
+        record['pupil_left'] = (left.origin[0] + left.pupil.x, left.origin[1] + left.pupil.y)
+        record['pupil_right'] = (right.origin[0] + right.pupil.x, right.origin[1] + right.pupil.y)
+        record['radius_left'] = left.pupil.radius or 0
+        record['radius_right'] = right.pupil.radius or 0
+        record['horizontal'] = self._horizontal_ratio()
+        record['vertical'] = self._vertical_ratio()
+
+    def analyze_batch(self, frames, timestamps=None):
+        """Analyzes a sequence of frames and returns all the results at once.
+
+        Arguments:
+            frames: List of frames or 4-D array of shape (n, height, width, 3)
+            timestamps: Time of each frame in seconds, like frame_index / fps for
+                the frames of a video. Defaults to the current time.
+
+        Returns:
+            A structured numpy.ndarray of BATCH_DTYPE with one record per frame.
+            When 'valid' is False, the pupils were not located: coordinates and
+            radii are 0 and ratios are NaN.
+        """
+        results = np.empty(len(frames), dtype=self.BATCH_DTYPE)
+        for i, frame in enumerate(frames):
+            self.refresh(frame, None if timestamps is None else timestamps[i])
+            results[i] = self.record
+        return results
 
     def annotated_frame(self):
         """Returns the main frame with pupils highlighted"""
+        if self.frame is None:
+            raise ValueError("No frame to annotate, the frames are released when keep_frames is False")
         frame = self.frame.copy()
 
-        if self.pupils_located:
-            color = (0, 255, 0)
-            x_left, y_left = self.pupil_left_coords()
-            x_right, y_right = self.pupil_right_coords()
-
-            # Draw circles around pupils using calculated radius
-            radius_left = self.eye_left.pupil.radius if self.eye_left.pupil.radius else 5
-            radius_right = self.eye_right.pupil.radius if self.eye_right.pupil.radius else 5
-
-            cv2.circle(frame, (x_left, y_left), radius_left, color, 2)
-            cv2.circle(frame, (x_right, y_right), radius_right, color, 2)
+        if self._multi_face_tracker is not None:
+            for face in self.faces:
+                face.draw_pupils(frame)
+        else:
+            self.draw_pupils(frame)
 
         return frame
@@ -0,0 +1,67 @@
+"""
+Process-wide registry of the dlib models.
+The shape predictor (about 100 MB) is loaded once, on first use, and shared
+by all the GazeTracking instances of the process. Calling preload() before
+forking worker processes lets them share its memory pages copy-on-write.
+"""
+
+import os
+import threading
+import dlib
+
+
+MODEL_PATH = os.path.abspath(os.path.join(os.path.dirname(__file__),
+                                          "trained_models/shape_predictor_68_face_landmarks.dat"))
+
+_lock = threading.Lock()
+_predictor = None
+
+# The face detector keeps its scanning state between calls, so each thread
+# gets its own instance. It is small and quick to create.
+_local = threading.local()
+
+
+def get_shape_predictor():
+    """Returns the shared 68 points shape predictor, loading it on first call"""
+    global _predictor
+    if _predictor is None:
+        with _lock:
+            if _predictor is None:
+                _predictor = dlib.shape_predictor(MODEL_PATH)
+    return _predictor
+
+
+def get_face_detector():
+    """Returns the frontal face detector of the current thread"""
+    detector = getattr(_local, 'face_detector', None)
+    if detector is None:
+        detector = _local.face_detector = dlib.get_frontal_face_detector()
+    return detector
+
+
+def preload():
+    """Loads the models now instead of on the first analyzed frame"""
+    get_shape_predictor()
+    get_face_detector()
+
+
+def is_loaded():
+    """Returns true if the shape predictor has been loaded in this process"""
+    return _predictor is not None
+
+
+class _LazyModel(object):
+    """
+    Callable standing for a model of the registry, which
+    is only fetched, and loaded if needed, when called.
+    """
+
+    def __init__(self, getter):
+        self._getter = getter
+
+    def __call__(self, *args):
+        return self._getter()(*args)
+
+
+face_detector = _LazyModel(get_face_detector)
+shape_predictor = _LazyModel(get_shape_predictor)
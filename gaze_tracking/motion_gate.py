@@ -0,0 +1,110 @@
+from __future__ import division
+import cv2
+
+
+class MotionGate(object):
+    """
+    This class decides whether a frame has to be analyzed or whether the
+    results of the previous analyzed frame still hold. It compares the eye
+    regions of the new frame with the same regions of the last analyzed
+    frame, downscaled to average out the sensor noise. The comparison only
+    converts and resizes the eye regions, so it costs a small fraction of
+    the face detection and of the pupil localization.
+    """
+
+    def __init__(self, threshold=2.0, max_skips=4, downscale=2):
+        """
+        Arguments:
+            threshold (float): Mean absolute difference of the gray levels of an eye
+                region above which the frame is analyzed. The noise of a webcam stays
+                below 1, a face moving by half a pixel gives about 5.
+            max_skips (int): Maximum number of consecutive frames reusing the results
+            downscale (int): Factor by which the eye regions are shrunk before the comparison
+        """
+        if threshold < 0:
+            raise ValueError("threshold must be positive")
+        if max_skips < 0:
+            raise ValueError("max_skips must be positive")
+
+        self.threshold = threshold
+        self.max_skips = max_skips
+        self.downscale = max(int(downscale), 1)
+
+        self.processed_frames = 0
+        self.skipped_frames = 0
+
+        # (x, y, width, height, downscaled gray region) of each eye of the last analyzed frame
+        self._references = []
+        self._consecutive_skips = 0
+        self.last_change = None
+
+    def reset(self):
+        """Forgets the last analyzed frame, the next frame is analyzed"""
+        self._references = []
+        self._consecutive_skips = 0
+        self.last_change = None
+
+    def stats(self):
+        """Returns the number of analyzed and skipped frames"""
+        return {
+            'processed_frames': self.processed_frames,
+            'skipped_frames': self.skipped_frames,
+        }
+
+    def _region(self, frame, x, y, width, height):
+        """Returns the downscaled gray region of the frame
+
+        Arguments:
+            frame (numpy.ndarray): BGR or grayscale frame
+            x, y, width, height (int): Region of the frame
+        """
+        region = frame[y:y + height, x:x + width]
+        if region.ndim == 3:
+            region = cv2.cvtColor(region, cv2.COLOR_BGR2GRAY)
+        size = (max(width // self.downscale, 1), max(height // self.downscale, 1))
+        return cv2.resize(region, size, interpolation=cv2.INTER_AREA)
+
+    def _change(self, frame):
+        """Returns the largest change of the eye regions since the last analyzed frame"""
+        change = 0
+        for x, y, width, height, reference in self._references:
+            region = self._region(frame, x, y, width, height)
+            if region.shape != reference.shape:
+                return float('inf')
+            change = max(change, cv2.norm(region, reference, cv2.NORM_L1) / region.size)
+        return change
+
+    def should_skip(self, frame):
+        """Returns True if the results of the last analyzed frame can be reused
+        for this frame, and counts the frame as skipped or processed
+
+        Argument:
+            frame (numpy.ndarray): New frame, same size as the analyzed ones
+        """
+        if self._references and self._consecutive_skips < self.max_skips:
+            self.last_change = self._change(frame)
+            if self.last_change <= self.threshold:
+                self._consecutive_skips += 1
+                self.skipped_frames += 1
+                return True
+
+        self._consecutive_skips = 0
+        self.processed_frames += 1
+        return False
+
+    def remember(self, frame, eyes):
+        """Stores the eye regions of an analyzed frame, as the reference
+        of the next frames. Without eyes, the next frame is analyzed.
+
+        Arguments:
+            frame (numpy.ndarray): Analyzed frame
+            eyes (list): Eye objects found in the frame
+        """
+        self._references = []
+        for eye in eyes:
+            # An eye outside of the frame has no region to compare
+            if eye.center is None:
+                continue
+            x, y = (int(value) for value in eye.origin)
+            width, height = int(eye.center[0] * 2), int(eye.center[1] * 2)
+            self._references.append((x, y, width, height, self._region(frame, x, y, width, height)))
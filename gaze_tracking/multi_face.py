@@ -0,0 +1,186 @@
+from __future__ import division
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+from .eye import Eye
+from .calibration import Calibration
+from .face import Face
+from .face_tracker import detect_faces
+
+
+class TrackedFace(Face):
+    """
+    This class holds the state of one face followed across frames:
+    its stable identifier, its own calibration and its eyes.
+    """
+
+    def __init__(self, track_id, rect, calibration):
+        super(TrackedFace, self).__init__()
+        self.track_id = track_id
+        self.rect = rect
+        self.calibration = calibration
+        self.landmarks = None
+        self.missed_frames = 0
+
+    def analyze(self, frame, predictor, profiler=None, pupil_method='contours', keep_frames=True,
+                closed_threshold=None):
+        """Fits the landmarks of the face and initializes its Eye objects
+
+        Arguments:
+            frame (numpy.ndarray): Grayscale frame
+            predictor (dlib.shape_predictor): 68 points landmarks predictor
+            profiler (profiling.Profiler): Records the duration of each stage
+            pupil_method (str): Localization method of the pupils, 'contours' or 'components'
+            keep_frames (bool): Keeps the eye and iris frames of the Eye objects
+            closed_threshold (float): Eye aspect ratio below which an eye is closed, None to disable
+        """
+        self.landmarks = predictor(frame, self.rect)
+        self.eye_left = Eye(frame, self.landmarks, 0, self.calibration, profiler, pupil_method, keep_frames,
+                            closed_threshold)
+        self.eye_right = Eye(frame, self.landmarks, 1, self.calibration, profiler, pupil_method, keep_frames,
+                             closed_threshold)
+
+
+def iou_matrix(boxes_a, boxes_b):
+    """Returns the intersection over union of every pair of boxes
+
+    Arguments:
+        boxes_a (numpy.ndarray): Boxes (left, top, right, bottom) of shape (n, 4)
+        boxes_b (numpy.ndarray): Boxes (left, top, right, bottom) of shape (m, 4)
+    """
+    a = boxes_a[:, None, :]
+    b = boxes_b[None, :, :]
+    width = np.clip(np.minimum(a[..., 2], b[..., 2]) - np.maximum(a[..., 0], b[..., 0]), 0, None)
+    height = np.clip(np.minimum(a[..., 3], b[..., 3]) - np.maximum(a[..., 1], b[..., 1]), 0, None)
+    intersection = width * height
+    area_a = (a[..., 2] - a[..., 0]) * (a[..., 3] - a[..., 1])
+    area_b = (b[..., 2] - b[..., 0]) * (b[..., 3] - b[..., 1])
+    return intersection / np.maximum(area_a + area_b - intersection, 1)
+
+
+class MultiFaceTracker(object):
+    """
+    This class detects every face of the frame and associates them with
+    the faces of the previous frames by intersection over union, so each
+    face keeps its identifier and its calibration while it is visible.
+    """
+
+    def __init__(self, detector, predictor, detection_scale=1.0, iou_threshold=0.3, max_missed=5,
+                 workers=1, calibration_options=None, profiler=None, pupil_method='contours',
+                 keep_frames=True, closed_threshold=None):
+        """
+        Arguments:
+            detector: dlib frontal face detector
+            predictor (dlib.shape_predictor): 68 points landmarks predictor
+            detection_scale (float): Scale of the frame given to the face detector
+            iou_threshold (float): Minimum overlap for a detection to continue a track
+            max_missed (int): Number of frames a face can be missing before its track is dropped
+            workers (int): Number of threads analyzing the faces when there are several
+            calibration_options (dict): Keyword arguments given to the Calibration of each face
+            profiler (profiling.Profiler): Records the duration of each stage of the eyes analysis
+            pupil_method (str): Localization method of the pupils, 'contours' or 'components'
+            keep_frames (bool): Keeps the eye and iris frames of the Eye objects
+            closed_threshold (float): Eye aspect ratio below which an eye is closed, None to disable
+        """
+        self._detector = detector
+        self._predictor = predictor
+        self.detection_scale = detection_scale
+        self.iou_threshold = iou_threshold
+        self.max_missed = max_missed
+        self.workers = workers
+        self.calibration_options = calibration_options or {}
+        self._profiler = profiler
+        self.pupil_method = pupil_method
+        self.keep_frames = keep_frames
+        self.closed_threshold = closed_threshold
+
+        self.tracks = []
+        self._next_id = 0
+        self._executor = None
+
+    def reset(self):
+        """Forgets the tracked faces, the next faces get new identifiers"""
+        self.tracks = []
+
+    def close(self):
+        """Stops the threads analyzing the faces. They are started again if
+        another frame is analyzed."""
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
+
+    def _associate(self, rects):
+        """Matches the detected rectangles with the current tracks, best overlaps first.
+        Returns the (track, rect) pairs and the unmatched rectangles.
+
+        Argument:
+            rects (list): Detected face rectangles
+        """
+        if not self.tracks or not rects:
+            return [], list(rects)
+
+        track_boxes = np.array([[t.rect.left(), t.rect.top(), t.rect.right(), t.rect.bottom()]
+                                for t in self.tracks], np.float64)
+        rect_boxes = np.array([[r.left(), r.top(), r.right(), r.bottom()] for r in rects], np.float64)
+        ious = iou_matrix(track_boxes, rect_boxes)
+
+        matches = []
+        used_tracks, used_rects = set(), set()
+        for index in np.argsort(ious, axis=None)[::-1]:
+            i, j = np.unravel_index(index, ious.shape)
+            if ious[i, j] < self.iou_threshold:
+                break
+            if i in used_tracks or j in used_rects:
+                continue
+            used_tracks.add(i)
+            used_rects.add(j)
+            matches.append((self.tracks[i], rects[j]))
+
+        unmatched = [rect for j, rect in enumerate(rects) if j not in used_rects]
+        return matches, unmatched
+
+    def _analyze_faces(self, frame, faces):
+        """Runs the landmarks and pupils stages of the faces, on several threads if needed"""
+        def analyze(face):
+            face.analyze(frame, self._predictor, self._profiler, self.pupil_method, self.keep_frames,
+                         self.closed_threshold)
+
+        if self.workers > 1 and len(faces) > 1:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.workers)
+            list(self._executor.map(analyze, faces))
+        else:
+            for face in faces:
+                analyze(face)
+
+    def update(self, frame):
+        """Detects and analyzes the faces of a new frame.
+        Returns the visible faces, sorted by identifier.
+
+        Argument:
+            frame (numpy.ndarray): Grayscale frame
+        """
+        rects = list(detect_faces(self._detector, frame, self.detection_scale))
+        matches, unmatched = self._associate(rects)
+
+        visible = []
+        for track, rect in matches:
+            track.rect = rect
+            track.missed_frames = 0
+            visible.append(track)
+
+        for rect in unmatched:
+            track = TrackedFace(self._next_id, rect, Calibration(**self.calibration_options))
+            self._next_id += 1
+            self.tracks.append(track)
+            visible.append(track)
+
+        for track in self.tracks:
+            if track not in visible:
+                track.missed_frames += 1
+                track.eye_left = None
+                track.eye_right = None
+        self.tracks = [track for track in self.tracks if track.missed_frames <= self.max_missed]
+
+        visible.sort(key=lambda track: track.track_id)
+        self._analyze_faces(frame, visible)
+        return visible
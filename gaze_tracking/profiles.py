@@ -0,0 +1,152 @@
+from __future__ import division
+import json
+import os
+import tempfile
+import time
+from contextlib import contextmanager
+from .calibration import Calibration
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+
+def write_json(path, data):
+    """Writes data to a JSON file atomically: the data is written to a temporary
+    file of the same directory, which then replaces the file, so readers never
+    see a partially written file
+
+    Arguments:
+        path (str): Path of the JSON file
+        data (dict): JSON serializable data
+    """
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'w') as f:
+            json.dump(data, f)
+        os.replace(tmp_path, path)
+    except Exception:
+        os.remove(tmp_path)
+        raise
+
+
+class CalibrationStore(object):
+    """
+    This class persists calibration profiles in a JSON file, keyed by
+    user and camera, so a new GazeTracking instance can start with a
+    complete calibration instead of calibrating on its first frames.
+    The store is bounded: the least recently used profiles are evicted.
+
+    Every change reads, modifies and rewrites the whole file while holding
+    an exclusive lock on a '.lock' file next to it, so several processes,
+    like the workers of the backend, can share a store without losing
+    profiles. The lock needs fcntl: on Windows the store is single-writer.
+    """
+
+    def __init__(self, path, max_profiles=100, max_age=None):
+        """
+        Arguments:
+            path (str): Path of the JSON file of the store
+            max_profiles (int): Maximum number of profiles kept in the store
+            max_age (float): Profiles not used for this number of seconds are evicted.
+                Profiles never expire if None.
+        """
+        self.path = path
+        self.max_profiles = max_profiles
+        self.max_age = max_age
+
+    @staticmethod
+    def key(user_id, camera_id=None):
+        """Returns the key of the profile of a user on a camera"""
+        if camera_id is None:
+            return str(user_id)
+        return "{}/{}".format(user_id, camera_id)
+
+    @contextmanager
+    def _locked(self):
+        """Holds the exclusive lock of the store, between processes and threads"""
+        if fcntl is None:
+            yield
+            return
+        with open(self.path + '.lock', 'a') as lock_file:
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
+
+    def _read(self):
+        """Returns the profiles of the file, from the least to the most recently used"""
+        try:
+            with open(self.path) as f:
+                profiles = json.load(f)['profiles']
+        except (IOError, OSError, ValueError, KeyError):
+            return {}
+
+        entries = sorted(profiles.items(), key=lambda item: item[1]['last_used'])
+        return dict(entries)
+
+    def _write(self, profiles):
+        """Evicts the stale profiles and writes the others atomically"""
+        now = time.time()
+        entries = sorted(profiles.items(), key=lambda item: item[1]['last_used'])
+
+        if self.max_age is not None:
+            entries = [(key, profile) for key, profile in entries if now - profile['last_used'] <= self.max_age]
+        if len(entries) > self.max_profiles:
+            entries = entries[len(entries) - self.max_profiles:]
+
+        write_json(self.path, {'version': 1, 'profiles': dict(entries)})
+
+    def save(self, calibration, user_id, camera_id=None):
+        """Saves the calibration as the profile of a user on a camera
+
+        Arguments:
+            calibration (calibration.Calibration): Calibration to save
+            user_id: Identifier of the user
+            camera_id: Identifier of the camera
+        """
+        with self._locked():
+            profiles = self._read()
+            profiles[self.key(user_id, camera_id)] = {
+                'last_used': time.time(),
+                'calibration': calibration.to_dict(),
+            }
+            self._write(profiles)
+
+    def load(self, user_id, camera_id=None, **options):
+        """Returns the calibration profile of a user on a camera, with the
+        options it was saved with, or None if there is no such profile
+
+        Arguments:
+            user_id: Identifier of the user
+            camera_id: Identifier of the camera
+            options: Keyword arguments given to the Calibration, like adaptive=True,
+                they replace the saved ones
+        """
+        with self._locked():
+            profiles = self._read()
+            profile = profiles.get(self.key(user_id, camera_id))
+
+            if profile is None:
+                return None
+            if self.max_age is not None and time.time() - profile['last_used'] > self.max_age:
+                self._write(profiles)
+                return None
+
+            profile['last_used'] = time.time()
+            self._write(profiles)
+        return Calibration.from_dict(profile['calibration'], **options)
+
+    def delete(self, user_id, camera_id=None):
+        """Removes the profile of a user on a camera"""
+        with self._locked():
+            profiles = self._read()
+            if profiles.pop(self.key(user_id, camera_id), None) is not None:
+                self._write(profiles)
+
+    def keys(self):
+        """Returns the keys of the profiles, from the least to the most recently used"""
+        return list(self._read().keys())
@@ -0,0 +1,186 @@
+from __future__ import division
+import bisect
+import threading
+import time
+
+
+class Histogram(object):
+    """
+    Latency histogram with fixed, logarithmic buckets. Recording a value is
+    a bisection on the bucket bounds, and the percentiles are read from the
+    counts, so the memory and the cost don't grow with the number of values.
+    """
+
+    # Upper bounds in seconds: 4 buckets per power of two, from 1 us to about 17 s
+    BOUNDS = [1e-6 * 2 ** (i / 4) for i in range(97)]
+
+    def __init__(self):
+        self.counts = [0] * (len(self.BOUNDS) + 1)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, seconds):
+        """Records a duration in seconds"""
+        self.counts[bisect.bisect_left(self.BOUNDS, seconds)] += 1
+        self.count += 1
+        self.sum += seconds
+
+    def percentile(self, q):
+        """Returns the upper bound of the bucket containing the q-th percentile,
+        in seconds, or None if nothing was recorded
+
+        Argument:
+            q (float): Percentile, between 0 and 100
+        """
+        if not self.count:
+            return None
+
+        rank = q / 100 * self.count
+        cumulative = 0
+        for i, count in enumerate(self.counts):
+            cumulative += count
+            if cumulative >= rank and count:
+                return self.BOUNDS[i] if i < len(self.BOUNDS) else float('inf')
+        return self.BOUNDS[-1]
+
+
+class _Timer(object):
+    """Context manager recording the duration of its block in a histogram"""
+
+    __slots__ = ('_profiler', '_name', '_start')
+
+    def __init__(self, profiler, name):
+        self._profiler = profiler
+        self._name = name
+
+    def __enter__(self):
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._profiler.record(self._name, time.perf_counter() - self._start)
+        return False
+
+
+class _NullTimer(object):
+    """Context manager doing nothing, used while profiling is disabled"""
+
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+
+_NULL_TIMER = _NullTimer()
+
+
+class Profiler(object):
+    """
+    This class records the duration of each stage of the analysis of a frame
+    in a Histogram. While it is disabled, stage() returns a shared context
+    manager that does nothing, so the instrumentation costs a method call.
+    """
+
+    # Stages of GazeTracking.refresh(), in the order of the analysis
+    STAGES = ['refresh', 'motion_gate', 'grayscale', 'face_detector', 'shape_predictor',
+              'eye_isolate', 'calibration', 'pupil_filter', 'find_contours', 'find_components']
+
+    def __init__(self, enabled=False):
+        """
+        Argument:
+            enabled (bool): Records the durations, can be changed at any time
+        """
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self._histograms = {}
+
+    def stage(self, name):
+        """Returns a context manager timing a stage
+
+        Argument:
+            name (str): Name of the stage
+        """
+        if not self.enabled:
+            return _NULL_TIMER
+        return _Timer(self, name)
+
+    def wrap(self, name, function):
+        """Returns the function, timed as a stage while the profiler is enabled
+
+        Arguments:
+            name (str): Name of the stage
+            function (callable): Function to time, like the face detector
+        """
+        def timed(*args, **kwargs):
+            if not self.enabled:
+                return function(*args, **kwargs)
+            start = time.perf_counter()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                self.record(name, time.perf_counter() - start)
+        return timed
+
+    def record(self, name, seconds):
+        """Records the duration of a stage"""
+        with self._lock:
+            histogram = self._histograms.get(name)
+            if histogram is None:
+                histogram = self._histograms[name] = Histogram()
+            histogram.observe(seconds)
+
+    def reset(self):
+        """Forgets all the recorded durations"""
+        with self._lock:
+            self._histograms = {}
+
+    def _sorted_stages(self):
+        """Returns the (name, histogram) pairs, known stages first"""
+        order = {name: i for i, name in enumerate(self.STAGES)}
+        return sorted(self._histograms.items(), key=lambda item: (order.get(item[0], len(order)), item[0]))
+
+    def summary(self):
+        """Returns the number of calls, the mean and the p50/p95/p99 durations
+        in milliseconds of each stage"""
+        with self._lock:
+            stages = self._sorted_stages()
+            return {
+                name: {
+                    'count': histogram.count,
+                    'mean_ms': histogram.sum / histogram.count * 1000,
+                    'p50_ms': histogram.percentile(50) * 1000,
+                    'p95_ms': histogram.percentile(95) * 1000,
+                    'p99_ms': histogram.percentile(99) * 1000,
+                }
+                for name, histogram in stages
+            }
+
+    def prometheus(self, metric='gaze_stage_duration_seconds'):
+        """Returns the histograms in the Prometheus text exposition format.
+        Only one bucket bound out of four is exported, one per power of two.
+
+        Argument:
+            metric (str): Name of the histogram metric
+        """
+        lines = [
+            '# HELP {} Duration of the stages of the gaze analysis of a frame'.format(metric),
+            '# TYPE {} histogram'.format(metric),
+        ]
+        with self._lock:
+            for name, histogram in self._sorted_stages():
+                cumulative = 0
+                for i, bound in enumerate(Histogram.BOUNDS):
+                    cumulative += histogram.counts[i]
+                    if i % 4 == 0:
+                        lines.append('{}_bucket{{stage="{}",le="{:.6g}"}} {}'.format(metric, name, bound, cumulative))
+                lines.append('{}_bucket{{stage="{}",le="+Inf"}} {}'.format(metric, name, histogram.count))
+                lines.append('{}_sum{{stage="{}"}} {:.9f}'.format(metric, name, histogram.sum))
+                lines.append('{}_count{{stage="{}"}} {}'.format(metric, name, histogram.count))
+        return '\n'.join(lines) + '\n'
+
+
+# Profiler of the objects created without one, never enabled
+DISABLED_PROFILER = Profiler()
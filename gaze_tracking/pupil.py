@@ -1,5 +1,7 @@
+import math
 import numpy as np
 import cv2
+from .profiling import DISABLED_PROFILER
 
 
 class Pupil(object):
@@ -8,15 +10,45 @@ class Pupil(object):
     the position of the pupil
     """
 
-    def __init__(self, eye_frame, threshold):
+    # Localization methods, see detect_iris()
+    METHODS = ('contours', 'components')
+
+    __slots__ = ('iris_frame', 'threshold', 'method', 'x', 'y', 'radius', '_profiler')
+
+    def __init__(self, eye_frame, threshold, profiler=None, method='contours'):
+        """
+        Arguments:
+            eye_frame (numpy.ndarray): Frame containing an eye and nothing else
+            threshold (int): Threshold value used to binarize the eye frame
+            profiler (profiling.Profiler): Records the duration of each stage
+            method (str): 'contours' or 'components', see detect_iris()
+        """
+        if method not in self.METHODS:
+            raise ValueError("Unknown pupil localization method: {}".format(method))
+
         self.iris_frame = None
         self.threshold = threshold
+        self.method = method
         self.x = None
         self.y = None
         self.radius = None
+        self._profiler = profiler or DISABLED_PROFILER
 
         self.detect_iris(eye_frame)
 
+    @staticmethod
+    def filter_frame(eye_frame):
+        """Smooths the eye frame and erodes it, which are the steps
+        of image_processing() that don't depend on the threshold
+
+        Argument:
+            eye_frame (numpy.ndarray): Frame containing an eye and nothing else
+        """
+        kernel = np.ones((3, 3), np.uint8)
+        new_frame = cv2.bilateralFilter(eye_frame, 10, 15, 15)
+        new_frame = cv2.erode(new_frame, kernel, iterations=3)
+        return new_frame
+
     @staticmethod
     def image_processing(eye_frame, threshold):
         """Performs operations on the eye frame to isolate the iris
@@ -28,9 +60,7 @@ class Pupil(object):
         Returns:
             A frame with a single element representing the iris
         """
-        kernel = np.ones((3, 3), np.uint8)
-        new_frame = cv2.bilateralFilter(eye_frame, 10, 15, 15)
-        new_frame = cv2.erode(new_frame, kernel, iterations=3)
+        new_frame = Pupil.filter_frame(eye_frame)
         new_frame = cv2.threshold(new_frame, threshold, 255, cv2.THRESH_BINARY)[1]
 
         return new_frame
@@ -39,11 +69,28 @@ class Pupil(object):
         """Detects the iris and estimates the position of the iris by
         calculating the centroid.
 
+        With the 'contours' method, the iris is the second largest contour of
+        the binarized frame, the largest one being the outline of the white
+        region around the eye. With the 'components' method, it is the largest
+        dark region enclosed in the white one, found from the connected
+        components stats without building the contours.
+
         Arguments:
             eye_frame (numpy.ndarray): Frame containing an eye and nothing else
         """
-        self.iris_frame = self.image_processing(eye_frame, self.threshold)
+        with self._profiler.stage('pupil_filter'):
+            self.iris_frame = self.image_processing(eye_frame, self.threshold)
 
+        if self.method == 'components':
+            with self._profiler.stage('find_components'):
+                self._locate_component()
+        else:
+            with self._profiler.stage('find_contours'):
+                self._locate_contour()
+
+    def _locate_contour(self):
+        """Sets the centroid and the radius of the iris from the second largest
+        contour of the iris frame"""
         contours, _ = cv2.findContours(self.iris_frame, cv2.RETR_TREE, cv2.CHAIN_APPROX_NONE)[-2:]
         contours = sorted(contours, key=cv2.contourArea)
 
@@ -63,3 +110,40 @@ class Pupil(object):
                 self.radius = int(np.sqrt(area / np.pi))
         except (IndexError, ZeroDivisionError):
             pass
+
+    def _locate_component(self):
+        """Sets the centroid and the radius of the iris from the largest dark
+        connected component of the iris frame that doesn't touch its border.
+
+        Dark components enclosed in the white region are the holes that the
+        'contours' method finds as contours, so in the usual case the result
+        is the same region. The radius is the mean semi-axis of the ellipse
+        with the same second moments as the region.
+        """
+        dark = cv2.bitwise_not(self.iris_frame)
+        # Holes of an 8-connected white region are 4-connected
+        count, labels, stats, _ = cv2.connectedComponentsWithStats(dark, connectivity=4)
+
+        # An eye frame has only a handful of dark components, too few for
+        # numpy border masks and argmax to pay for their array allocations
+        height, width = dark.shape
+        label, best = None, None
+        for i, (x, y, w, h, area) in enumerate(stats.tolist()[1:], 1):
+            if x > 0 and y > 0 and x + w < width and y + h < height and (best is None or area > best[4]):
+                label, best = i, (x, y, w, h, area)
+        if label is None:
+            return
+
+        x, y, w, h, area = best
+        if count == 2:
+            region = dark[y:y + h, x:x + w]
+        else:
+            region = (labels[y:y + h, x:x + w] == label).view(np.uint8)
+        moments = cv2.moments(region, binaryImage=True)
+        self.x = int(x + moments['m10'] / area)
+        self.y = int(y + moments['m01'] / area)
+
+        mean = (moments['mu20'] + moments['mu02']) / (2 * area)
+        spread = math.hypot((moments['mu20'] - moments['mu02']) / (2 * area), moments['mu11'] / area)
+        # Semi-axes of the equivalent ellipse are 2 * sqrt(eigenvalue of the covariance)
+        self.radius = int(math.sqrt(mean + spread) + math.sqrt(max(mean - spread, 0)))
@@ -0,0 +1,259 @@
+from __future__ import division
+import json
+import numpy as np
+from .profiles import write_json
+
+
+def grid_targets(width, height, rows=3, columns=3, margin=0.1):
+    """Returns the (x, y) screen points of a calibration grid, row by row
+
+    Arguments:
+        width (int): Width of the screen in pixels
+        height (int): Height of the screen in pixels
+        rows (int): Number of rows of targets
+        columns (int): Number of columns of targets
+        margin (float): Distance of the outer targets to the screen edges,
+            relative to the screen size
+    """
+    xs = np.linspace(margin * width, (1 - margin) * width, columns)
+    ys = np.linspace(margin * height, (1 - margin) * height, rows)
+    return [(float(x), float(y)) for y in ys for x in xs]
+
+
+class ScreenMapping(object):
+    """
+    This class maps the gaze ratios of GazeTracking to screen coordinates.
+    It collects (target, ratios) samples while the user looks at known points
+    of the screen, then fits a model with least squares:
+
+    - 'polynomial': x and y are polynomials of the horizontal and vertical
+      ratios, which absorbs the non-linearity of the ratios near the eye corners
+    - 'homography': a projective transform of the ratios, which needs fewer
+      targets (4 at least) but is only exact for a flat eye model
+
+    Several samples per target are averaged out by the least squares, so a few
+    frames can be collected while the user looks at each target.
+    """
+
+    MODELS = ('polynomial', 'homography')
+
+    def __init__(self, model='polynomial', degree=2):
+        """
+        Arguments:
+            model (str): 'polynomial' or 'homography'
+            degree (int): Degree of the polynomial model
+        """
+        if model not in self.MODELS:
+            raise ValueError("Unknown screen mapping model: {}".format(model))
+
+        self.model = model
+        self.degree = degree
+        self.targets = []
+        self.ratios = []
+        self.error = None
+
+        # Fitted parameters, as an array for the vectorized mapping and as
+        # Python lists for the mapping of single samples
+        self._coefficients = None
+        self._coefficient_lists = None
+
+        # (i, j) exponents of the horizontal and vertical ratios of each polynomial term
+        self._exponents = [(i, total - i) for total in range(degree + 1) for i in range(total, -1, -1)]
+
+    @property
+    def min_samples(self):
+        """Number of distinct targets needed to fit the model"""
+        return 4 if self.model == 'homography' else len(self._exponents)
+
+    @property
+    def is_fitted(self):
+        """Check that the model has been fitted or loaded"""
+        return self._coefficients is not None
+
+    def add(self, target, horizontal, vertical):
+        """Adds a sample: the user looked at target while the gaze ratios were measured
+
+        Arguments:
+            target (tuple): (x, y) screen point looked at
+            horizontal (float): Horizontal ratio of the gaze
+            vertical (float): Vertical ratio of the gaze
+        """
+        self.targets.append((float(target[0]), float(target[1])))
+        self.ratios.append((float(horizontal), float(vertical)))
+
+    def add_gaze(self, target, gaze):
+        """Adds a sample from the current frame of a GazeTracking instance.
+        Returns False if the pupils were not located.
+
+        Arguments:
+            target (tuple): (x, y) screen point looked at
+            gaze (GazeTracking): Tracker that has just been refreshed
+        """
+        horizontal, vertical = gaze.horizontal_ratio(), gaze.vertical_ratio()
+        if horizontal is None or vertical is None:
+            return False
+        self.add(target, horizontal, vertical)
+        return True
+
+    def clear(self):
+        """Forgets the collected samples, the fitted model is kept"""
+        self.targets = []
+        self.ratios = []
+
+    def _features(self, ratios):
+        """Returns the polynomial terms of the (..., 2) ratios, of shape (..., n_terms)"""
+        horizontal, vertical = ratios[..., 0, None], ratios[..., 1, None]
+        i, j = np.array(self._exponents).T
+        return horizontal ** i * vertical ** j
+
+    def fit(self):
+        """Fits the model on the collected samples and returns the root mean
+        square distance in pixels between the targets and the mapped samples"""
+        targets = np.array(self.targets, np.float64).reshape(-1, 2)
+        ratios = np.array(self.ratios, np.float64).reshape(-1, 2)
+        if len(set(self.targets)) < self.min_samples:
+            raise ValueError("The {} model needs at least {} targets, got {}".format(
+                self.model, self.min_samples, len(set(self.targets))))
+
+        if self.model == 'polynomial':
+            coefficients = np.linalg.lstsq(self._features(ratios), targets, rcond=None)[0].T
+        else:
+            coefficients = self._fit_homography(ratios, targets)
+
+        self._set_coefficients(coefficients)
+        errors = self.map_array(ratios) - targets
+        self.error = float(np.sqrt(np.mean(np.sum(errors ** 2, axis=1))))
+        return self.error
+
+    @staticmethod
+    def _fit_homography(ratios, targets):
+        """Returns the 3x3 matrix H that maps the ratios to the targets. The
+        targets are normalized for the least squares to be well conditioned."""
+        mean = targets.mean(axis=0)
+        scale = max(targets.std(), 1e-9)
+        normalized = (targets - mean) / scale
+
+        # x' = (h0 u + h1 v + h2) / (h6 u + h7 v + 1), same for y' with h3 h4 h5
+        u, v = ratios[:, 0], ratios[:, 1]
+        x, y = normalized[:, 0], normalized[:, 1]
+        zeros, ones = np.zeros_like(u), np.ones_like(u)
+        a = np.concatenate([
+            np.stack([u, v, ones, zeros, zeros, zeros, -u * x, -v * x], axis=1),
+            np.stack([zeros, zeros, zeros, u, v, ones, -u * y, -v * y], axis=1),
+        ])
+        h = np.linalg.lstsq(a, np.concatenate([x, y]), rcond=None)[0]
+        matrix = np.append(h, 1).reshape(3, 3)
+
+        denormalize = np.array([[scale, 0, mean[0]], [0, scale, mean[1]], [0, 0, 1]])
+        matrix = denormalize.dot(matrix)
+        return matrix / matrix[2, 2]
+
+    def _set_coefficients(self, coefficients):
+        """Stores the fitted parameters"""
+        self._coefficients = np.asarray(coefficients, np.float64)
+        self._coefficient_lists = self._coefficients.tolist()
+
+    def map(self, horizontal, vertical):
+        """Returns the (x, y) screen point of a single sample, like the one of
+        each frame of a live session. For two ratios, the products on the
+        coefficient lists are cheaper than the arrays of map_array().
+
+        Arguments:
+            horizontal (float): Horizontal ratio of the gaze
+            vertical (float): Vertical ratio of the gaze
+        """
+        if self._coefficients is None:
+            raise ValueError("The screen mapping isn't fitted")
+
+        if self.model == 'homography':
+            (a, b, c), (d, e, f), (g, h, i) = self._coefficient_lists
+            w = g * horizontal + h * vertical + i
+            return (a * horizontal + b * vertical + c) / w, (d * horizontal + e * vertical + f) / w
+
+        # Powers by successive products, pow() on floats is slower
+        horizontal_powers, vertical_powers = [1.0], [1.0]
+        for _ in range(self.degree):
+            horizontal_powers.append(horizontal_powers[-1] * horizontal)
+            vertical_powers.append(vertical_powers[-1] * vertical)
+
+        x = y = 0.0
+        coefficients_x, coefficients_y = self._coefficient_lists
+        for (i, j), coefficient_x, coefficient_y in zip(self._exponents, coefficients_x, coefficients_y):
+            term = horizontal_powers[i] * vertical_powers[j]
+            x += coefficient_x * term
+            y += coefficient_y * term
+        return x, y
+
+    def map_array(self, ratios):
+        """Returns the screen points of many samples at once
+
+        Argument:
+            ratios (numpy.ndarray): Ratios of shape (..., 2), horizontal then vertical.
+                NaN ratios, like the ones of analyze_batch() without pupils, give NaN points.
+
+        Returns:
+            An array of shape (..., 2) of (x, y) screen points
+        """
+        if self._coefficients is None:
+            raise ValueError("The screen mapping isn't fitted")
+
+        ratios = np.asarray(ratios, np.float64)
+        if self.model == 'homography':
+            matrix = self._coefficients
+            points = ratios.dot(matrix[:, :2].T) + matrix[:, 2]
+            return points[..., :2] / points[..., 2:]
+
+        return self._features(ratios).dot(self._coefficients.T)
+
+    def map_gaze(self, gaze):
+        """Returns the screen point looked at in the current frame of a
+        GazeTracking instance, or None if the pupils were not located
+
+        Argument:
+            gaze (GazeTracking): Tracker that has just been refreshed
+        """
+        horizontal, vertical = gaze.horizontal_ratio(), gaze.vertical_ratio()
+        if horizontal is None or vertical is None:
+            return None
+        return self.map(horizontal, vertical)
+
+    def to_dict(self):
+        """Returns the fitted model as a JSON serializable dict"""
+        if self._coefficients is None:
+            raise ValueError("The screen mapping isn't fitted")
+        return {
+            'model': self.model,
+            'degree': self.degree,
+            'coefficients': self._coefficient_lists,
+            'error': self.error,
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        """Creates a fitted mapping from a dict returned by to_dict()
+
+        Argument:
+            data (dict): Serialized model
+        """
+        mapping = cls(data['model'], int(data['degree']))
+        mapping._set_coefficients(data['coefficients'])
+        mapping.error = data.get('error')
+        return mapping
+
+    def save(self, path):
+        """Writes the fitted model to a JSON file, atomically
+
+        Argument:
+            path (str): Path of the JSON file
+        """
+        write_json(path, {'version': 1, 'screen_mapping': self.to_dict()})
+
+    @classmethod
+    def load(cls, path):
+        """Reads a model written by save()
+
+        Argument:
+            path (str): Path of the JSON file
+        """
+        with open(path) as f:
+            return cls.from_dict(json.load(f)['screen_mapping'])
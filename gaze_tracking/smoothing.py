@@ -0,0 +1,125 @@
+from __future__ import division
+import math
+import numpy as np
+
+
+class OneEuroFilter(object):
+    """
+    One Euro filter (Casiez et al., CHI 2012) of a vector of values.
+    A low-pass filter whose cutoff frequency grows with the speed of the
+    signal: slow movements are smoothed a lot, which removes the jitter,
+    and fast movements a little, which keeps the lag low.
+    The state is the last filtered value, its speed and its timestamp.
+    """
+
+    def __init__(self, min_cutoff=1.0, beta=0.0, d_cutoff=1.0):
+        """
+        Arguments:
+            min_cutoff (float): Cutoff frequency in Hz when the signal doesn't move.
+                Lower values remove more jitter.
+            beta (float): Increase of the cutoff frequency per unit of speed.
+                Higher values reduce the lag on fast movements.
+            d_cutoff (float): Cutoff frequency in Hz of the speed estimate
+        """
+        self.min_cutoff = min_cutoff
+        self.beta = beta
+        self.d_cutoff = d_cutoff
+        self.reset()
+
+    def reset(self):
+        """Forgets the signal"""
+        self.value = None
+        self.speed = None
+        self.timestamp = None
+
+    @staticmethod
+    def _alpha(cutoff, dt):
+        """Smoothing factor of an exponential low-pass filter"""
+        tau = 1 / (2 * math.pi * cutoff)
+        return 1 / (1 + tau / dt)
+
+    def update(self, timestamp, value):
+        """Filters a new measurement and returns the filtered value
+
+        Arguments:
+            timestamp (float): Time of the measurement in seconds
+            value (numpy.ndarray): Measured values
+        """
+        value = np.asarray(value, dtype=np.float64)
+        if self.value is None:
+            self.value, self.speed, self.timestamp = value, np.zeros_like(value), timestamp
+            return self.value
+
+        # Two frames with the same timestamp are considered 1 ms apart
+        dt = max(timestamp - self.timestamp, 1e-3)
+        speed = (value - self.value) / dt
+        self.speed = self.speed + self._alpha(self.d_cutoff, dt) * (speed - self.speed)
+
+        cutoff = self.min_cutoff + self.beta * np.abs(self.speed)
+        self.value = self.value + self._alpha(cutoff, dt) * (value - self.value)
+        self.timestamp = timestamp
+        return self.value
+
+    def predict(self, timestamp):
+        """Returns the value extrapolated at the given time from the filtered
+        value and speed, without changing the state"""
+        if self.value is None:
+            return None
+        return self.value + self.speed * (timestamp - self.timestamp)
+
+
+class GazeFilter(object):
+    """
+    This class smooths the pupils coordinates and the gaze ratios of a
+    GazeTracking instance over time, and predicts them for a short time
+    when the pupils are not located or when a frame isn't analyzed.
+    """
+
+    def __init__(self, min_cutoff=1.0, beta=0.2, ratio_beta=5.0, d_cutoff=1.0, max_gap=0.3):
+        """
+        Arguments:
+            min_cutoff (float): Cutoff frequency in Hz of the still signal
+            beta (float): Speed coefficient of the pupils coordinates, in pixels
+            ratio_beta (float): Speed coefficient of the gaze ratios, which move
+                about 25 times less than the pupils coordinates
+            d_cutoff (float): Cutoff frequency in Hz of the speed estimates
+            max_gap (float): Seconds during which the values are predicted after
+                the last located pupils. Then the outputs are None again.
+        """
+        self.max_gap = max_gap
+        self._coords = OneEuroFilter(min_cutoff, beta, d_cutoff)
+        self._ratios = OneEuroFilter(min_cutoff, ratio_beta, d_cutoff)
+
+    def reset(self):
+        """Forgets the previous frames, for example when the face changed"""
+        self._coords.reset()
+        self._ratios.reset()
+
+    def update(self, timestamp, coords=None, ratios=None):
+        """Filters the measurements of a new frame
+
+        Arguments:
+            timestamp (float): Time of the frame in seconds
+            coords (tuple): Pupils coordinates (left_x, left_y, right_x, right_y),
+                or None if the pupils were not located
+            ratios (tuple): Gaze ratios (horizontal, vertical), or None
+
+        Returns:
+            The smoothed (coords, ratios), predicted if the pupils were not located,
+            or (None, None) after max_gap seconds without located pupils
+        """
+        if coords is None:
+            return self.predict(timestamp)
+
+        # After a long gap, the previous movement says nothing about the new one
+        if self._coords.timestamp is not None and timestamp - self._coords.timestamp > self.max_gap:
+            self.reset()
+        return self._coords.update(timestamp, coords), self._ratios.update(timestamp, ratios)
+
+    def predict(self, timestamp):
+        """Returns the (coords, ratios) extrapolated at the given time, or
+        (None, None) if the last located pupils are older than max_gap seconds"""
+        last = self._coords.timestamp
+        if last is None or timestamp - last > self.max_gap:
+            return None, None
+        return self._coords.predict(timestamp), self._ratios.predict(timestamp)
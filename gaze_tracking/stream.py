@@ -0,0 +1,117 @@
+from __future__ import division
+import queue
+import threading
+
+# Marks the end of the stream in the queues
+_END = object()
+
+# Seconds between two checks of the stop event by a blocked thread
+_POLL_INTERVAL = 0.05
+
+
+class _Failure(object):
+    """Exception raised by a stage, forwarded to the consumer"""
+
+    __slots__ = ('error',)
+
+    def __init__(self, error):
+        self.error = error
+
+
+def sequential(source, stages):
+    """Applies the stages to the items of source one item after the other,
+    on the calling thread, and yields the results
+
+    Arguments:
+        source: Iterable of items
+        stages (list): Functions called on each item, each one with the result
+            of the previous one
+    """
+    for item in source:
+        for stage in stages:
+            item = stage(item)
+        yield item
+
+
+def pipelined(source, stages, queue_size=2):
+    """Applies the stages to the items of source and yields the results in order.
+    The source is read on its own thread and each stage runs on its own thread,
+    connected by bounded queues, so the stages of successive items overlap
+    while the native code of OpenCV and dlib releases the GIL.
+
+    Each stage only sees one item at a time and the items in order, so a stage
+    can keep a state from one item to the next, like a calibration. An exception
+    raised by the source or a stage is raised again by the generator. Closing
+    the generator stops the threads.
+
+    Arguments:
+        source: Iterable of items
+        stages (list): Functions called on each item, each one with the result
+            of the previous one
+        queue_size (int): Maximum number of items waiting between two stages
+    """
+    stop = threading.Event()
+    queues = [queue.Queue(queue_size) for _ in range(len(stages) + 1)]
+
+    def put(target, item):
+        """Puts the item in the queue, returns False if the pipeline stopped first"""
+        while not stop.is_set():
+            try:
+                target.put(item, timeout=_POLL_INTERVAL)
+                return True
+            except queue.Full:
+                pass
+        return False
+
+    def get(origin):
+        """Returns the next item of the queue, or _END if the pipeline stopped first"""
+        while not stop.is_set():
+            try:
+                return origin.get(timeout=_POLL_INTERVAL)
+            except queue.Empty:
+                pass
+        return _END
+
+    def read():
+        try:
+            for item in source:
+                if not put(queues[0], item):
+                    return
+        except Exception as error:
+            put(queues[0], _Failure(error))
+            return
+        put(queues[0], _END)
+
+    def work(stage, inbox, outbox):
+        while True:
+            item = get(inbox)
+            if item is _END or isinstance(item, _Failure):
+                put(outbox, item)
+                return
+            try:
+                result = stage(item)
+            except Exception as error:
+                put(outbox, _Failure(error))
+                return
+            if not put(outbox, result):
+                return
+
+    threads = [threading.Thread(target=read, name='stream-source', daemon=True)]
+    for i, stage in enumerate(stages):
+        threads.append(threading.Thread(target=work, args=(stage, queues[i], queues[i + 1]),
+                                        name='stream-stage-{}'.format(i), daemon=True))
+    for thread in threads:
+        thread.start()
+
+    try:
+        while True:
+            item = get(queues[-1])
+            if item is _END:
+                return
+            if isinstance(item, _Failure):
+                raise item.error
+            yield item
+    finally:
+        stop.set()
+        for thread in threads:
+            thread.join()
@@ -0,0 +1,289 @@
+"""
+Analysis of recorded videos on several processes.
+The video is split in frame ranges that are analyzed by a pool of workers,
+each one with its own GazeTracking instance, and the results are gathered
+back in frame order.
+"""
+
+from __future__ import division, print_function
+import argparse
+import csv
+import os
+import sys
+import time
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import cv2
+from . import models
+from .calibration import Calibration
+from .gaze_tracking import GazeTracking
+
+
+# GazeTracking instance of a worker process, created once by _init_worker()
+_worker_gaze = None
+
+# Frame rate assumed for the timestamps when the video doesn't report one
+DEFAULT_FPS = 30.0
+
+CSV_COLUMNS = ['frame', 'valid', 'left_x', 'left_y', 'right_x', 'right_y',
+               'radius_left', 'radius_right', 'horizontal', 'vertical', 'openness']
+
+
+def frame_count(path):
+    """Returns the number of frames of a video file
+
+    Argument:
+        path (str): Path of the video file
+    """
+    capture = cv2.VideoCapture(path)
+    if not capture.isOpened():
+        raise IOError("Unable to open video file: " + path)
+    count = int(capture.get(cv2.CAP_PROP_FRAME_COUNT))
+    capture.release()
+    return count
+
+
+def calibrate(path, max_frames=300, **gaze_options):
+    """Runs the calibration on the beginning of the video.
+
+    Arguments:
+        path (str): Path of the video file
+        max_frames (int): Maximum number of frames read to complete the calibration
+        gaze_options: Keyword arguments given to GazeTracking
+
+    Returns:
+        The (thresholds_left, thresholds_right) lists, or None if the
+        calibration couldn't be completed
+    """
+    gaze = GazeTracking(**gaze_options)
+    capture = cv2.VideoCapture(path)
+    fps = capture.get(cv2.CAP_PROP_FPS) or DEFAULT_FPS
+
+    for i in range(max_frames):
+        success, frame = capture.read()
+        if not success or gaze.calibration.is_complete():
+            break
+        gaze.refresh(frame, i / fps)
+
+    capture.release()
+    if not gaze.calibration.is_complete():
+        return None
+    return list(gaze.calibration.thresholds_left), list(gaze.calibration.thresholds_right)
+
+
+def _init_worker(gaze_options, thresholds):
+    """Creates the GazeTracking instance of a worker process and applies the calibration.
+    The models are loaded once per worker, or inherited from the parent when forked."""
+    global _worker_gaze
+    models.preload()
+    _worker_gaze = GazeTracking(**gaze_options)
+
+    if thresholds is not None:
+        # Rebuilt with the options of the calibration given in gaze_options, so an
+        # adaptive calibration keeps its sliding window of thresholds
+        calibration = _worker_gaze.calibration
+        _worker_gaze.calibration = Calibration.from_dict({
+            'nb_frames': calibration.nb_frames,
+            'thresholds_left': thresholds[0],
+            'thresholds_right': thresholds[1],
+        }, **calibration.options())
+
+
+def _analyze_range(args):
+    """Analyzes the frames [start, end) of the video in a worker process, or
+    the frames from start to the end of the video when end is None.
+    Returns the index of the first frame and the results of the range.
+    """
+    path, start, end, batch_size = args
+    gaze = _worker_gaze
+    # The previous range of this worker is unrelated to this one
+    gaze.reset()
+
+    capture = cv2.VideoCapture(path)
+    capture.set(cv2.CAP_PROP_POS_FRAMES, start)
+    fps = capture.get(cv2.CAP_PROP_FPS) or DEFAULT_FPS
+
+    chunks = []
+    position = start
+    while end is None or position < end:
+        frames = []
+        while (end is None or position < end) and len(frames) < batch_size:
+            success, frame = capture.read()
+            if not success:
+                break
+            frames.append(frame)
+            position += 1
+
+        if not frames:
+            break
+        # The frames are timed by their position in the video, not by when they are analyzed
+        timestamps = np.arange(position - len(frames), position) / fps
+        chunks.append(gaze.analyze_batch(frames, timestamps))
+
+    capture.release()
+    if not chunks:
+        return start, np.zeros(0, dtype=GazeTracking.BATCH_DTYPE)
+    return start, np.concatenate(chunks)
+
+
+def iter_video(path, workers=None, chunk_size=250, batch_size=32, thresholds=None, **gaze_options):
+    """Analyzes a video on a pool of processes and yields the results in frame order.
+
+    Arguments:
+        path (str): Path of the video file
+        workers (int): Number of worker processes, defaults to the number of CPUs
+        chunk_size (int): Number of frames of the ranges sent to the workers
+        batch_size (int): Number of frames decoded at once by a worker
+        thresholds (tuple): Calibration (thresholds_left, thresholds_right) shared by all the workers.
+            If None, each worker calibrates itself on the first frames it analyzes.
+        gaze_options: Keyword arguments given to GazeTracking
+
+    Yields:
+        (first_frame, results) tuples, where results is a structured numpy.ndarray
+        of GazeTracking.BATCH_DTYPE
+    """
+    # The frame count of the container is only an estimate for some formats, so
+    # the last range is read until the end of the video
+    starts = list(range(0, frame_count(path), chunk_size)) or [0]
+    ends = starts[1:] + [None]
+    ranges = [(path, start, end, batch_size) for start, end in zip(starts, ends)]
+
+    # Forked workers share the memory pages of the models loaded by the parent
+    if multiprocessing.get_start_method() == 'fork':
+        models.preload()
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                             initargs=(gaze_options, thresholds)) as executor:
+        for start, results in executor.map(_analyze_range, ranges):
+            yield start, results
+
+
+def _write_csv_rows(writer, start, results):
+    """Writes the results of a range of frames as CSV rows"""
+    for i, record in enumerate(results):
+        writer.writerow([
+            start + i, int(record['valid']),
+            record['pupil_left'][0], record['pupil_left'][1],
+            record['pupil_right'][0], record['pupil_right'][1],
+            record['radius_left'], record['radius_right'],
+            record['horizontal'], record['vertical'], record['openness'],
+        ])
+
+
+def _columns(frames, results):
+    """Returns the results as a dict of flat columns"""
+    return {
+        'frame': frames,
+        'valid': results['valid'],
+        'left_x': results['pupil_left'][:, 0],
+        'left_y': results['pupil_left'][:, 1],
+        'right_x': results['pupil_right'][:, 0],
+        'right_y': results['pupil_right'][:, 1],
+        'radius_left': results['radius_left'],
+        'radius_right': results['radius_right'],
+        'horizontal': results['horizontal'],
+        'vertical': results['vertical'],
+        'openness': results['openness'],
+    }
+
+
+def save_results(output, frames, results):
+    """Saves the results to a .npz or .parquet file
+
+    Arguments:
+        output (str): Path of the output file
+        frames (numpy.ndarray): Index of the frame of each record
+        results (numpy.ndarray): Structured array of GazeTracking.BATCH_DTYPE
+    """
+    columns = _columns(frames, results)
+
+    if output.endswith('.npz'):
+        np.savez(output, **columns)
+    elif output.endswith('.parquet'):
+        try:
+            import pyarrow
+            import pyarrow.parquet
+        except ImportError:
+            raise ImportError("pyarrow is required to write Parquet files: pip install pyarrow")
+        pyarrow.parquet.write_table(pyarrow.Table.from_pydict(columns), output)
+    else:
+        raise ValueError("Unsupported output format: " + output)
+
+
+def analyze_video(path, workers=None, output=None, chunk_size=250, calibrate_first=True, **gaze_options):
+    """Analyzes a whole video on a pool of processes.
+
+    The calibration is done once on the beginning of the video and its thresholds
+    are sent to every worker, so all the frames are analyzed with the same calibration.
+
+    Arguments:
+        path (str): Path of the video file
+        workers (int): Number of worker processes, defaults to the number of CPUs
+        output (str): Optional .csv, .npz or .parquet file to write the results to.
+            CSV rows are written as soon as the frames are analyzed.
+        chunk_size (int): Number of frames of the ranges sent to the workers
+        calibrate_first (bool): Calibrates once before starting the workers
+        gaze_options: Keyword arguments given to GazeTracking
+
+    Returns:
+        (results, fps) where results is a structured numpy.ndarray of
+        GazeTracking.BATCH_DTYPE in frame order and fps is the throughput
+    """
+    start_time = time.perf_counter()
+    thresholds = calibrate(path, **gaze_options) if calibrate_first else None
+
+    csv_file = writer = None
+    if output and output.endswith('.csv'):
+        csv_file = open(output, 'w', newline='')
+        writer = csv.writer(csv_file)
+        writer.writerow(CSV_COLUMNS)
+
+    frames, chunks = [], []
+    try:
+        for start, results in iter_video(path, workers, chunk_size, thresholds=thresholds, **gaze_options):
+            if writer is not None:
+                _write_csv_rows(writer, start, results)
+            frames.append(np.arange(start, start + len(results)))
+            chunks.append(results)
+    finally:
+        if csv_file is not None:
+            csv_file.close()
+
+    if chunks:
+        frames, results = np.concatenate(frames), np.concatenate(chunks)
+    else:
+        frames, results = np.zeros(0, np.int64), np.zeros(0, dtype=GazeTracking.BATCH_DTYPE)
+
+    if output and writer is None:
+        save_results(output, frames, results)
+
+    elapsed = time.perf_counter() - start_time
+    fps = len(results) / elapsed if elapsed > 0 else 0.0
+    return results, fps
+
+
+def main(argv=None):
+    """Command line entry point: python -m gaze_tracking video.mp4 -o results.csv"""
+    parser = argparse.ArgumentParser(prog='python -m gaze_tracking',
+                                     description="Analyzes the gaze in a video file on several processes")
+    parser.add_argument('video', help="Path of the video file")
+    parser.add_argument('-o', '--output', help="Output file (.csv, .npz or .parquet)")
+    parser.add_argument('-w', '--workers', type=int, default=os.cpu_count(), help="Number of worker processes")
+    parser.add_argument('--chunk-size', type=int, default=250, help="Number of frames per task")
+    parser.add_argument('--no-calibration', action='store_true',
+                        help="Let each worker calibrate itself instead of calibrating once up front")
+    parser.add_argument('--tracking', action='store_true', help="Enable the face tracking mode")
+    parser.add_argument('--detection-scale', type=float, default=1.0, help="Scale of the face detection frame")
+    parser.add_argument('--pupil-method', choices=['contours', 'components'], default='contours',
+                        help="Pupil localization method")
+    args = parser.parse_args(argv)
+
+    results, fps = analyze_video(args.video, args.workers, args.output, args.chunk_size,
+                                 calibrate_first=not args.no_calibration,
+                                 tracking=args.tracking, detection_scale=args.detection_scale,
+                                 pupil_method=args.pupil_method)
+
+    located = results['valid'].mean() if len(results) else 0.0
+    print("Analyzed {} frames at {:.1f} fps, pupils located in {:.1%} of the frames".format(
+        len(results), fps, located), file=sys.stderr)
@@ -0,0 +1,14 @@
+"""
+Helpers shared by the unit tests
+"""
+
+import dlib
+
+
+def landmarks_with_left_eye(eye_points):
+    """Returns 68 landmarks where the left eye is made of the given points"""
+    points = dlib.points()
+    for i in range(68):
+        x, y = eye_points[i - 36] if 36 <= i < 42 else (0, 0)
+        points.append(dlib.point(x, y))
+    return dlib.full_object_detection(dlib.rectangle(0, 0, 1, 1), points)
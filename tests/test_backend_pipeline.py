@@ -0,0 +1,247 @@
+"""
+Tests for the capture and inference pipeline of the backend
+"""
+
+import unittest
+import json
+import sys
+import os
+import threading
+import time
+import numpy as np
+import cv2
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'backend'))
+from gaze_tracking import GazeTracking
+from pipeline import GazePipeline, LatestFrameQueue
+from broadcast import FrameBroadcaster, MetricsBroadcaster
+
+
+class FakeCapture(object):
+    """Delivers black frames at a fixed rate, like a webcam"""
+
+    def __init__(self, fps=200):
+        self.interval = 1.0 / fps
+        self.reads = 0
+
+    def read(self):
+        time.sleep(self.interval)
+        self.reads += 1
+        return True, np.zeros((120, 160, 3), dtype=np.uint8)
+
+
+class SlowGaze(GazeTracking):
+    """GazeTracking whose analysis takes a fixed time and counts the calls"""
+
+    def __init__(self, delay):
+        super(SlowGaze, self).__init__()
+        self.delay = delay
+        self.calls = 0
+        self.thread_names = set()
+
+    def refresh(self, frame):
+        self.calls += 1
+        self.thread_names.add(threading.current_thread().name)
+        time.sleep(self.delay)
+        super(SlowGaze, self).refresh(frame)
+
+
+class FailingGaze(SlowGaze):
+    """SlowGaze whose first analysis raises an error"""
+
+    def refresh(self, frame):
+        super(FailingGaze, self).refresh(frame)
+        if self.calls == 1:
+            raise ValueError("Unexpected frame")
+
+
+class TestLatestFrameQueue(unittest.TestCase):
+    """Tests for LatestFrameQueue"""
+
+    def test_drops_oldest_items(self):
+        queue = LatestFrameQueue(maxsize=2)
+        for i in range(5):
+            queue.put(i)
+
+        self.assertEqual(queue.dropped, 3)
+        self.assertEqual(queue.get(), 3)
+        self.assertEqual(queue.get(), 4)
+        self.assertIsNone(queue.get(timeout=0.01))
+
+
+class TestGazePipeline(unittest.TestCase):
+    """Tests for GazePipeline"""
+
+    def setUp(self):
+        self.gaze = SlowGaze(delay=0.02)
+        self.pipeline = GazePipeline(FakeCapture(), self.gaze)
+
+    def tearDown(self):
+        self.pipeline.stop()
+
+    def test_publishes_samples(self):
+        self.assertIsNone(self.pipeline.latest())
+        self.pipeline.start()
+
+        sample = self.pipeline.wait_for_sample(-1, timeout=5)
+        self.assertIsNotNone(sample)
+        self.assertEqual(sample.annotated_frame.shape, (120, 160, 3))
+        self.assertIsNone(sample.metrics['horizontal'])
+
+        newer = self.pipeline.wait_for_sample(sample.frame_id, timeout=5)
+        self.assertGreater(newer.frame_id, sample.frame_id)
+
+    def test_publishes_the_calibration_metrics(self):
+        self.assertIsNone(self.pipeline.stats()['calibration'])
+        self.pipeline.start()
+        self.pipeline.wait_for_sample(-1, timeout=5)
+
+        calibration = self.pipeline.stats()['calibration']
+        self.assertEqual(calibration['recalibrations'], 0)
+        self.assertIn('threshold_drift_left', calibration)
+
+    def test_drops_frames_under_overload(self):
+        self.pipeline.start()
+        time.sleep(0.5)
+        stats = self.pipeline.stats()
+
+        # Camera at 200 fps, inference at less than 50 fps
+        self.assertGreater(stats['droppedFrames'], 0)
+        self.assertLess(stats['processedFrames'], stats['capturedFrames'])
+
+    def test_inference_independent_of_clients(self):
+        self.pipeline.start()
+        self.pipeline.wait_for_sample(-1, timeout=5)
+
+        def client():
+            for _ in range(50):
+                self.pipeline.latest()
+                time.sleep(0.005)
+
+        clients = [threading.Thread(target=client) for _ in range(8)]
+        for thread in clients:
+            thread.start()
+        for thread in clients:
+            thread.join()
+
+        # Only the inference worker ever called refresh()
+        self.assertEqual(self.gaze.thread_names, {'inference'})
+        self.assertLessEqual(self.gaze.calls, self.pipeline.stats()['capturedFrames'])
+
+    def test_survives_a_failing_frame(self):
+        pipeline = GazePipeline(FakeCapture(), FailingGaze(delay=0.01))
+        pipeline.start()
+        try:
+            self.assertIsNotNone(pipeline.wait_for_sample(-1, timeout=5))
+        finally:
+            pipeline.stop()
+
+        stats = pipeline.stats()
+        self.assertEqual(stats['inferenceFailures'], 1)
+        self.assertIn('Unexpected frame', stats['lastInferenceError'])
+        self.assertGreater(stats['processedFrames'], 0)
+
+
+class TestFrameBroadcaster(unittest.TestCase):
+    """Tests for FrameBroadcaster"""
+
+    def setUp(self):
+        self.pipeline = GazePipeline(FakeCapture(fps=100), SlowGaze(delay=0.01))
+        self.pipeline.start()
+
+    def tearDown(self):
+        self.pipeline.stop()
+
+    def test_encodes_once_for_all_viewers(self):
+        broadcaster = FrameBroadcaster(self.pipeline)
+        streams = [broadcaster.stream() for _ in range(10)]
+        parts = [next(stream) for stream in streams]
+
+        self.assertEqual(broadcaster.stats()['subscribers'], 10)
+        self.assertLessEqual(broadcaster.encoded_frames, self.pipeline.processed_frames)
+        self.assertTrue(parts[0].startswith(b'--frame\r\nContent-Type: image/jpeg'))
+
+        for stream in streams:
+            stream.close()
+        self.assertEqual(broadcaster.stats()['subscribers'], 0)
+
+    def test_slow_viewer_skips_frames(self):
+        broadcaster = FrameBroadcaster(self.pipeline)
+        stream = broadcaster.stream()
+        next(stream)
+        time.sleep(0.3)
+        next(stream)
+        stream.close()
+
+        self.assertGreater(broadcaster.skipped_frames, 0)
+        self.assertEqual(broadcaster.sent_frames, 2)
+
+    def test_resolution_and_quality(self):
+        sample = self.pipeline.wait_for_sample(-1, timeout=5)
+        small = FrameBroadcaster(self.pipeline, quality=50, max_width=80).jpeg(sample)
+
+        decoded = cv2.imdecode(np.frombuffer(small, np.uint8), cv2.IMREAD_COLOR)
+        self.assertEqual(decoded.shape, (60, 80, 3))
+
+    def test_headers_carry_metrics(self):
+        sample = self.pipeline.wait_for_sample(-1, timeout=5)
+        headers = FrameBroadcaster.headers(sample)
+
+        self.assertEqual(json.loads(headers['X-Gaze-Metrics']), sample.metrics)
+        self.assertEqual(int(headers['X-Frame-Id']), sample.frame_id)
+        self.assertEqual(float(headers['X-Frame-Timestamp']), sample.timestamp)
+
+
+class TestMetricsBroadcaster(unittest.TestCase):
+    """Tests for the Server-Sent Events metrics stream"""
+
+    def setUp(self):
+        self.pipeline = GazePipeline(FakeCapture(fps=200), SlowGaze(delay=0.005))
+        self.pipeline.start()
+
+    def tearDown(self):
+        self.pipeline.stop()
+
+    @staticmethod
+    def parse(event):
+        fields = dict(line.split(': ', 1) for line in event.decode('utf-8').strip().split('\n'))
+        return fields['event'], int(fields['id']), json.loads(fields['data'])
+
+    def test_events_carry_timestamp_and_sequence(self):
+        stream = MetricsBroadcaster(self.pipeline).stream()
+        self.assertEqual(next(stream), b'retry: 1000\n\n')
+
+        name, event_id, first = self.parse(next(stream))
+        _, _, second = self.parse(next(stream))
+        stream.close()
+
+        self.assertEqual(name, 'metrics')
+        self.assertEqual(event_id, first['sequence'])
+        self.assertGreater(second['sequence'], first['sequence'])
+        self.assertGreaterEqual(second['timestamp'], first['timestamp'])
+        self.assertIn('leftPupil', first)
+
+    def test_max_rate(self):
+        broadcaster = MetricsBroadcaster(self.pipeline, max_rate=10)
+        stream = broadcaster.stream()
+        next(stream)
+
+        start = time.perf_counter()
+        for _ in range(4):
+            next(stream)
+        elapsed = time.perf_counter() - start
+        stream.close()
+
+        # The first event is immediate, the 3 next ones are 100 ms apart
+        self.assertGreaterEqual(elapsed, 0.29)
+        self.assertGreater(broadcaster.skipped_samples, 0)
+
+    def test_serialized_once_for_all_clients(self):
+        broadcaster = MetricsBroadcaster(self.pipeline)
+        sample = self.pipeline.wait_for_sample(-1, timeout=5)
+        self.assertIs(broadcaster._serialized(sample), broadcaster._serialized(sample))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,62 @@
+"""
+Tests for the fixtures and the baseline comparison of the benchmark suite
+"""
+
+import unittest
+import sys
+import os
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'benchmarks'))
+from gaze_tracking import GazeTracking
+from fixtures import face_clip
+from suite import compare
+
+
+def results(p50_ms, peak_kib):
+    return {'results': {'refresh/480p': {'p50_ms': p50_ms, 'peak_kib': peak_kib}}}
+
+
+class TestFixtures(unittest.TestCase):
+    """The fixtures have to reach the Eye and Pupil stages"""
+
+    def test_clip_pupils_located(self):
+        clip = face_clip(640, 480, nb_frames=3)
+        gaze = GazeTracking()
+        for frame in clip:
+            self.assertEqual(frame.shape, (480, 640, 3))
+            gaze.refresh(frame)
+            self.assertTrue(gaze.pupils_located)
+
+    def test_clip_is_deterministic(self):
+        first, second = face_clip(320, 240, nb_frames=2), face_clip(320, 240, nb_frames=2)
+        self.assertTrue((first[1] == second[1]).all())
+        self.assertFalse((first[0] == first[1]).all())
+
+
+class TestCompare(unittest.TestCase):
+    """Tests for the baseline comparison"""
+
+    def test_within_tolerance(self):
+        self.assertEqual(compare(results(12.5, 100), results(10, 100), tolerance=0.3), [])
+
+    def test_latency_regression(self):
+        regressions = compare(results(14, 100), results(10, 100), tolerance=0.3)
+        self.assertEqual([name for name, _ in regressions], ['refresh/480p'])
+
+    def test_latency_slack(self):
+        # Fast cases vary by more than the tolerance from run to run
+        self.assertEqual(compare(results(0.12, 100), results(0.04, 100), tolerance=0.3), [])
+        self.assertEqual(len(compare(results(0.3, 100), results(0.04, 100), tolerance=0.3)), 1)
+
+    def test_memory_regression(self):
+        # Small absolute increases are ignored
+        self.assertEqual(compare(results(10, 10), results(10, 1), tolerance=0.3), [])
+        self.assertEqual(len(compare(results(10, 1000), results(10, 500), tolerance=0.3)), 1)
+
+    def test_missing_cases_ignored(self):
+        self.assertEqual(compare(results(10, 100), {'results': {}}), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
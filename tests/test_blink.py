@@ -0,0 +1,126 @@
+"""
+Unit tests for the eye openness and the blink detection
+"""
+
+import unittest
+import sys
+import os
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'benchmarks'))
+from gaze_tracking import GazeTracking
+from gaze_tracking.blink import BlinkDetector, Blink, eye_aspect_ratio
+from gaze_tracking.calibration import Calibration
+from gaze_tracking.eye import Eye
+from fixtures import face_frame
+from tests.helpers import landmarks_with_left_eye
+
+OPEN_EYE = [(300, 200), (310, 194), (320, 194), (330, 200), (320, 206), (310, 206)]
+CLOSED_EYE = [(300, 200), (310, 199), (320, 199), (330, 200), (320, 200), (310, 200)]
+
+
+class TestEyeAspectRatio(unittest.TestCase):
+    """Tests for eye_aspect_ratio()"""
+
+    def test_open_and_closed(self):
+        self.assertAlmostEqual(eye_aspect_ratio(np.array(OPEN_EYE)), 0.4)
+        self.assertAlmostEqual(eye_aspect_ratio(np.array(CLOSED_EYE)), 1 / 30)
+
+    def test_vectorized(self):
+        eyes = np.array([[OPEN_EYE, CLOSED_EYE]] * 3)
+        ratios = eye_aspect_ratio(eyes)
+        self.assertEqual(ratios.shape, (3, 2))
+        np.testing.assert_allclose(ratios[:, 0], eye_aspect_ratio(np.array(OPEN_EYE)))
+        np.testing.assert_allclose(ratios[:, 1], eye_aspect_ratio(np.array(CLOSED_EYE)))
+
+
+class TestBlinkDetector(unittest.TestCase):
+    """Tests for BlinkDetector"""
+
+    def test_blink_event(self):
+        detector = BlinkDetector(max_duration=0.5)
+        for i, closed in enumerate([False, True, True, True, False, False]):
+            detector.update(i / 30, closed)
+
+        self.assertEqual(detector.count, 1)
+        events = detector.events()
+        self.assertEqual(len(events), 1)
+        self.assertIsInstance(events[0], Blink)
+        self.assertAlmostEqual(events[0].start, 1 / 30)
+        self.assertAlmostEqual(events[0].duration, 3 / 30)
+        self.assertEqual(detector.events(), [])
+
+    def test_long_closure_is_not_a_blink(self):
+        detector = BlinkDetector(max_duration=0.5)
+        detector.update(0.0, True)
+        self.assertEqual(detector.closed_since, 0.0)
+        detector.update(1.0, False)
+        self.assertEqual(detector.count, 0)
+        self.assertIsNone(detector.closed_since)
+
+    def test_lost_face_ends_closure(self):
+        detector = BlinkDetector()
+        detector.update(0.0, True)
+        detector.update(0.1, None)
+        detector.update(0.2, False)
+        self.assertEqual(detector.events(), [])
+
+
+class TestClosedEye(unittest.TestCase):
+    """Tests for the short-circuit of the pupil on closed eyes"""
+
+    def setUp(self):
+        self.frame = np.full((480, 640), 128, np.uint8)
+
+    def test_closed_eye_skips_pupil_and_calibration(self):
+        calibration = Calibration()
+        eye = Eye(self.frame, landmarks_with_left_eye(CLOSED_EYE), 0, calibration, closed_threshold=0.2)
+
+        self.assertTrue(eye.closed)
+        self.assertIsNone(eye.pupil)
+        self.assertEqual(len(calibration.thresholds_left), 0)
+        self.assertIsNotNone(eye.origin)
+
+    def test_open_eye_has_pupil(self):
+        eye = Eye(self.frame, landmarks_with_left_eye(OPEN_EYE), 0, Calibration(), closed_threshold=0.2)
+        self.assertFalse(eye.closed)
+        self.assertIsNotNone(eye.pupil)
+
+    def test_disabled_by_default(self):
+        eye = Eye(self.frame, landmarks_with_left_eye(CLOSED_EYE), 0, Calibration())
+        self.assertIsNone(eye.closed)
+        self.assertIsNotNone(eye.pupil)
+        self.assertAlmostEqual(eye.openness, 1 / 30)
+
+
+class TestGazeTrackingOpenness(unittest.TestCase):
+    """Tests for the openness outputs of GazeTracking"""
+
+    def test_open_eyes(self):
+        gaze = GazeTracking(closed_threshold=0.2)
+        gaze.refresh(face_frame(640, 480), timestamp=0.0)
+
+        self.assertGreater(gaze.eye_openness(), 0.2)
+        self.assertFalse(gaze.is_blinking())
+        self.assertEqual(gaze.record['openness'], gaze.eye_openness())
+
+    def test_blinks_disabled_by_default(self):
+        gaze = GazeTracking()
+        gaze.refresh(face_frame(640, 480), timestamp=0.0)
+
+        self.assertIsNotNone(gaze.eye_openness())
+        self.assertIsNone(gaze.is_blinking())
+        self.assertIsNone(gaze.blinks.closed_since)
+
+    def test_no_face(self):
+        gaze = GazeTracking()
+        gaze.refresh(np.zeros((480, 640, 3), np.uint8), timestamp=0.0)
+
+        self.assertIsNone(gaze.eye_openness())
+        self.assertIsNone(gaze.is_blinking())
+        self.assertTrue(np.isnan(gaze.record['openness']))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,118 @@
+"""
+Unit tests for Calibration
+"""
+
+import unittest
+import sys
+import os
+import numpy as np
+import cv2
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+from gaze_tracking.calibration import Calibration
+from gaze_tracking.pupil import Pupil
+
+
+def reference_best_threshold(eye_frame):
+    """Threshold search that binarizes the frame once per candidate threshold"""
+    trials = {}
+    for threshold in range(5, 100, 5):
+        iris_frame = Pupil.image_processing(eye_frame, threshold)
+        trials[threshold] = Calibration.iris_size(iris_frame)
+    return min(trials.items(), key=(lambda p: abs(p[1] - 0.48)))[0]
+
+
+class TestCalibration(unittest.TestCase):
+    """Tests for the threshold search of Calibration"""
+
+    def test_find_best_threshold_matches_reference(self):
+        random = np.random.RandomState(0)
+        for _ in range(200):
+            height, width = random.randint(11, 40), random.randint(11, 70)
+            mean, spread = random.randint(0, 200), random.randint(1, 60)
+            eye_frame = np.clip(random.normal(mean, spread, (height, width)), 0, 255).astype(np.uint8)
+            self.assertEqual(Calibration.find_best_threshold(eye_frame), reference_best_threshold(eye_frame))
+
+    def test_find_best_threshold_returns_int(self):
+        eye_frame = np.full((20, 40), 255, np.uint8)
+        threshold = Calibration.find_best_threshold(eye_frame)
+        self.assertIsInstance(threshold, int)
+        self.assertEqual(threshold, 5)
+
+    def test_is_complete_after_nb_frames(self):
+        calibration = Calibration()
+        eye_frame = np.full((20, 40), 128, np.uint8)
+        for _ in range(calibration.nb_frames):
+            self.assertFalse(calibration.is_complete())
+            calibration.evaluate(eye_frame, 0)
+            calibration.evaluate(eye_frame, 1)
+
+        self.assertTrue(calibration.is_complete())
+        self.assertEqual(calibration.threshold(0), Calibration.find_best_threshold(eye_frame))
+
+
+def synthetic_eye(brightness=0):
+    """Returns an eye frame with a dark iris, brightened by the given amount"""
+    eye_frame = np.full((30, 60), 150, np.uint8)
+    cv2.circle(eye_frame, (30, 15), 9, 40, -1)
+    return cv2.add(eye_frame, np.full_like(eye_frame, brightness))
+
+
+def run_session(calibration, nb_frames, brightness_change_at, brightness=40):
+    """Feeds the calibration like Eye does, with a lighting change during the session"""
+    for i in range(nb_frames):
+        eye_frame = synthetic_eye(0 if i < brightness_change_at else brightness)
+        for side in (0, 1):
+            if not calibration.is_complete():
+                calibration.evaluate(eye_frame, side)
+            pupil = Pupil(eye_frame, calibration.threshold(side))
+            if calibration.needs_evaluation(pupil.iris_frame, side):
+                calibration.evaluate(eye_frame, side)
+
+
+class TestAdaptiveCalibration(unittest.TestCase):
+    """Tests for the adaptive mode of Calibration"""
+
+    def test_static_calibration_ignores_lighting_change(self):
+        calibration = Calibration()
+        run_session(calibration, 200, brightness_change_at=50)
+
+        self.assertEqual(calibration.threshold(0), Calibration.find_best_threshold(synthetic_eye(0)))
+        self.assertEqual(calibration.recalibrations, 0)
+
+    def test_adaptive_calibration_follows_lighting_change(self):
+        calibration = Calibration(adaptive=True, window=50)
+        run_session(calibration, 200, brightness_change_at=50)
+
+        expected = Calibration.find_best_threshold(synthetic_eye(40))
+        self.assertEqual(calibration.threshold(0), expected)
+        self.assertEqual(calibration.threshold(1), expected)
+
+        metrics = calibration.metrics()
+        self.assertEqual(metrics['threshold_left'], expected)
+        self.assertEqual(metrics['threshold_drift_left'], expected - Calibration.find_best_threshold(synthetic_eye(0)))
+
+    def test_adaptive_window_is_bounded(self):
+        calibration = Calibration(adaptive=True, window=30, interval=5)
+        run_session(calibration, 300, brightness_change_at=300)
+
+        self.assertEqual(len(calibration.thresholds_left), 30)
+        self.assertEqual(len(calibration.thresholds_right), 30)
+        # Stable lighting: one evaluation per eye every interval
+        self.assertLessEqual(calibration.recalibrations, 2 * 300 // 5)
+
+    def test_window_must_hold_a_calibration(self):
+        with self.assertRaises(ValueError):
+            Calibration(adaptive=True, window=10)
+
+    def test_from_dict_adaptive(self):
+        data = Calibration.from_dict({'nb_frames': 20, 'thresholds_left': [40] * 20,
+                                      'thresholds_right': [30] * 20}).to_dict()
+        calibration = Calibration.from_dict(data, adaptive=True, window=25)
+
+        self.assertTrue(calibration.is_complete())
+        self.assertEqual(calibration.thresholds_left.maxlen, 25)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,68 @@
+"""
+Unit tests for Eye isolation
+"""
+
+import unittest
+import sys
+import os
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'benchmarks'))
+from gaze_tracking.eye import Eye
+from gaze_tracking.calibration import Calibration
+from tests.helpers import landmarks_with_left_eye
+from eye_isolate import RESOLUTIONS, eye_landmarks, full_frame_isolate
+
+
+class TestEyeIsolation(unittest.TestCase):
+    """Tests for Eye._isolate()"""
+
+    def setUp(self):
+        self.frame = np.arange(480 * 640, dtype=np.uint32).reshape(480, 640).astype(np.uint8)
+        self.eye = Eye.__new__(Eye)
+
+    def test_masks_outside_of_the_eye(self):
+        landmarks = landmarks_with_left_eye([(300, 200), (310, 195), (320, 195), (330, 200), (320, 205), (310, 205)])
+        self.eye._isolate(self.frame, landmarks, Eye.LEFT_EYE_POINTS)
+
+        self.assertEqual(self.eye.origin, (295, 190))
+        self.assertEqual(self.eye.frame.shape, (20, 40))
+        # Corners are outside of the eye polygon, the center is inside
+        self.assertEqual(self.eye.frame[0, 0], 255)
+        self.assertEqual(self.eye.frame[10, 20], self.frame[200, 315])
+
+    def test_does_not_modify_the_frame(self):
+        original = self.frame.copy()
+        landmarks = landmarks_with_left_eye([(300, 200), (310, 195), (320, 195), (330, 200), (320, 205), (310, 205)])
+        self.eye._isolate(self.frame, landmarks, Eye.LEFT_EYE_POINTS)
+
+        np.testing.assert_array_equal(self.frame, original)
+
+    def test_crop_is_clamped_to_frame_edges(self):
+        landmarks = landmarks_with_left_eye([(1, 3), (10, 1), (20, 1), (30, 3), (20, 6), (10, 6)])
+        self.eye._isolate(self.frame, landmarks, Eye.LEFT_EYE_POINTS)
+
+        self.assertEqual(self.eye.origin, (0, 0))
+        self.assertEqual(self.eye.frame.shape, (11, 35))
+
+    def test_eye_outside_of_the_frame(self):
+        landmarks = landmarks_with_left_eye([(700, 200), (710, 195), (720, 195), (730, 200), (720, 205), (710, 205)])
+        eye = Eye(self.frame, landmarks, 0, Calibration())
+
+        self.assertIsNone(eye.frame)
+        self.assertIsNone(eye.center)
+        self.assertIsNone(eye.pupil)
+
+    def test_same_result_as_the_full_frame_implementation(self):
+        for width, height in RESOLUTIONS:
+            frame = np.random.RandomState(0).randint(0, 256, (height, width)).astype(np.uint8)
+            landmarks = eye_landmarks(width, height)
+            region = np.array([(landmarks.part(p).x, landmarks.part(p).y) for p in Eye.LEFT_EYE_POINTS], np.int32)
+
+            self.eye._isolate(frame, landmarks, Eye.LEFT_EYE_POINTS)
+            np.testing.assert_array_equal(self.eye.frame, full_frame_isolate(frame, region))
+
+
+if __name__ == '__main__':
+    unittest.main()
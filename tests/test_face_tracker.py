@@ -0,0 +1,118 @@
+"""
+Unit tests for FaceTracker
+Uses a fake detector and predictor so the tracking logic can be
+tested without a real face in the frame.
+"""
+
+import unittest
+import sys
+import os
+import numpy as np
+import dlib
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+from gaze_tracking.face_tracker import FaceTracker
+
+
+class FakeDetector(object):
+    """Returns a fixed face rectangle, or nothing, and counts its calls"""
+
+    def __init__(self, rect):
+        self.rect = rect
+        self.calls = 0
+
+    def __call__(self, frame):
+        self.calls += 1
+        self.shape = frame.shape
+        faces = dlib.rectangles()
+        if self.rect is not None:
+            faces.append(self.rect)
+        return faces
+
+
+class FakePredictor(object):
+    """Places 68 landmarks on a grid inside the rectangle, shifted by an offset"""
+
+    def __init__(self):
+        self.offset = (0, 0)
+
+    def __call__(self, frame, rect):
+        points = dlib.points()
+        for i in range(68):
+            x = rect.left() + rect.width() // 4 + (i % 17) * rect.width() // 32 + self.offset[0]
+            y = rect.top() + rect.height() // 4 + (i // 17) * rect.height() // 8 + self.offset[1]
+            points.append(dlib.point(x, y))
+        return dlib.full_object_detection(rect, points)
+
+
+class TestFaceTracker(unittest.TestCase):
+    """Tests for the detection/tracking decisions of FaceTracker"""
+
+    def setUp(self):
+        self.frame = np.zeros((480, 640), dtype=np.uint8)
+        self.detector = FakeDetector(dlib.rectangle(200, 100, 400, 300))
+        self.predictor = FakePredictor()
+
+    def test_detector_runs_every_frame_without_tracking(self):
+        tracker = FaceTracker(self.detector, self.predictor)
+        for _ in range(5):
+            self.assertIsNotNone(tracker.locate(self.frame))
+
+        self.assertEqual(self.detector.calls, 5)
+        self.assertEqual(tracker.stats()['detector_hits'], 5)
+        self.assertEqual(tracker.stats()['tracked_frames'], 0)
+
+    def test_tracking_skips_detector_until_interval(self):
+        tracker = FaceTracker(self.detector, self.predictor, tracking=True, redetect_interval=4)
+        for _ in range(10):
+            self.assertIsNotNone(tracker.locate(self.frame))
+
+        # Full detection on frames 1 and 6, the others are tracked
+        self.assertEqual(self.detector.calls, 2)
+        self.assertEqual(tracker.stats()['tracked_frames'], 8)
+        self.assertEqual(tracker.stats()['tracking_failures'], 0)
+
+    def test_tracked_rect_matches_detection_on_static_face(self):
+        tracker = FaceTracker(self.detector, self.predictor, tracking=True)
+        detected = tracker.locate(self.frame)
+        tracked = tracker.locate(self.frame)
+
+        self.assertEqual(detected.rect, tracked.rect)
+        self.assertEqual([(p.x, p.y) for p in detected.parts()], [(p.x, p.y) for p in tracked.parts()])
+
+    def test_drift_triggers_detection(self):
+        tracker = FaceTracker(self.detector, self.predictor, tracking=True, max_drift=0.25)
+        tracker.locate(self.frame)
+
+        self.predictor.offset = (150, 0)
+        tracker.locate(self.frame)
+
+        self.assertEqual(self.detector.calls, 2)
+        self.assertEqual(tracker.stats()['tracking_failures'], 1)
+
+    def test_detector_miss_resets_tracking(self):
+        tracker = FaceTracker(self.detector, self.predictor, tracking=True)
+        tracker.locate(self.frame)
+        tracker.reset()
+
+        self.detector.rect = None
+        self.assertIsNone(tracker.locate(self.frame))
+        self.assertIsNone(tracker.locate(self.frame))
+        self.assertEqual(tracker.stats()['detector_misses'], 2)
+        self.assertEqual(tracker.stats()['tracked_frames'], 0)
+
+    def test_detection_scale_maps_rect_to_full_resolution(self):
+        self.detector.rect = dlib.rectangle(100, 50, 200, 150)
+        tracker = FaceTracker(self.detector, self.predictor, detection_scale=0.5)
+        landmarks = tracker.locate(self.frame)
+
+        self.assertEqual(self.detector.shape, (240, 320))
+        self.assertEqual(landmarks.rect, dlib.rectangle(200, 100, 400, 300))
+
+    def test_invalid_detection_scale(self):
+        with self.assertRaises(ValueError):
+            FaceTracker(self.detector, self.predictor, detection_scale=0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -11,7 +11,9 @@ import numpy as np
 
 # Add parent directory to path to import gaze_tracking
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'benchmarks'))
 from gaze_tracking import GazeTracking
+from fixtures import face_frame
 
 
 class TestGazeTrackingIntegration(unittest.TestCase):
@@ -177,6 +179,64 @@ class TestGazeTrackingIntegration(unittest.TestCase):
         except Exception as e:
             self.fail(f"backend/app.py workflow raised unexpected exception: {e}")
 
+    def test_analyze_batch(self):
+        """Test that analyze_batch() returns one invalid record per frame without face"""
+        frames = np.zeros((3, 480, 640, 3), dtype=np.uint8)
+        results = self.gaze.analyze_batch(frames)
+
+        self.assertEqual(results.dtype, GazeTracking.BATCH_DTYPE)
+        self.assertEqual(len(results), 3)
+        self.assertFalse(results['valid'].any())
+        self.assertTrue(np.isnan(results['horizontal']).all())
+        self.assertTrue(np.isnan(results['vertical']).all())
+
+        # A list of frames works too
+        self.assertEqual(len(self.gaze.analyze_batch(list(frames))), 3)
+
+    def test_record_updated_in_place(self):
+        """Test that record describes the last frame without being reallocated"""
+        record = self.gaze.record
+        pupil_left = record['pupil_left']
+        self.gaze.refresh(self.dummy_frame)
+
+        self.assertIs(self.gaze.record, record)
+        self.assertTrue(np.shares_memory(record['pupil_left'], pupil_left))
+        self.assertFalse(record['valid'])
+        self.assertTrue(np.isnan(record['horizontal']))
+
+
+class TestLightweightResults(unittest.TestCase):
+    """Tests for the results kept with keep_frames=False"""
+
+    def test_same_results_without_frames(self):
+        frame = face_frame(640, 480)
+        full, light = GazeTracking(), GazeTracking(keep_frames=False)
+        full.refresh(frame)
+        light.refresh(frame)
+
+        self.assertTrue(light.record['valid'])
+        self.assertEqual(light.record.tobytes(), full.record.tobytes())
+        self.assertEqual(tuple(light.record['pupil_left']), light.pupil_left_coords())
+
+        self.assertIsNotNone(full.eye_left.frame)
+        self.assertIsNone(light.eye_left.frame)
+        self.assertIsNone(light.eye_left.pupil.iris_frame)
+        self.assertFalse(hasattr(light.eye_left, '__dict__'))
+        self.assertFalse(hasattr(light.eye_left.pupil, '__dict__'))
+
+    def test_releases_the_frame(self):
+        gaze = GazeTracking(keep_frames=False)
+        gaze.refresh(face_frame(640, 480))
+        gray_buffer = gaze._gray_frame
+
+        self.assertIsNone(gaze.frame)
+        with self.assertRaises(ValueError):
+            gaze.annotated_frame()
+
+        # The grayscale buffer is still reused from one frame to the next
+        gaze.refresh(face_frame(640, 480, dx=2))
+        self.assertIs(gaze._gray_frame, gray_buffer)
+
 
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,72 @@
+"""
+Unit tests for the registry of the dlib models
+"""
+
+import unittest
+import sys
+import os
+import threading
+from unittest import mock
+import dlib
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'benchmarks'))
+from gaze_tracking import GazeTracking, models
+from fixtures import face_frame
+
+
+class TestModels(unittest.TestCase):
+    """Tests for the lazy loading and the sharing of the models"""
+
+    def setUp(self):
+        # The predictor of the other tests is put back once the registry was tested empty
+        self.loaded_predictor = models._predictor
+        models._predictor = None
+        self.load = mock.patch('gaze_tracking.models.dlib.shape_predictor', wraps=dlib.shape_predictor)
+        self.shape_predictor = self.load.start()
+
+    def tearDown(self):
+        self.load.stop()
+        if self.loaded_predictor is not None:
+            models._predictor = self.loaded_predictor
+
+    def test_predictor_loaded_on_first_refresh(self):
+        gaze = GazeTracking()
+        self.assertFalse(models.is_loaded())
+
+        gaze.refresh(face_frame(640, 480))
+        self.assertTrue(models.is_loaded())
+        self.assertTrue(gaze.pupils_located)
+
+    def test_instances_share_the_predictor(self):
+        frame = face_frame(640, 480)
+        for gaze in (GazeTracking(), GazeTracking()):
+            gaze.refresh(frame)
+
+        self.assertEqual(self.shape_predictor.call_count, 1)
+        self.assertIs(models.get_shape_predictor(), models.get_shape_predictor())
+
+    def test_predictor_loaded_once_by_concurrent_threads(self):
+        predictors = []
+        threads = [threading.Thread(target=lambda: predictors.append(models.get_shape_predictor()))
+                   for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(self.shape_predictor.call_count, 1)
+        self.assertTrue(all(predictor is predictors[0] for predictor in predictors))
+
+    def test_each_thread_has_its_own_detector(self):
+        detectors = []
+        thread = threading.Thread(target=lambda: detectors.append(models.get_face_detector()))
+        thread.start()
+        thread.join()
+
+        self.assertIs(models.get_face_detector(), models.get_face_detector())
+        self.assertIsNot(detectors[0], models.get_face_detector())
+
+
+if __name__ == '__main__':
+    unittest.main()
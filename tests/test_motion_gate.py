@@ -0,0 +1,95 @@
+"""
+Unit tests for the motion-gated frame skipping
+"""
+
+import unittest
+import sys
+import os
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'benchmarks'))
+from gaze_tracking import GazeTracking, MotionGate
+from fixtures import face_frame
+
+
+class FakeEye(object):
+    """Eye region of an analyzed frame"""
+
+    def __init__(self, x, y, width, height):
+        self.origin = (x, y)
+        self.center = (width / 2, height / 2)
+
+
+class TestMotionGate(unittest.TestCase):
+    """Tests for MotionGate"""
+
+    def setUp(self):
+        rng = np.random.default_rng(0)
+        self.frame = rng.integers(0, 256, (100, 100, 3), dtype=np.uint8)
+        self.eyes = [FakeEye(20, 30, 20, 10), FakeEye(60, 30, 20, 10)]
+
+    def test_first_frame_processed(self):
+        gate = MotionGate()
+        self.assertFalse(gate.should_skip(self.frame))
+        self.assertEqual(gate.stats(), {'processed_frames': 1, 'skipped_frames': 0})
+
+    def test_skips_still_eyes(self):
+        gate = MotionGate(threshold=2)
+        gate.should_skip(self.frame)
+        gate.remember(self.frame, self.eyes)
+
+        moved_elsewhere = self.frame.copy()
+        moved_elsewhere[80:] = 0
+        self.assertTrue(gate.should_skip(moved_elsewhere))
+
+        moved_eye = self.frame.copy()
+        moved_eye[30:40, 60:80] = 255 - moved_eye[30:40, 60:80]
+        self.assertFalse(gate.should_skip(moved_eye))
+        self.assertEqual(gate.stats(), {'processed_frames': 2, 'skipped_frames': 1})
+
+    def test_max_skips(self):
+        gate = MotionGate(max_skips=2)
+        gate.should_skip(self.frame)
+        gate.remember(self.frame, self.eyes)
+
+        skips = [gate.should_skip(self.frame) for _ in range(6)]
+        self.assertEqual(skips, [True, True, False, True, True, False])
+
+    def test_no_eyes(self):
+        gate = MotionGate()
+        gate.remember(self.frame, [])
+        self.assertFalse(gate.should_skip(self.frame))
+
+    def test_invalid_parameters(self):
+        with self.assertRaises(ValueError):
+            MotionGate(threshold=-1)
+        with self.assertRaises(ValueError):
+            MotionGate(max_skips=-1)
+
+
+class TestGazeTrackingMotionGate(unittest.TestCase):
+    """Tests for the frame skipping of GazeTracking"""
+
+    def test_reuses_results(self):
+        gate = MotionGate()
+        gaze = GazeTracking(motion_gate=gate)
+        frame = face_frame(640, 480)
+
+        gaze.refresh(frame)
+        eye_left = gaze.eye_left
+        coords = gaze.pupil_left_coords()
+        self.assertIsNotNone(coords)
+
+        gaze.refresh(frame.copy())
+        self.assertIs(gaze.eye_left, eye_left)
+        self.assertEqual(gate.stats(), {'processed_frames': 1, 'skipped_frames': 1})
+
+        gaze.refresh(face_frame(640, 480, dx=10))
+        self.assertIsNot(gaze.eye_left, eye_left)
+        self.assertNotEqual(gaze.pupil_left_coords(), coords)
+        self.assertEqual(gate.stats(), {'processed_frames': 2, 'skipped_frames': 1})
+
+
+if __name__ == '__main__':
+    unittest.main()
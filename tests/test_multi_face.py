@@ -0,0 +1,140 @@
+"""
+Unit tests for the multi-face tracking
+"""
+
+import unittest
+import sys
+import os
+import numpy as np
+import dlib
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+from gaze_tracking import GazeTracking
+from gaze_tracking.calibration import Calibration
+from gaze_tracking.multi_face import MultiFaceTracker, iou_matrix
+
+
+class FakeDetector(object):
+    """Returns the face rectangles it is given"""
+
+    def __init__(self):
+        self.boxes = []
+
+    def __call__(self, frame):
+        faces = dlib.rectangles()
+        for box in self.boxes:
+            faces.append(dlib.rectangle(*box))
+        return faces
+
+
+def fake_predictor(frame, rect):
+    """Places 68 landmarks on a grid inside the rectangle"""
+    points = dlib.points()
+    for i in range(68):
+        x = rect.left() + rect.width() // 4 + (i % 17) * rect.width() // 32
+        y = rect.top() + rect.height() // 4 + (i // 17) * rect.height() // 8
+        points.append(dlib.point(x, y))
+    return dlib.full_object_detection(rect, points)
+
+
+class TestMultiFaceTracker(unittest.TestCase):
+    """Tests for the association of faces across frames"""
+
+    def setUp(self):
+        self.frame = np.zeros((480, 640), dtype=np.uint8)
+        self.detector = FakeDetector()
+
+    def tracker(self, **options):
+        return MultiFaceTracker(self.detector, fake_predictor, **options)
+
+    def test_iou_matrix(self):
+        boxes = np.array([[0, 0, 10, 10], [5, 0, 15, 10], [20, 20, 30, 30]], np.float64)
+        ious = iou_matrix(boxes, boxes)
+
+        np.testing.assert_allclose(np.diag(ious), 1)
+        self.assertAlmostEqual(ious[0, 1], 50 / 150)
+        self.assertEqual(ious[0, 2], 0)
+
+    def test_faces_keep_their_id(self):
+        tracker = self.tracker()
+        self.detector.boxes = [(10, 10, 110, 110), (300, 10, 400, 110)]
+        first = tracker.update(self.frame)
+
+        # Faces moved a little and were detected in the other order
+        self.detector.boxes = [(305, 15, 405, 115), (15, 10, 115, 110)]
+        second = tracker.update(self.frame)
+
+        self.assertEqual([f.track_id for f in first], [0, 1])
+        self.assertEqual([f.track_id for f in second], [0, 1])
+        self.assertEqual(second[0].rect.left(), 15)
+        self.assertEqual(second[1].rect.left(), 305)
+
+    def test_each_face_has_its_own_calibration(self):
+        tracker = self.tracker()
+        self.detector.boxes = [(10, 10, 110, 110), (300, 10, 400, 110)]
+        faces = tracker.update(self.frame)
+
+        self.assertIsNot(faces[0].calibration, faces[1].calibration)
+        self.assertEqual(len(faces[0].calibration.thresholds_left), 1)
+        self.assertIsNotNone(faces[0].eye_left)
+        self.assertIsNotNone(faces[1].eye_right)
+
+    def test_missing_face_is_dropped_after_max_missed(self):
+        tracker = self.tracker(max_missed=2)
+        self.detector.boxes = [(10, 10, 110, 110)]
+        tracker.update(self.frame)
+
+        self.detector.boxes = []
+        for _ in range(2):
+            self.assertEqual(tracker.update(self.frame), [])
+        self.assertEqual(len(tracker.tracks), 1)
+
+        # Still known: the face gets its identifier back
+        self.detector.boxes = [(10, 10, 110, 110)]
+        self.assertEqual([f.track_id for f in tracker.update(self.frame)], [0])
+
+        self.detector.boxes = []
+        for _ in range(3):
+            tracker.update(self.frame)
+        self.assertEqual(tracker.tracks, [])
+
+        self.detector.boxes = [(10, 10, 110, 110)]
+        self.assertEqual([f.track_id for f in tracker.update(self.frame)], [1])
+
+    def test_parallel_analysis_matches_serial(self):
+        self.detector.boxes = [(10 + 150 * i, 10, 110 + 150 * i, 110) for i in range(4)]
+        frame = np.random.RandomState(0).randint(0, 256, self.frame.shape).astype(np.uint8)
+
+        serial = self.tracker(workers=1).update(frame)
+        parallel = self.tracker(workers=4).update(frame)
+
+        for a, b in zip(serial, parallel):
+            self.assertEqual(a.pupil_left_coords(), b.pupil_left_coords())
+            self.assertEqual(a.horizontal_ratio(), b.horizontal_ratio())
+
+    def test_close_stops_the_threads(self):
+        self.detector.boxes = [(10, 10, 110, 110), (300, 10, 400, 110)]
+        tracker = self.tracker(workers=2)
+        tracker.update(self.frame)
+        executor = tracker._executor
+
+        tracker.close()
+        self.assertTrue(executor._shutdown)
+        self.assertIsNone(tracker._executor)
+
+        # The threads are started again for the next frame
+        self.assertEqual(len(tracker.update(self.frame)), 2)
+        tracker.close()
+
+    def test_unsupported_options(self):
+        with self.assertRaises(ValueError):
+            GazeTracking(multi_face=True, tracking=True)
+        with self.assertRaises(ValueError):
+            GazeTracking(multi_face=True, calibration=Calibration())
+
+        with GazeTracking(multi_face=True, face_workers=2) as gaze:
+            self.assertIsNotNone(gaze._multi_face_tracker)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,112 @@
+"""
+Unit tests for the calibration profiles store
+"""
+
+import unittest
+import sys
+import os
+import shutil
+import tempfile
+import time
+from multiprocessing import Pool
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+from gaze_tracking import GazeTracking, CalibrationStore
+from gaze_tracking.calibration import Calibration
+
+
+def complete_calibration(left=40, right=30):
+    """Returns a calibration that has already seen enough frames"""
+    calibration = Calibration()
+    calibration.thresholds_left = [left] * calibration.nb_frames
+    calibration.thresholds_right = [right] * calibration.nb_frames
+    return calibration
+
+
+def save_profiles(args):
+    """Saves profiles from a separate process, like a worker of the backend"""
+    path, worker, count = args
+    store = CalibrationStore(path, max_profiles=1000)
+    for i in range(count):
+        store.save(complete_calibration(), 'user-{}-{}'.format(worker, i))
+
+
+class TestCalibrationStore(unittest.TestCase):
+    """Tests for CalibrationStore"""
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, 'profiles.json')
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_save_and_load(self):
+        store = CalibrationStore(self.path)
+        store.save(complete_calibration(), 'alice', 'cam0')
+
+        calibration = CalibrationStore(self.path).load('alice', 'cam0')
+        self.assertTrue(calibration.is_complete())
+        self.assertEqual(calibration.threshold(0), 40)
+        self.assertEqual(calibration.threshold(1), 30)
+
+    def test_missing_profile(self):
+        store = CalibrationStore(self.path)
+        self.assertIsNone(store.load('alice'))
+
+        store.save(complete_calibration(), 'alice', 'cam0')
+        self.assertIsNone(store.load('alice', 'cam1'))
+
+    def test_least_recently_used_is_evicted(self):
+        store = CalibrationStore(self.path, max_profiles=2)
+        store.save(complete_calibration(), 'alice')
+        store.save(complete_calibration(), 'bob')
+        store.load('alice')
+        store.save(complete_calibration(), 'carol')
+
+        self.assertEqual(store.keys(), ['alice', 'carol'])
+        self.assertIsNone(store.load('bob'))
+
+    def test_stale_profiles_expire(self):
+        store = CalibrationStore(self.path, max_age=0.05)
+        store.save(complete_calibration(), 'alice')
+        time.sleep(0.1)
+
+        self.assertIsNone(store.load('alice'))
+        self.assertEqual(store.keys(), [])
+
+    def test_delete(self):
+        store = CalibrationStore(self.path)
+        store.save(complete_calibration(), 'alice')
+        store.delete('alice')
+        self.assertEqual(store.keys(), [])
+
+    def test_adaptive_options_are_kept(self):
+        store = CalibrationStore(self.path)
+        calibration = Calibration.from_dict(complete_calibration().to_dict(), adaptive=True, window=30, interval=10)
+        store.save(calibration, 'alice')
+
+        loaded = store.load('alice')
+        self.assertTrue(loaded.adaptive)
+        self.assertEqual(loaded.thresholds_left.maxlen, 30)
+        self.assertEqual(loaded.interval, 10)
+
+        loaded = store.load('alice', adaptive=False)
+        self.assertFalse(loaded.adaptive)
+        self.assertTrue(loaded.is_complete())
+
+    def test_concurrent_writers_keep_every_profile(self):
+        with Pool(4) as pool:
+            pool.map(save_profiles, [(self.path, worker, 15) for worker in range(4)])
+        self.assertEqual(len(CalibrationStore(self.path).keys()), 60)
+
+    def test_gaze_tracking_starts_calibrated(self):
+        store = CalibrationStore(self.path)
+        store.save(complete_calibration(), 'alice', 'cam0')
+
+        gaze = GazeTracking(calibration=store.load('alice', 'cam0'))
+        self.assertTrue(gaze.calibration.is_complete())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,115 @@
+"""
+Unit tests for the stage profiler
+"""
+
+import unittest
+import sys
+import os
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+from gaze_tracking import GazeTracking
+from gaze_tracking.calibration import Calibration
+from gaze_tracking.eye import Eye
+from gaze_tracking.profiling import Histogram, Profiler
+from tests.helpers import landmarks_with_left_eye
+
+
+class TestHistogram(unittest.TestCase):
+    """Tests for Histogram"""
+
+    def test_percentiles_within_one_bucket(self):
+        histogram = Histogram()
+        for value in np.linspace(0.001, 0.1, 1000):
+            histogram.observe(value)
+
+        # Buckets are 19% wide, so the percentiles are at most 19% above the true value
+        for q, expected in [(50, 0.0505), (95, 0.095), (99, 0.099)]:
+            self.assertGreaterEqual(histogram.percentile(q), expected)
+            self.assertLessEqual(histogram.percentile(q), expected * 2 ** 0.25)
+        self.assertEqual(histogram.count, 1000)
+        self.assertAlmostEqual(histogram.sum, 50.5, places=6)
+
+    def test_empty(self):
+        self.assertIsNone(Histogram().percentile(50))
+
+
+class TestProfiler(unittest.TestCase):
+    """Tests for Profiler"""
+
+    def test_disabled_records_nothing(self):
+        profiler = Profiler()
+        with profiler.stage('refresh'):
+            pass
+        self.assertEqual(profiler.wrap('face_detector', lambda x: x * 2)(21), 42)
+        self.assertEqual(profiler.summary(), {})
+
+    def test_stages_and_wrapped_functions(self):
+        profiler = Profiler(enabled=True)
+        detector = profiler.wrap('face_detector', lambda x: x * 2)
+        for _ in range(3):
+            with profiler.stage('refresh'):
+                self.assertEqual(detector(21), 42)
+
+        summary = profiler.summary()
+        self.assertEqual(list(summary), ['refresh', 'face_detector'])
+        self.assertEqual(summary['refresh']['count'], 3)
+        self.assertLessEqual(summary['refresh']['p50_ms'], summary['refresh']['p99_ms'])
+
+    def test_prometheus_format(self):
+        profiler = Profiler(enabled=True)
+        profiler.record('grayscale', 0.0005)
+        profiler.record('grayscale', 0.002)
+        lines = profiler.prometheus().splitlines()
+
+        self.assertIn('# TYPE gaze_stage_duration_seconds histogram', lines)
+        self.assertIn('gaze_stage_duration_seconds_bucket{stage="grayscale",le="0.001024"} 1', lines)
+        self.assertIn('gaze_stage_duration_seconds_bucket{stage="grayscale",le="+Inf"} 2', lines)
+        self.assertIn('gaze_stage_duration_seconds_count{stage="grayscale"} 2', lines)
+
+
+class TestGazeTrackingProfiling(unittest.TestCase):
+    """Tests for the stages recorded during the analysis"""
+
+    def test_refresh_stages(self):
+        gaze = GazeTracking(profiling=True)
+        gaze.refresh(np.zeros((120, 160, 3), dtype=np.uint8))
+
+        # No face in the frame, so the analysis stops after the detector
+        self.assertEqual(list(gaze.stage_stats), ['refresh', 'grayscale', 'face_detector'])
+
+        gaze.profiler.enabled = False
+        gaze.refresh(np.zeros((120, 160, 3), dtype=np.uint8))
+        self.assertEqual(gaze.stage_stats['refresh']['count'], 1)
+
+    def test_eye_stages(self):
+        profiler = Profiler(enabled=True)
+        frame = np.full((480, 640), 200, dtype=np.uint8)
+        landmarks = landmarks_with_left_eye([(300, 200), (310, 195), (320, 195), (330, 200), (320, 205), (310, 205)])
+        Eye(frame, landmarks, 0, Calibration(), profiler)
+
+        self.assertEqual(list(profiler.summary()),
+                         ['eye_isolate', 'calibration', 'pupil_filter', 'find_contours'])
+
+    def test_calibration_stage_only_times_evaluations(self):
+        frame = np.full((480, 640), 200, dtype=np.uint8)
+        landmarks = landmarks_with_left_eye([(300, 200), (310, 195), (320, 195), (330, 200), (320, 205), (310, 205)])
+        eye_frame = Eye(frame, landmarks, 0, Calibration()).frame
+
+        for calibration in (Calibration(), Calibration(adaptive=True, interval=5)):
+            for _ in range(calibration.nb_frames):
+                calibration.evaluate(eye_frame, 0)
+                calibration.evaluate(eye_frame, 1)
+
+            profiler = Profiler(enabled=True)
+            for _ in range(20):
+                Eye(frame, landmarks, 0, calibration, profiler)
+
+            # Only the re-evaluations of the adaptive calibration are timed
+            count = profiler.summary().get('calibration', {}).get('count', 0)
+            self.assertEqual(count, calibration.recalibrations)
+            self.assertEqual(count > 0, calibration.adaptive)
+
+
+if __name__ == '__main__':
+    unittest.main()
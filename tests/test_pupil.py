@@ -0,0 +1,63 @@
+"""
+Unit tests for the pupil localization methods
+"""
+
+import unittest
+import sys
+import os
+import numpy as np
+import cv2
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+from gaze_tracking import GazeTracking
+from gaze_tracking.pupil import Pupil
+
+
+def eye_frame(center=(30, 15), axes=(8, 8)):
+    """Returns a bright eye frame with a dark iris"""
+    frame = np.full((30, 60), 220, np.uint8)
+    cv2.ellipse(frame, center, axes, 0, 0, 360, 30, -1)
+    return frame
+
+
+class TestPupilMethods(unittest.TestCase):
+    """Tests for the 'contours' and 'components' methods of Pupil"""
+
+    def test_methods_agree(self):
+        for center, axes in [((30, 15), (8, 8)), ((24, 14), (12, 6)), ((40, 16), (5, 7))]:
+            frame = eye_frame(center, axes)
+            contours = Pupil(frame, 100, method='contours')
+            components = Pupil(frame, 100, method='components')
+
+            self.assertLessEqual(abs(contours.x - components.x), 1)
+            self.assertLessEqual(abs(contours.y - components.y), 1)
+            self.assertLessEqual(abs(contours.radius - components.radius), 1)
+
+    def test_iris_frame_unchanged(self):
+        frame = eye_frame()
+        np.testing.assert_array_equal(Pupil(frame, 100, method='components').iris_frame,
+                                      Pupil(frame, 100, method='contours').iris_frame)
+
+    def test_largest_enclosed_region(self):
+        frame = eye_frame((20, 15), (6, 6))
+        cv2.circle(frame, (45, 15), 3, 30, -1)
+        # Dark region touching the border, which isn't a hole of the white region
+        frame[:, :4] = 0
+
+        pupil = Pupil(frame, 100, method='components')
+        self.assertEqual((pupil.x, pupil.y), (20, 15))
+
+    def test_no_iris(self):
+        for frame in (np.full((30, 60), 220, np.uint8), np.zeros((30, 60), np.uint8)):
+            for method in Pupil.METHODS:
+                self.assertIsNone(Pupil(frame, 100, method=method).x)
+
+    def test_unknown_method(self):
+        with self.assertRaises(ValueError):
+            Pupil(eye_frame(), 100, method='hough')
+        with self.assertRaises(ValueError):
+            GazeTracking(pupil_method='hough')
+
+
+if __name__ == '__main__':
+    unittest.main()
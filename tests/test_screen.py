@@ -0,0 +1,109 @@
+"""
+Unit tests for the gaze to screen mapping
+"""
+
+import unittest
+import sys
+import os
+import tempfile
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'benchmarks'))
+from gaze_tracking import GazeTracking, ScreenMapping
+from gaze_tracking.screen import grid_targets
+from fixtures import face_frame
+
+
+def polynomial_screen(horizontal, vertical):
+    """A quadratic relation between the ratios and a 1920x1080 screen"""
+    x = 960 - 3000 * (horizontal - 0.5) + 800 * (horizontal - 0.5) ** 2
+    y = 540 + 2400 * (vertical - 0.5) - 300 * (horizontal - 0.5) * (vertical - 0.5)
+    return x, y
+
+
+def projective_screen(horizontal, vertical):
+    """A projective relation between the ratios and a 1920x1080 screen"""
+    w = 1 + 0.3 * horizontal - 0.2 * vertical
+    return (4000 * horizontal - 500) / w, (3000 * vertical - 800) / w
+
+
+def fitted(model, screen, grid=4):
+    """Returns a mapping fitted on a grid of exact ratios"""
+    mapping = ScreenMapping(model)
+    for horizontal in np.linspace(0.3, 0.7, grid):
+        for vertical in np.linspace(0.3, 0.7, grid):
+            mapping.add(screen(horizontal, vertical), horizontal, vertical)
+    mapping.fit()
+    return mapping
+
+
+class TestScreenMapping(unittest.TestCase):
+    """Tests for ScreenMapping"""
+
+    def test_grid_targets(self):
+        targets = grid_targets(1000, 500, rows=2, columns=3, margin=0.1)
+        self.assertEqual(targets, [(100, 50), (500, 50), (900, 50), (100, 450), (500, 450), (900, 450)])
+
+    def test_polynomial_fits_exactly(self):
+        mapping = fitted('polynomial', polynomial_screen)
+        self.assertLess(mapping.error, 1e-6)
+        np.testing.assert_allclose(mapping.map(0.42, 0.61), polynomial_screen(0.42, 0.61), atol=1e-6)
+
+    def test_homography_fits_exactly(self):
+        mapping = fitted('homography', projective_screen)
+        self.assertLess(mapping.error, 1e-6)
+        np.testing.assert_allclose(mapping.map(0.42, 0.61), projective_screen(0.42, 0.61), atol=1e-6)
+
+    def test_map_array_matches_map(self):
+        ratios = np.random.default_rng(0).uniform(0.3, 0.7, (4, 5, 2))
+        for model, screen in (('polynomial', polynomial_screen), ('homography', projective_screen)):
+            mapping = fitted(model, screen)
+            points = mapping.map_array(ratios)
+            self.assertEqual(points.shape, (4, 5, 2))
+            np.testing.assert_allclose(points[2, 3], mapping.map(*ratios[2, 3]))
+            np.testing.assert_allclose(mapping.map_array(ratios[0, 0]), mapping.map(*ratios[0, 0]))
+
+    def test_nan_ratios(self):
+        mapping = fitted('polynomial', polynomial_screen)
+        points = mapping.map_array([[0.5, 0.5], [np.nan, np.nan]])
+        self.assertFalse(np.isnan(points[0]).any())
+        self.assertTrue(np.isnan(points[1]).all())
+
+    def test_too_few_targets(self):
+        mapping = ScreenMapping('polynomial')
+        for _ in range(10):
+            mapping.add((100, 100), 0.5, 0.5)
+        with self.assertRaises(ValueError):
+            mapping.fit()
+        with self.assertRaises(ValueError):
+            mapping.map(0.5, 0.5)
+
+    def test_unknown_model(self):
+        with self.assertRaises(ValueError):
+            ScreenMapping('spline')
+
+    def test_save_and_load(self):
+        mapping = fitted('homography', projective_screen)
+        path = os.path.join(tempfile.mkdtemp(), 'screen.json')
+        mapping.save(path)
+        loaded = ScreenMapping.load(path)
+        self.assertEqual(loaded.model, 'homography')
+        self.assertAlmostEqual(loaded.error, mapping.error)
+        np.testing.assert_allclose(loaded.map(0.4, 0.6), mapping.map(0.4, 0.6))
+        self.assertEqual(os.listdir(os.path.dirname(path)), ['screen.json'])
+
+    def test_gaze(self):
+        mapping = fitted('polynomial', polynomial_screen)
+        gaze = GazeTracking()
+        self.assertFalse(mapping.add_gaze((0, 0), gaze))
+        self.assertIsNone(mapping.map_gaze(gaze))
+
+        gaze.refresh(face_frame(640, 480))
+        self.assertTrue(mapping.add_gaze((0, 0), gaze))
+        np.testing.assert_allclose(mapping.map_gaze(gaze),
+                                   mapping.map(gaze.horizontal_ratio(), gaze.vertical_ratio()))
+
+
+if __name__ == '__main__':
+    unittest.main()
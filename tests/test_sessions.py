@@ -0,0 +1,144 @@
+"""
+Tests for the sessions of the ASGI backend
+"""
+
+import unittest
+import asyncio
+import sys
+import os
+import threading
+import time
+import numpy as np
+import cv2
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'backend'))
+from gaze_tracking import GazeTracking
+from sessions import SessionManager, AdmissionError, AnalysisError
+from load_test import synthetic_frame
+
+
+class SlowGaze(GazeTracking):
+    """GazeTracking whose analysis takes a fixed time and records its threads"""
+
+    delay = 0.05
+
+    def __init__(self):
+        super(SlowGaze, self).__init__()
+        self.thread_names = set()
+        self.closed = False
+
+    def close(self):
+        self.closed = True
+        super(SlowGaze, self).close()
+
+    def refresh(self, frame):
+        self.thread_names.add(threading.current_thread().name)
+        time.sleep(self.delay)
+        super(SlowGaze, self).refresh(frame)
+
+
+FRAME = cv2.imencode('.jpg', np.zeros((120, 160, 3), dtype=np.uint8))[1].tobytes()
+
+
+class TestSessionManager(unittest.IsolatedAsyncioTestCase):
+    """Tests for SessionManager"""
+
+    def setUp(self):
+        self.sessions = SessionManager(SlowGaze, max_sessions=2, idle_timeout=10, workers=2)
+
+    def tearDown(self):
+        self.sessions.shutdown()
+
+    async def test_admission_control(self):
+        first = self.sessions.create()
+        self.sessions.create()
+        with self.assertRaises(AdmissionError):
+            self.sessions.create()
+
+        self.sessions.close(first.id)
+        self.sessions.create()
+        self.assertEqual(self.sessions.rejected_sessions, 1)
+
+    async def test_sessions_have_their_own_state(self):
+        first, second = self.sessions.create(), self.sessions.create()
+        self.assertIsNot(first.gaze, second.gaze)
+        self.assertIsNot(first.gaze.calibration, second.gaze.calibration)
+
+    async def test_idle_sessions_evicted(self):
+        idle, active = self.sessions.create(), self.sessions.create()
+        idle.last_seen -= 11
+
+        self.assertEqual(self.sessions.evict_idle(), [idle.id])
+        self.assertTrue(idle.closed)
+        self.assertTrue(idle.gaze.closed)
+        self.assertFalse(active.gaze.closed)
+        self.assertIsNone(self.sessions.get(idle.id))
+        self.assertIs(self.sessions.get(active.id), active)
+
+    async def test_analysis_off_the_event_loop(self):
+        session = self.sessions.create()
+        ticks = 0
+
+        async def ticker():
+            nonlocal ticks
+            while True:
+                ticks += 1
+                await asyncio.sleep(0.005)
+
+        task = asyncio.ensure_future(ticker())
+        result = await self.sessions.submit(session, FRAME)
+        task.cancel()
+
+        self.assertGreater(ticks, 3)
+        self.assertEqual(result['frame'], 1)
+        self.assertIn('horizontal', result['metrics'])
+        self.assertTrue(all(name.startswith('gaze') for name in session.gaze.thread_names))
+
+    async def test_waiting_frame_dropped_for_newer_one(self):
+        session = self.sessions.create()
+        results = await asyncio.gather(*[self.sessions.submit(session, FRAME) for _ in range(3)])
+
+        # The first frame is analyzed, the second one is replaced by the third one
+        self.assertIsNotNone(results[0])
+        self.assertIsNone(results[1])
+        self.assertEqual(results[2]['frame'], 3)
+        self.assertEqual(session.dropped_frames, 1)
+        self.assertEqual(session.stats()['processedFrames'], 2)
+        self.assertIsNotNone(session.stats()['p95Ms'])
+
+    async def test_tracker_closed_after_the_frame_being_analyzed(self):
+        session = self.sessions.create()
+        analysis = asyncio.ensure_future(self.sessions.submit(session, FRAME))
+        await asyncio.sleep(0.01)
+
+        self.sessions.close(session.id)
+        self.assertFalse(session.gaze.closed)
+        await analysis
+        self.assertTrue(session.gaze.closed)
+
+    async def test_load_test_frame_has_a_face(self):
+        session = self.sessions.create()
+        result = await self.sessions.submit(session, synthetic_frame())
+        self.assertIsNotNone(result['metrics']['eyeOpenness'])
+
+    async def test_failed_analysis(self):
+        session = self.sessions.create()
+
+        def fail(frame):
+            raise RuntimeError("dlib error")
+        session.gaze.refresh = fail
+
+        with self.assertRaises(AnalysisError):
+            await self.sessions.submit(session, FRAME)
+        self.assertEqual(session.failed_frames, 1)
+
+    async def test_invalid_frame(self):
+        session = self.sessions.create()
+        with self.assertRaises(ValueError):
+            await self.sessions.submit(session, b'not an image')
+        self.assertEqual(session.failed_frames, 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
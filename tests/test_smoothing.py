@@ -0,0 +1,106 @@
+"""
+Unit tests for the temporal smoothing of the gaze
+"""
+
+import unittest
+import sys
+import os
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'benchmarks'))
+from gaze_tracking import GazeTracking, GazeFilter
+from gaze_tracking.smoothing import OneEuroFilter
+from fixtures import face_frame
+
+
+class TestOneEuroFilter(unittest.TestCase):
+    """Tests for OneEuroFilter"""
+
+    def test_removes_jitter(self):
+        rng = np.random.default_rng(0)
+        one_euro = OneEuroFilter(min_cutoff=1.0, beta=0.0)
+        noisy = 100 + rng.normal(0, 2, 300)
+        filtered = np.array([one_euro.update(i / 30, [value])[0] for i, value in enumerate(noisy)])
+
+        self.assertLess(filtered[30:].std(), noisy[30:].std() / 2)
+
+    def test_follows_movement(self):
+        one_euro = OneEuroFilter(min_cutoff=1.0, beta=0.2)
+        for i in range(60):
+            value = one_euro.update(i / 30, [100 + 3 * i])[0]
+        self.assertLess(abs(value - (100 + 3 * 59)), 6)
+
+    def test_predict_extrapolates(self):
+        one_euro = OneEuroFilter(min_cutoff=1.0, beta=0.2)
+        for i in range(60):
+            one_euro.update(i / 30, [3 * i])
+        state = (one_euro.value.copy(), one_euro.timestamp)
+
+        predicted = one_euro.predict(61 / 30)[0]
+        self.assertGreater(predicted, one_euro.value[0])
+        self.assertEqual((one_euro.value[0], one_euro.timestamp), (state[0][0], state[1]))
+
+
+class TestGazeFilter(unittest.TestCase):
+    """Tests for the gap prediction of GazeFilter"""
+
+    def test_predicts_short_gaps_only(self):
+        gaze_filter = GazeFilter(max_gap=0.3)
+        self.assertEqual(gaze_filter.update(0.0), (None, None))
+
+        coords, ratios = gaze_filter.update(0.0, (10, 20, 30, 40), (0.5, 0.5))
+        self.assertEqual(list(coords), [10, 20, 30, 40])
+
+        coords, ratios = gaze_filter.update(0.2)
+        self.assertEqual(list(coords), [10, 20, 30, 40])
+        self.assertEqual(gaze_filter.update(0.4), (None, None))
+
+    def test_restarts_after_long_gap(self):
+        gaze_filter = GazeFilter(max_gap=0.3)
+        gaze_filter.update(0.0, (10, 20, 30, 40), (0.5, 0.5))
+        coords, _ = gaze_filter.update(1.0, (50, 60, 70, 80), (0.2, 0.2))
+
+        self.assertEqual(list(coords), [50, 60, 70, 80])
+        self.assertEqual(list(gaze_filter.predict(1.1)[0]), [50, 60, 70, 80])
+
+
+class TestGazeTrackingSmoothing(unittest.TestCase):
+    """Tests for the smoothed outputs of GazeTracking"""
+
+    def setUp(self):
+        self.face = face_frame(640, 480)
+        self.black = np.zeros((480, 640, 3), np.uint8)
+
+    def test_gaps_filled(self):
+        gaze = GazeTracking(smoothing=GazeFilter(max_gap=0.3))
+        for i in range(3):
+            gaze.refresh(self.face, timestamp=i / 30)
+        located = gaze.pupil_left_coords()
+
+        gaze.refresh(self.black, timestamp=4 / 30)
+        self.assertFalse(gaze.pupils_located)
+        self.assertIsNone(gaze.pupil_left_coords_raw())
+        self.assertEqual(gaze.pupil_left_coords(), located)
+        self.assertIsNotNone(gaze.horizontal_ratio())
+
+        gaze.predict(timestamp=5 / 30)
+        self.assertEqual(gaze.pupil_right_coords(), gaze.pupil_right_coords())
+        self.assertIsNotNone(gaze.vertical_ratio())
+
+        gaze.predict(timestamp=1.0)
+        self.assertIsNone(gaze.pupil_left_coords())
+        self.assertIsNone(gaze.horizontal_ratio())
+
+    def test_disabled_by_default(self):
+        gaze = GazeTracking()
+        gaze.refresh(self.face)
+        self.assertEqual(gaze.pupil_left_coords(), gaze.pupil_left_coords_raw())
+        gaze.refresh(self.black)
+        self.assertIsNone(gaze.pupil_left_coords())
+        with self.assertRaises(ValueError):
+            gaze.predict()
+
+
+if __name__ == '__main__':
+    unittest.main()
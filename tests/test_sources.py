@@ -0,0 +1,152 @@
+"""
+Tests for the frame sources of the backend
+"""
+
+import unittest
+import sys
+import os
+import shutil
+import subprocess
+import tempfile
+import time
+import numpy as np
+import cv2
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'backend'))
+from gaze_tracking import GazeTracking, models
+from pipeline import GazePipeline
+from sources import FrameSource, ImageDirectorySource, SyntheticSource, VideoFileSource, open_source
+
+
+def numbered_frames(count):
+    """Returns small frames whose gray level is their index times 10"""
+    return [np.full((120, 160, 3), i * 10, np.uint8) for i in range(count)]
+
+
+def read_levels(source, count):
+    """Reads count frames and returns their gray levels, None for the failed reads"""
+    levels = []
+    for _ in range(count):
+        success, frame = source.read()
+        levels.append(int(frame[0, 0, 0]) if success else None)
+    return levels
+
+
+class TestSources(unittest.TestCase):
+    """Tests for the sources of sources.py"""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.directory = tempfile.mkdtemp()
+        cls.video_path = os.path.join(cls.directory, 'session.avi')
+        writer = cv2.VideoWriter(cls.video_path, cv2.VideoWriter_fourcc(*'MJPG'), 30, (160, 120))
+        for frame in numbered_frames(3):
+            writer.write(frame)
+        writer.release()
+
+        cls.images_path = os.path.join(cls.directory, 'images')
+        os.mkdir(cls.images_path)
+        for i, frame in enumerate(numbered_frames(3)):
+            cv2.imwrite(os.path.join(cls.images_path, 'frame_{:03d}.png'.format(i)), frame)
+        with open(os.path.join(cls.images_path, 'notes.txt'), 'w') as f:
+            f.write('not an image')
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(cls.directory)
+
+    def test_synthetic_loops_by_default(self):
+        source = SyntheticSource(numbered_frames(2))
+        self.assertEqual(read_levels(source, 5), [0, 10, 0, 10, 0])
+        self.assertFalse(source.finished)
+
+    def test_synthetic_without_loop_finishes(self):
+        source = SyntheticSource(numbered_frames(2), loop=False)
+        self.assertEqual(read_levels(source, 4), [0, 10, None, None])
+        self.assertTrue(source.finished)
+        self.assertEqual(source.frames_read, 2)
+
+    def test_generated_frames(self):
+        source = SyntheticSource(nb_frames=4)
+        self.assertEqual(len(source.frames), 4)
+        self.assertEqual(source.frames[0].shape, (480, 640, 3))
+        self.assertFalse(np.array_equal(source.frames[0], source.frames[1]))
+
+        # The face is found by the detector, so the whole analysis is exercised
+        detector = models.get_face_detector()
+        for frame in source.frames:
+            self.assertGreater(len(detector(cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY))), 0)
+
+    def test_fixtures_only_imported_by_the_synthetic_source(self):
+        backend = os.path.join(os.path.dirname(__file__), '..', 'backend')
+        code = ("import sys; import sources; "
+                "print(any(name.endswith('fixtures') for name in sys.modules))")
+        output = subprocess.check_output([sys.executable, '-c', code], cwd=backend)
+        self.assertEqual(output.strip(), b'False')
+
+    def test_sources_implement_the_frame_methods(self):
+        class IncompleteSource(FrameSource):
+            def _next_frame(self):
+                return None
+
+        with self.assertRaises(TypeError):
+            IncompleteSource()
+
+    def test_image_directory(self):
+        source = ImageDirectorySource(self.images_path, loop=True)
+        self.assertEqual(read_levels(source, 4), [0, 10, 20, 0])
+
+        with self.assertRaises(IOError):
+            ImageDirectorySource(self.directory)
+
+    def test_video_file(self):
+        source = VideoFileSource(self.video_path)
+        frames = [source.read()[0] for _ in range(4)]
+        self.assertEqual(frames, [True, True, True, False])
+        self.assertTrue(source.finished)
+        source.release()
+
+        source = VideoFileSource(self.video_path, loop=True)
+        self.assertTrue(all(source.read()[0] for _ in range(7)))
+        source.release()
+
+        with self.assertRaises(IOError):
+            VideoFileSource(os.path.join(self.directory, 'missing.avi'))
+
+    def test_pacing(self):
+        source = SyntheticSource(numbered_frames(1), fps=50)
+        start = time.monotonic()
+        for _ in range(11):
+            source.read()
+        self.assertGreaterEqual(time.monotonic() - start, 0.19)
+
+    def test_open_source(self):
+        source = open_source('images:' + self.images_path, fps=30, loop=True)
+        self.assertIsInstance(source, ImageDirectorySource)
+        self.assertTrue(source.loop)
+        self.assertAlmostEqual(source.interval, 1 / 30)
+
+        self.assertIsInstance(open_source('video:' + self.video_path), VideoFileSource)
+        self.assertTrue(open_source('synthetic').loop)
+        self.assertFalse(open_source('synthetic', loop=False).loop)
+        with self.assertRaises(ValueError):
+            open_source('screen:0')
+
+    def test_pipeline_stops_at_the_end_of_the_source(self):
+        pipeline = GazePipeline(SyntheticSource(numbered_frames(3), loop=False), GazeTracking())
+        pipeline.start()
+        deadline = time.time() + 5
+        while not pipeline.stats()['sourceFinished'] and time.time() < deadline:
+            time.sleep(0.01)
+        self.assertIsNotNone(pipeline.wait_for_sample(-1, timeout=5))
+        pipeline.stop()
+
+        stats = pipeline.stats()
+        self.assertTrue(stats['sourceFinished'])
+        self.assertEqual(stats['capturedFrames'], 3)
+        self.assertEqual(stats['captureFailures'], 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
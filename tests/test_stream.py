@@ -0,0 +1,100 @@
+"""
+Unit tests for the pipelined stream analysis
+"""
+
+import unittest
+import sys
+import os
+import threading
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'benchmarks'))
+from gaze_tracking import GazeTracking, MotionGate
+from gaze_tracking.stream import pipelined, sequential
+from fixtures import face_clip
+
+
+class TestPipelined(unittest.TestCase):
+    """Tests for the pipelined() generator"""
+
+    def test_results_in_order(self):
+        def slow_when_even(x):
+            time.sleep(0.002 if x % 2 == 0 else 0)
+            return x * 10
+
+        stages = [slow_when_even, lambda x: x + 1]
+        self.assertEqual(list(pipelined(range(20), stages, queue_size=1)), [x * 10 + 1 for x in range(20)])
+        self.assertEqual(list(sequential(range(20), stages)), [x * 10 + 1 for x in range(20)])
+
+    def test_stage_error_raised(self):
+        def fail_on_three(x):
+            if x == 3:
+                raise KeyError(x)
+            return x
+
+        results = []
+        with self.assertRaises(KeyError):
+            for x in pipelined(range(10), [fail_on_three]):
+                results.append(x)
+        self.assertEqual(results, [0, 1, 2])
+
+    def test_source_error_raised(self):
+        def source():
+            yield 1
+            raise IOError("camera unplugged")
+
+        with self.assertRaises(IOError):
+            list(pipelined(source(), [lambda x: x]))
+
+    def test_close_stops_threads(self):
+        threads = threading.active_count()
+        stream = pipelined(iter(range(10 ** 6)), [lambda x: x, lambda x: x])
+        self.assertEqual(next(stream), 0)
+        stream.close()
+        self.assertEqual(threading.active_count(), threads)
+
+
+class TestProcessStream(unittest.TestCase):
+    """Tests that process_stream() gives the results of refresh()"""
+
+    @classmethod
+    def setUpClass(cls):
+        clip = face_clip(640, 480)
+        cls.frames = clip + clip[:4]
+
+    def results(self, gaze):
+        return gaze.pupil_left_coords(), gaze.pupil_right_coords(), gaze.horizontal_ratio()
+
+    def assert_same_results(self, **options):
+        gaze = GazeTracking(**options)
+        expected = []
+        for frame in self.frames:
+            gaze.refresh(frame)
+            expected.append(self.results(gaze))
+
+        gaze = GazeTracking(**options)
+        results = []
+        for i, frame in enumerate(gaze.process_stream(iter(self.frames), threaded=True)):
+            self.assertIs(frame, self.frames[i])
+            results.append(self.results(gaze))
+        self.assertEqual(results, expected)
+        return gaze
+
+    def test_detection(self):
+        gaze = self.assert_same_results()
+        self.assertEqual(gaze.tracking_stats['detector_hits'], len(self.frames))
+
+    def test_tracking(self):
+        self.assert_same_results(tracking=True)
+
+    def test_multi_face(self):
+        gaze = self.assert_same_results(multi_face=True)
+        self.assertTrue(gaze.faces)
+
+    def test_motion_gate(self):
+        self.assert_same_results(motion_gate=MotionGate())
+
+
+if __name__ == '__main__':
+    unittest.main()
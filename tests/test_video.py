@@ -0,0 +1,102 @@
+"""
+Tests for the multi-process video analysis
+"""
+
+import unittest
+import sys
+import os
+import csv
+import shutil
+import tempfile
+from unittest import mock
+import numpy as np
+import cv2
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+from gaze_tracking import GazeTracking, MotionGate
+from gaze_tracking.calibration import Calibration
+from gaze_tracking import video
+from gaze_tracking.video import analyze_video, frame_count
+
+
+class TestVideoAnalysis(unittest.TestCase):
+    """Tests for analyze_video() on a short synthetic video"""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.directory = tempfile.mkdtemp()
+        cls.path = os.path.join(cls.directory, 'black.avi')
+        writer = cv2.VideoWriter(cls.path, cv2.VideoWriter_fourcc(*'MJPG'), 30, (160, 120))
+        for _ in range(10):
+            writer.write(np.zeros((120, 160, 3), dtype=np.uint8))
+        writer.release()
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(cls.directory)
+
+    def test_results_cover_every_frame(self):
+        results, fps = analyze_video(self.path, workers=2, chunk_size=3)
+
+        self.assertEqual(frame_count(self.path), 10)
+        self.assertEqual(results.dtype, GazeTracking.BATCH_DTYPE)
+        self.assertEqual(len(results), 10)
+        self.assertFalse(results['valid'].any())
+        self.assertGreater(fps, 0)
+
+    def test_csv_rows_in_frame_order(self):
+        output = os.path.join(self.directory, 'results.csv')
+        analyze_video(self.path, workers=2, output=output, chunk_size=3)
+
+        with open(output) as f:
+            rows = list(csv.DictReader(f))
+        self.assertEqual([int(row['frame']) for row in rows], list(range(10)))
+
+    def test_npz_output(self):
+        output = os.path.join(self.directory, 'results.npz')
+        analyze_video(self.path, workers=1, output=output, chunk_size=4)
+
+        data = np.load(output)
+        np.testing.assert_array_equal(data['frame'], np.arange(10))
+
+    def test_reads_past_the_reported_frame_count(self):
+        with mock.patch('gaze_tracking.video.frame_count', return_value=7):
+            results, _ = analyze_video(self.path, workers=1, chunk_size=3, calibrate_first=False)
+        self.assertEqual(len(results), 10)
+
+    def test_frames_are_timed_by_their_position(self):
+        video._init_worker({}, None)
+        with mock.patch.object(GazeTracking, 'refresh', autospec=True) as refresh:
+            video._analyze_range((self.path, 4, 7, 2))
+        timestamps = [call[0][2] for call in refresh.call_args_list]
+        np.testing.assert_allclose(timestamps, [4 / 30, 5 / 30, 6 / 30])
+
+    def test_workers_keep_the_calibration_options(self):
+        thresholds = ([50] * 20, [60] * 20)
+        video._init_worker({'calibration': Calibration(adaptive=True, window=30)}, thresholds)
+
+        calibration = video._worker_gaze.calibration
+        self.assertTrue(calibration.adaptive)
+        self.assertEqual(calibration.thresholds_left.maxlen, 30)
+        self.assertEqual(calibration.threshold(0), 50)
+
+    def test_ranges_start_from_a_clean_state(self):
+        video._init_worker({'motion_gate': MotionGate(threshold=2)}, None)
+        gaze = video._worker_gaze
+        gaze.motion_gate._references = [(0, 0, 8, 8, np.zeros((4, 4), np.uint8))]
+        gaze.blinks._closed_since = 1.0
+
+        with mock.patch.object(GazeTracking, 'analyze_batch', autospec=True) as analyze_batch:
+            analyze_batch.side_effect = lambda gaze, frames, timestamps: np.zeros(
+                len(frames), dtype=GazeTracking.BATCH_DTYPE)
+            video._analyze_range((self.path, 0, 1, 1))
+        self.assertEqual(gaze.motion_gate._references, [])
+        self.assertIsNone(gaze.blinks.closed_since)
+
+    def test_missing_video(self):
+        with self.assertRaises(IOError):
+            analyze_video(os.path.join(self.directory, 'missing.avi'), workers=1, calibrate_first=False)
+
+
+if __name__ == '__main__':
+    unittest.main()